@@ -1,59 +1,203 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
+import os
 from datetime import datetime
 import numpy as np
+from utils.tick_store import FLAG_VALIDATED, import_csv, to_epoch_ns
+from utils.history_query import HistoryQuery
+from utils.forecasting import FORECASTERS, ForecastEngine
 
 CSV_FILE = "crypto_prices.csv"
+TICK_STORE_FILE = "crypto_prices.ticks"
+COINS = ["bitcoin", "ethereum", "dogecoin", "solana"]
 
-def predict_next_price(crypto_name):
+# Predictions are for this many seconds after now ("tomorrow")
+HORIZON = 86_400
+
+_history = None
+
+def next_time():
+    """Epoch seconds HORIZON from now, on the store's clock (the publishers
+    write naive local times, which the store keeps as if they were UTC)."""
+    return to_epoch_ns(datetime.now()) / 1e9 + HORIZON
+
+# One ForecastEngine per model asked for, fitted on the full history and
+# then fed only the rows added since the previous call
+_engines = {}       # model -> [engine, last timestamp fed]
+
+def get_history():
+    """Shared HistoryQuery over the tick store (imported from the CSV once if missing)."""
+    global _history
+    if _history is None:
+        if not os.path.exists(TICK_STORE_FILE):
+            n = import_csv(CSV_FILE, TICK_STORE_FILE)
+            print(f"[PREDICT] Imported {n} rows from {CSV_FILE}")
+        _history = HistoryQuery(TICK_STORE_FILE)
+    else:
+        _history.refresh()
+    return _history
+
+# Plausibility bounds used to drop rows written with swapped columns
+# (some rows have dogecoin/solana flipped)
+SANITY_BOUNDS = {
+    "bitcoin": (1000, np.inf),  # Bitcoin price must be realistic
+    "ethereum": (100, np.inf),
+    "solana": (1, np.inf),
+    "dogecoin": (-np.inf, 1),  # Doge should be below 1
+}
+
+RESULT_DTYPE = np.dtype([
+    ("coin", "U32"), ("n", "i8"), ("slope", "f8"), ("intercept", "f8"), ("prediction", "f8"),
+])
+
+def _sanity_mask(data):
+    """Rows within SANITY_BOUNDS. Rows from segments the ingest validator
+    already checked (FLAG_VALIDATED) are not scanned again."""
+    mask = np.ones(len(data["timestamp"]), dtype=bool)
+    rows = np.flatnonzero((data["flags"] & FLAG_VALIDATED) == 0) if "flags" in data else slice(None)
+    for coin, (low, high) in SANITY_BOUNDS.items():
+        if coin in data:
+            values = data[coin][rows]
+            # Missing prices are not a swap; callers decide how to treat them
+            mask[rows] &= ((values > low) & (values < high)) | np.isnan(values)
+    return mask
+
+def load_clean(start=None, end=None):
+    data = get_history().query(COINS, start, end, flags=True)
+
+    # Drop rows with missing prices or swapped columns
+    mask = _sanity_mask(data)
+    for coin in COINS:
+        mask &= ~np.isnan(data[coin])
+    return {k: v[mask] for k, v in data.items()}
+
+def predict_all(coins=None, start=None, end=None):
+    """Fit every coin's trend at once and predict tomorrow's prices.
+
+    History is read once into a (timestamps x coins) matrix and all columns
+    are solved together: a single np.linalg.lstsq call when the matrix is
+    complete, or the masked normal equations (still one vectorized pass)
+    when some prices are missing. Returns a structured array (RESULT_DTYPE)
+    with one row per coin.
+    """
+    history = get_history()
+    coins = list(history.symbols if coins is None else coins)
+    data = history.query(coins, start, end, flags=True)
+
+    # Epoch seconds: intraday points stay apart (day ordinals collapsed them)
+    x = data["timestamp"] / 1e9
+    Y = np.column_stack([data[c] for c in coins]) if coins else np.empty((len(x), 0))
+    Y[~_sanity_mask(data)] = np.nan
+    present = ~np.isnan(Y)
+
+    x0 = x[0] if len(x) else 0.0
+    dx = x - x0
+    if present.all() and len(x) >= 2 and np.ptp(dx) > 0:
+        A = np.column_stack([np.ones_like(dx), dx])
+        (a, b), *_ = np.linalg.lstsq(A, Y, rcond=None)
+        n = np.full(len(coins), len(x))
+    else:
+        W = present.astype(np.float64)
+        Yz = np.where(present, Y, 0.0)
+        n = W.sum(axis=0)
+        sx, sy = dx @ W, Yz.sum(axis=0)
+        sxy, sxx = dx @ Yz, (dx * dx) @ W
+        den = n * sxx - sx * sx
+        ok = (n >= 2) & (den > 0)
+        b = np.divide(n * sxy - sx * sy, den, out=np.zeros(len(coins)), where=ok)
+        a = np.divide(sy - b * sx, n, out=np.full(len(coins), np.nan), where=ok)
+
+    t = next_time()
+    result = np.zeros(len(coins), dtype=RESULT_DTYPE)
+    result["coin"] = coins
+    result["n"] = n
+    result["slope"] = b
+    result["intercept"] = a - b * x0
+    result["prediction"] = np.round(a + b * (t - x0), 2)
+    return result
+
+def get_engine(model="linear"):
+    """Shared ForecastEngine running just `model`, brought up to date with
+    the rows stored since the last call."""
+    entry = _engines.get(model)
+    if entry is None:
+        entry = _engines[model] = [ForecastEngine(COINS, models=[model]), None]
+    engine, last_ts = entry
+    data = load_clean(None if last_ts is None else last_ts + 1)
+    if len(data["timestamp"]):
+        if last_ts is None:
+            for coin in COINS:
+                engine.fit(coin, data["timestamp"], data[coin])
+        else:
+            for i, ts in enumerate(data["timestamp"].tolist()):
+                engine.update(ts, {coin: data[coin][i] for coin in COINS})
+        entry[1] = int(data["timestamp"].max())
+    return engine
+
+def predict_next_price(crypto_name, start=None, end=None, model="linear"):
+    """Predict tomorrow's price from the history in [start, end] (all history by default)."""
     try:
-        # Load the CSV with known headers
-        df = pd.read_csv(CSV_FILE, names=[
-            'timestamp', 'bitcoin_usd', 'ethereum_usd', 'dogecoin_usd', 'solana_usd'
-        ], skiprows=1)  # Skip the header row once manually
-
-        # Drop completely empty rows
-        df = df.dropna()
-
-        # Fix timestamps — handle both formats
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce', infer_datetime_format=True)
-        df = df.dropna(subset=['timestamp'])
-
-        # Fix column types (some rows have dogecoin/solana flipped)
-        df = df[
-            (df['bitcoin_usd'] > 1000) &  # Bitcoin price must be realistic
-            (df['ethereum_usd'] > 100) &
-            (df['solana_usd'] > 1) & 
-            (df['dogecoin_usd'] < 1)  # Doge should be below 1
-        ]
-
-        # Check if crypto column exists
-        if f"{crypto_name}_usd" not in df.columns:
+        if crypto_name not in COINS:
             print(f"[PREDICT WARNING] {crypto_name}_usd column not found.")
             return None
 
-        # Prepare data for training
-        df['timestamp_ordinal'] = df['timestamp'].map(datetime.toordinal)
-        X = df[['timestamp_ordinal']]
-        y = df[f"{crypto_name}_usd"]
+        if start is None and end is None:
+            engine = get_engine(model)
+        else:
+            engine = ForecastEngine([crypto_name], models=[model])
+            data = load_clean(start, end)
+            engine.fit(crypto_name, data["timestamp"], data[crypto_name])
 
-        if len(X) < 2:
+        pred = engine.forecast(crypto_name, [next_time()], model)
+        if pred is None:
             print(f"[PREDICT WARNING] Not enough clean data for {crypto_name}.")
             return None
 
-        model = LinearRegression()
-        model.fit(X, y)
-
-        next_time = datetime.now().toordinal() + 1
-        pred = model.predict([[next_time]])[0]
-
-        return round(pred, 2)
+        return round(float(pred[0]), 2)
 
     except Exception as e:
         print(f"[PREDICT ERROR] {e}")
         return None
 
 if __name__ == "__main__":
-    for crypto in ["bitcoin", "ethereum", "solana", "dogecoin"]:
-        pred = predict_next_price(crypto)
-        print(f"{crypto} predicted price: ${pred}")
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="linear", choices=list(FORECASTERS))
+    parser.add_argument("--backtest", action="store_true",
+                        help="walk-forward backtest every model instead of predicting")
+    parser.add_argument("--workers", type=int, default=None, help="backtest processes")
+    parser.add_argument("--backfill", action="store_true",
+                        help="first fetch history newer than the local store from crypto/history/*")
+    args = parser.parse_args()
+
+    if args.backfill:
+        # For machines without the publisher's files: the store is created
+        # (or topped up) from the Zenoh history service, one chunk at a time
+        import zenoh
+        from utils.history_service import backfill_store
+        if not os.path.exists(TICK_STORE_FILE) and os.path.exists(CSV_FILE):
+            get_history()
+        session = zenoh.open(zenoh.Config())
+        try:
+            n = backfill_store(session, TICK_STORE_FILE)
+            print(f"[PREDICT] Backfilled {n} rows from the history service")
+        except RuntimeError as e:
+            print(f"[PREDICT ERROR] {e}")
+        finally:
+            session.close()
+
+    coins = ["bitcoin", "ethereum", "solana", "dogecoin"]
+    if args.backtest:
+        from utils.backtest import run_backtests, print_results
+        data = get_history().query(coins, flags=True)
+        mask = _sanity_mask(data)
+        print_results(*run_backtests(data["timestamp"][mask], {c: data[c][mask] for c in coins},
+                                     workers=args.workers))
+        raise SystemExit
+    if args.model == "linear":
+        # Every coin in one vectorized least-squares pass
+        predictions = {row["coin"]: row["prediction"] for row in predict_all(coins)}
+    else:
+        predictions = {coin: predict_next_price(coin, model=args.model) for coin in coins}
+    for coin in coins:
+        pred = predictions[coin]
+        pred = pred if pred is not None and np.isfinite(pred) else None
+        print(f"{coin} predicted price: ${pred}")
@@ -0,0 +1,51 @@
+// Live ticks pushed by the dashboard server (see utils/tick_broadcast.py).
+// Every server-sent event is written into the 'live-tick' store; the
+// clientside callback in zenoh_sub_dash.py appends it to the history chart.
+// The stream is limited to the coin on screen: the coin dropdown calls
+// window.liveTicks.follow(coin), which reconnects with ?coins=<coin>.
+// Tick-to-browser latency of the last 100 messages is kept in
+// window.liveTickLatency (ms) for checking from the console: the time the
+// oldest tick in a message waited on the server plus the time since the
+// server sent it (true UTC on both ends; tick timestamps are on the
+// publishers' local clock, so they are not used for this).
+(function () {
+    window.liveTickLatency = [];
+    var source = null;
+    var coin = null;
+
+    function connect() {
+        var dc = window.dash_clientside;
+        if (!dc || !dc.set_props || !document.getElementById('price-history-chart')) {
+            setTimeout(connect, 500);
+            return;
+        }
+        if (source) {
+            source.close();
+        }
+        // EventSource reconnects on its own if the server goes away
+        source = new EventSource('/stream/ticks' + (coin ? '?coins=' + encodeURIComponent(coin) : ''));
+        source.onmessage = function (event) {
+            var msg = JSON.parse(event.data);
+            window.liveTickLatency.push(Date.now() - msg.sent_ms + (msg.queued_ms || 0));
+            window.liveTickLatency = window.liveTickLatency.slice(-100);
+            dc.set_props('live-tick', {data: msg});
+        };
+    }
+
+    window.liveTicks = {
+        follow: function (next) {
+            if (next !== coin) {
+                coin = next;
+                if (source) {
+                    connect();
+                }
+            }
+        }
+    };
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', connect);
+    } else {
+        connect();
+    }
+})();
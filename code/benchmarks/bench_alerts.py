@@ -0,0 +1,152 @@
+# benchmarks/bench_alerts.py
+#
+# Per-tick cost of utils/alerts.py as the number of rules grows, for a
+# snapshot (every coin ticks) and for one coin's tick on its own key. The
+# rules are a mix of price levels a few % away, % moves over 1 min / 5 min /
+# 1 h and indicator crosses (price vs sma / ema / Bollinger, rsi 30 / 70),
+# spread over the coins.
+#
+# The baseline checks the same rules one by one in a Python loop over
+# precomputed per-coin series (only up to --loop-max rules, it is slow); both
+# must fire the same alerts on every tick.
+#
+#   cd code
+#   python -m benchmarks.bench_alerts --rules 10 100 1000 10000 100000
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import coin_names, random_walk
+from utils.alerts import AlertEngine, ARMED, DISARMED, NO_TICK, OPS, UNKNOWN
+from utils.indicators import INDICATORS, IndicatorEngine
+
+WINDOWS = (60, 300, 3600)
+
+
+def make_rules(n, coins, start, seed=1):
+    rng = np.random.default_rng(seed)
+    rules = []
+    for k in range(n):
+        c = int(rng.integers(len(coins)))
+        rule = {"id": f"r{k}", "coin": coins[c], "op": "above" if rng.random() < 0.5 else "below",
+                "cooldown": float(rng.choice([0, 60, 600]))}
+        kind = rng.random()
+        if kind < 0.4:
+            rule.update(series="price", level=float(start[c] * (1 + rng.normal(0, 0.01))))
+        elif kind < 0.6:
+            rule.update(series="move", window=float(rng.choice(WINDOWS)), level=float(rng.normal(0, 0.3)))
+        elif kind < 0.8:
+            rule.update(series="price", ref=str(rng.choice(["sma", "ema", "bb_upper", "bb_lower"])))
+        else:
+            rule.update(series="rsi", level=float(rng.choice([30, 70])))
+        rules.append(rule)
+    return rules
+
+
+class LoopAlerts:
+    """The same semantics as AlertEngine, one rule at a time."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.state = {}
+
+    def update(self, ts, prices, indicators):
+        e = self.engine
+        rows = np.flatnonzero(prices == prices)
+        series = {}
+        values = indicators.values(rows)
+        moves = {w: e.lags[w].change(rows, prices[rows]) for w in e.lags}
+        for j, c in enumerate(rows.tolist()):
+            s = {"price": prices[c]}
+            s.update({name: values[name][j] for name in INDICATORS})
+            s.update({("move", w): moves[w][j] for w in moves})
+            series[c] = s
+        fired = []
+        for rule in e.rules:
+            c = e.index[rule["coin"]]
+            if c not in series:
+                continue
+            s = series[c]
+            lhs = s[("move", rule["window"])] if rule["series"] == "move" else s[rule["series"]]
+            rhs = s[rule["ref"]] if "ref" in rule else rule["level"]
+            beyond = OPS[rule["op"]] * (lhs - rhs)
+            if beyond != beyond:
+                continue
+            armed, last = self.state.get(rule["id"], (UNKNOWN, NO_TICK))
+            if armed == UNKNOWN:
+                armed = DISARMED if beyond > 0 else ARMED
+            elif armed == ARMED and beyond > 0:
+                armed = DISARMED
+                if last == NO_TICK or ts - last >= rule["cooldown"] * 1e9:
+                    last = ts
+                    fired.append(rule["id"])
+            elif armed == DISARMED and beyond < -rule.get("hysteresis", 0.002) * abs(rhs):
+                armed = ARMED
+            self.state[rule["id"]] = (armed, last)
+        return fired
+
+
+def run(rules, coins, ts, values, loop_max):
+    """us per snapshot, us per single-coin tick, us per snapshot in the loop
+    (None above loop_max), alerts fired."""
+    n_ticks = len(ts)
+    warmup = n_ticks // 2
+    indicators = IndicatorEngine(coins)
+    engine = AlertEngine(coins, rules)
+    loop = LoopAlerts(engine) if len(rules) <= loop_max else None
+    snapshot = loop_s = 0.0
+    fired = 0
+    for i in range(n_ticks):
+        t, row = int(ts[i]), values[i]
+        indicators.update(t, row)
+        start = time.perf_counter()
+        got = engine.update(t, row, indicators)
+        elapsed = time.perf_counter() - start
+        if loop is not None:
+            # The loop reads the move windows the engine just advanced
+            start = time.perf_counter()
+            want = loop.update(t, row, indicators)
+            if i >= warmup:
+                loop_s += time.perf_counter() - start
+            assert sorted(a["id"] for a in got) == sorted(want), f"tick {i}: engines disagree"
+        if i >= warmup:
+            snapshot += elapsed
+            fired += len(got)
+
+    # One coin per tick, as the per-coin keys deliver them
+    single = np.full(len(coins), np.nan)
+    start = time.perf_counter()
+    for i in range(warmup, n_ticks):
+        c = i % len(coins)
+        single[c] = values[i, c] * 1.0001
+        engine.update(int(ts[i]) + 1, single, indicators)
+        single[c] = np.nan
+    per_coin = time.perf_counter() - start
+
+    timed = n_ticks - warmup
+    return (snapshot / timed * 1e6, per_coin / timed * 1e6,
+            loop_s / timed * 1e6 if loop is not None else None, fired)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", nargs="*", type=int, default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--coins", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=2000, help="snapshots, half of them warm-up")
+    parser.add_argument("--loop-max", type=int, default=10000)
+    args = parser.parse_args()
+
+    coins = coin_names(args.coins)
+    ts, prices = random_walk(args.ticks, coins)
+    values = np.column_stack([prices[c] for c in coins])
+    print(f"{args.coins} coins, {args.ticks} snapshots 10 s apart")
+    print(f"{'rules':>7}{'snapshot us':>13}{'1-coin us':>11}{'loop us':>10}{'fired':>8}")
+    for n in args.rules:
+        snapshot, single, loop, fired = run(make_rules(n, coins, values[0]), coins, ts, values, args.loop_max)
+        loop = f"{loop:>10.0f}" if loop is not None else f"{'-':>10}"
+        print(f"{n:>7}{snapshot:>13.1f}{single:>11.1f}{loop}{fired:>8}")
+
+
+if __name__ == "__main__":
+    main()
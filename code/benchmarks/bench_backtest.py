@@ -0,0 +1,41 @@
+# benchmarks/bench_backtest.py
+#
+# Scaling of utils.backtest.run_backtests with the number of worker
+# processes, on a synthetic random-walk history (one tick a minute per coin)
+# so the result does not depend on what has been collected so far.
+#
+#   cd code
+#   python -m benchmarks.bench_backtest --days 30 --workers 1 2 4 8
+#
+# Speedup is against the in-process run (--workers 1 is always measured).
+import argparse
+import os
+
+from benchmarks.synthetic import coin_names, random_walk
+from utils.backtest import run_backtests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--coins", type=int, default=4)
+    parser.add_argument("--workers", nargs="*", type=int, default=None)
+    parser.add_argument("--models", nargs="*", default=None)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, *(args.workers or [2, 4, cpus])})
+    coins = coin_names(args.coins)
+    ts, prices = random_walk(int(args.days * 1440), coins, step=60.0)
+    print(f"{len(ts)} ticks x {len(coins)} coins, {cpus} CPUs")
+
+    base = None
+    for workers in counts:
+        _, summary = run_backtests(ts, prices, models=args.models, workers=workers)
+        base = base or summary["wall_s"]
+        print(f"workers {workers:>3}: {summary['wall_s']:7.2f} s  {summary['points_per_s']:>10.0f} points/s  "
+              f"speedup {base / summary['wall_s']:5.2f}x  efficiency {summary['efficiency']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
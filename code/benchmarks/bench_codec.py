@@ -0,0 +1,63 @@
+# benchmarks/bench_codec.py
+#
+# Encode/decode cost per tick and bytes on the wire: the JSON envelope the
+# publishers used to send vs the binary format in utils/wire_codec.py.
+#
+#   cd code
+#   python -m benchmarks.bench_codec
+import argparse
+import json
+import time
+from datetime import datetime
+
+from utils.wire_codec import FORMAT_BINARY, FORMAT_JSON, decode_tick, encode_price, encode_tick
+
+
+def per_call_ns(fn, n):
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100_000)
+    args = parser.parse_args()
+
+    timestamp = datetime.now().isoformat()
+    timestamp_ns = time.time_ns()
+    prices = {"bitcoin": 106043.0, "ethereum": 2618.17, "dogecoin": 0.196011, "solana": 160.44}
+
+    # Baseline: what zenoh_pub / zenoh_sub_dash did before
+    legacy = json.dumps({"timestamp": timestamp, "prices": prices}).encode()
+    results = [("legacy json.dumps/loads", len(legacy),
+                per_call_ns(lambda: json.dumps({"timestamp": timestamp, "prices": prices}).encode(), args.n),
+                per_call_ns(lambda: json.loads(legacy.decode()), args.n))]
+
+    for fmt in (FORMAT_JSON, FORMAT_BINARY):
+        payload = encode_tick(timestamp, prices, fmt=fmt)
+        assert decode_tick(payload).as_dict() == prices
+        results.append((f"wire_codec {fmt}", len(payload),
+                        per_call_ns(lambda: encode_tick(timestamp, prices, fmt=fmt), args.n),
+                        per_call_ns(lambda: decode_tick(payload), args.n)))
+    # Publishers that already hold epoch-ns skip the ISO parse
+    payload = encode_tick(timestamp_ns, prices)
+    results.append(("wire_codec binary, ns ts", len(payload),
+                    per_call_ns(lambda: encode_tick(timestamp_ns, prices), args.n),
+                    per_call_ns(lambda: decode_tick(payload), args.n)))
+    # One coin on its own key, crypto/prices/bitcoin, as the publishers send now
+    key = "crypto/prices/bitcoin"
+    payload = encode_price(timestamp_ns, "bitcoin", prices["bitcoin"])
+    assert decode_tick(payload, key).as_dict() == {"bitcoin": prices["bitcoin"]}
+    results.append(("per-coin binary, 1 coin", len(payload),
+                    per_call_ns(lambda: encode_price(timestamp_ns, "bitcoin", prices["bitcoin"]), args.n),
+                    per_call_ns(lambda: decode_tick(payload, key), args.n)))
+
+    print(f"{'codec':<26}{'bytes':>8}{'encode ns':>12}{'decode ns':>12}")
+    for name, size, enc, dec in results:
+        print(f"{name:<26}{size:>8}{enc:>12.0f}{dec:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_dashboard.py
+#
+# Bytes and milliseconds the dashboard spends per new tick: the old single
+# update_dashboard callback (every figure, the gauge, the table and the news
+# cards rebuilt and re-sent) vs the split callbacks in zenoh_sub_dash, where a
+# tick sends a Patch with the new history point plus the price card.
+#
+#   cd code
+#   python -m benchmarks.bench_dashboard
+#
+# measure() starts the dashboard's subscriber threads; nothing publishes
+# during the run, so only the synthetic ticks below reach the dashboard.
+import argparse
+import time
+
+import numpy as np
+
+from utils.callback_stats import payload_size
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def measure(dash_app, history=5000, length=200, ticks=50):
+    """ms and bytes per tick for the full rebuild vs the Patch path, and for
+    the cached forecast panel."""
+    dash_app.start_services()
+    coin = "bitcoin"
+    ring = dash_app.price_history[coin]
+    rng = np.random.default_rng(1)
+    now = time.time_ns()
+    ts = now - np.arange(history, 0, -1, dtype=np.int64) * 10_000_000_000
+    ring.extend(ts, 100000 + rng.normal(0, 50, history).cumsum())
+
+    def new_tick(i):
+        t = now + (i + 1) * 10_000_000_000
+        price = float(ring.last()[1] + rng.normal(0, 50))
+        ring.append(t, price)
+        dash_app.history_cache.bump([coin])
+        dash_app.forecast_cache.bump([coin])
+
+    def full_rebuild():
+        # What update_dashboard computed and sent on every interval
+        view = dash_app.build_history_view(coin, length)["figure"]
+        forecast = dash_app.build_forecast_view(coin)
+        card = dash_app.build_price_card(coin)
+        news = dash_app.update_news.__wrapped__(0, coin)
+        return [card, forecast["summary_card"], view, forecast["pred_fig"],
+                forecast["gauge_fig"], forecast["table_data"], news]
+
+    _, cursor = dash_app.render_history(coin, length, 'points')
+    before_ms, before_bytes = [], []
+    after_ms, after_bytes = [], []
+    for i in range(ticks):
+        new_tick(i)
+        result, ms = timed(full_rebuild)
+        before_ms.append(ms)
+        before_bytes.append(payload_size(result))
+
+        (patch, cursor), ms = timed(dash_app.extend_history.__wrapped__,
+                                    i, coin, length, 'points', cursor)
+        card, card_ms = timed(dash_app.update_price_card.__wrapped__, i, None, coin)
+        after_ms.append(ms + card_ms)
+        after_bytes.append(payload_size(patch) + payload_size(card))
+
+    # The forecast panel still goes out once per tick, from the cache
+    forecast, forecast_ms = timed(dash_app.update_forecast.__wrapped__, 0, None, coin, None)
+    return {"full_rebuild_ms": float(np.mean(before_ms)), "full_rebuild_bytes": float(np.mean(before_bytes)),
+            "patch_ms": float(np.mean(after_ms)), "patch_bytes": float(np.mean(after_bytes)),
+            "forecast_ms": forecast_ms, "forecast_bytes": payload_size(forecast)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=5000, help="ticks preloaded")
+    parser.add_argument("--length", type=int, default=200, help="history slider value")
+    parser.add_argument("--ticks", type=int, default=50)
+    args = parser.parse_args()
+
+    import zenoh_sub_dash as dash_app
+
+    r = measure(dash_app, args.history, args.length, args.ticks)
+    print(f"{args.history} ticks held, slider={args.length}, {args.ticks} new ticks")
+    print(f"{'path':<34}{'ms/tick':>10}{'bytes/tick':>12}")
+    print(f"{'full rebuild (update_dashboard)':<34}{r['full_rebuild_ms']:>10.2f}{r['full_rebuild_bytes']:>12.0f}")
+    print(f"{'history Patch + price card':<34}{r['patch_ms']:>10.2f}{r['patch_bytes']:>12.0f}")
+    print(f"{'forecast panel (cached)':<34}{r['forecast_ms']:>10.2f}{r['forecast_bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()
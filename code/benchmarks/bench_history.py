@@ -0,0 +1,159 @@
+# benchmarks/bench_history.py
+#
+# A cold consumer backfilling from the Zenoh history service (utils/
+# history_service.py). The parent writes a synthetic tick store, then starts
+# two fresh interpreters that talk over a local Zenoh peer link:
+#
+#   server  HistoryService over the store
+#   client  backfill_store() of the whole history into an empty store, then
+#           the same last-N query twice (the repeat is served from the cache)
+#
+# Both report their resident memory before the transfer and at its peak, to
+# show it stays flat while the history grows.
+#
+#   cd code
+#   python -m benchmarks.bench_history --rows 1000000
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import random_walk
+
+COINS = ["bitcoin", "ethereum", "dogecoin", "solana"]
+
+
+def anon_mb():
+    """Resident anonymous memory: the heap, without mapped store pages."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class PeakMemory:
+    """Highest anon_mb() seen, sampled every few milliseconds."""
+
+    def __init__(self, interval=0.005):
+        self.start = self.peak = anon_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.peak = max(self.peak, anon_mb())
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return max(self.peak, anon_mb())
+
+
+def open_session(port, listen):
+    import zenoh
+    config = zenoh.Config()
+    config.insert_json5("scouting/multicast/enabled", "false")
+    config.insert_json5("listen/endpoints" if listen else "connect/endpoints",
+                        json.dumps([f"tcp/127.0.0.1:{port}"]))
+    return zenoh.open(config)
+
+
+def serve(args):
+    from utils.history_service import HistoryService
+
+    session = open_session(args.port, listen=True)
+    service = HistoryService(args.store).start(session)
+    memory = PeakMemory()
+    print("READY", flush=True)
+    sys.stdin.readline()
+    print("RESULT " + json.dumps({"rss_before_mb": memory.start, "peak_mb": memory.stop(), **service.stats()}),
+          flush=True)
+    os._exit(0)
+
+
+def fetch(args):
+    from utils.history_service import backfill_store, read_history
+    from utils.tick_store import TickStore
+
+    session = open_session(args.port, listen=False)
+    time.sleep(1.0)     # let the link come up
+    memory = PeakMemory()
+    start = time.perf_counter()
+    rows = backfill_store(session, args.store)
+    backfill_s = time.perf_counter() - start
+    peak = memory.stop()
+    stored = len(TickStore(args.store))
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        ts, _ = read_history(session, coin="bitcoin", last=5000)
+        timings.append((time.perf_counter() - start) * 1e3)
+    print("RESULT " + json.dumps({"rows": rows, "stored": stored, "backfill_s": backfill_s,
+                                  "rss_before_mb": memory.start, "peak_mb": peak,
+                                  "last_n_rows": len(ts), "cold_ms": timings[0], "cached_ms": timings[1]}),
+          flush=True)
+    os._exit(0)
+
+
+def result(proc_output):
+    line = [l for l in proc_output.splitlines() if l.startswith("RESULT ")]
+    return json.loads(line[0][7:]) if line else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--port", type=int, default=7499)
+    parser.add_argument("--role", choices=["server", "client"], default=None)
+    parser.add_argument("--store", default=None)
+    args = parser.parse_args()
+    if args.role == "server":
+        return serve(args)
+    if args.role == "client":
+        return fetch(args)
+
+    from utils.tick_store import TickWriter
+
+    code_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=code_dir)
+    child = [sys.executable, "-m", "benchmarks.bench_history", "--port", str(args.port)]
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "server.ticks")
+        ts, prices = random_walk(args.rows, COINS)
+        with TickWriter(source, COINS, batch_size=4096, flush_interval=float("inf")) as writer:
+            writer.append_columns(ts, prices)
+        size_mb = os.path.getsize(source) / 2 ** 20
+
+        server = subprocess.Popen(child + ["--role", "server", "--store", source], cwd=code_dir, env=env,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        while server.stdout.readline().strip() != "READY":
+            if server.poll() is not None:
+                sys.exit("history server did not start")
+        client = subprocess.run(child + ["--role", "client", "--store", os.path.join(tmp, "client.ticks")],
+                                cwd=code_dir, env=env, capture_output=True, text=True, timeout=1800)
+        served, _ = server.communicate("\n", timeout=60)
+        c, s = result(client.stdout), result(served)
+        if c is None or s is None:
+            print(client.stdout[-2000:], client.stderr[-2000:], served[-2000:])
+            sys.exit(1)
+
+    print(f"store: {args.rows} ticks x {len(COINS)} coins, {size_mb:.1f} MB")
+    print(f"backfill: {c['rows']} rows in {c['backfill_s']:.2f} s "
+          f"({c['rows'] / c['backfill_s']:.0f} rows/s), {c['stored']} rows in the client store")
+    print(f"client anon RSS: {c['rss_before_mb']:.1f} MB before, {c['peak_mb']:.1f} MB peak "
+          f"(+{c['peak_mb'] - c['rss_before_mb']:.1f} MB)")
+    print(f"server anon RSS: {s['rss_before_mb']:.1f} MB before, {s['peak_mb']:.1f} MB peak "
+          f"(+{s['peak_mb'] - s['rss_before_mb']:.1f} MB)")
+    print(f"last {c['last_n_rows']} bitcoin: {c['cold_ms']:.1f} ms cold, {c['cached_ms']:.1f} ms cached "
+          f"(server cache hits={s['hits']} misses={s['misses']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# benchmarks/bench_push_latency.py
+#
+# End-to-end latency from a publisher's session.put() to the tick arriving
+# on the dashboard's server-sent events stream (/stream/ticks), in-process:
+# the dashboard's Flask server runs on a local port, a second Zenoh session
+# publishes, and an HTTP client reads the stream like a browser would.
+#
+#   cd code
+#   python -m benchmarks.bench_push_latency
+#
+# The browser side adds JSON parsing and one Plotly extendTraces; open the
+# dashboard and inspect window.liveTickLatency to see the full figure.
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+import requests
+import zenoh
+from werkzeug.serving import make_server
+
+from utils.universe import price_key
+from utils.wire_codec import encode_price
+
+
+def measure(dash_app, n=50, period=0.6, port=8099, coin="bitcoin"):
+    """Publish n ticks `period` seconds apart and return the put -> SSE client
+    latency of each one that arrived, in ms."""
+    dash_app.start_services()
+    server = make_server("127.0.0.1", port, dash_app.app.server, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    received = {}           # tick ns -> perf_counter at receipt
+    ready = threading.Event()
+
+    def read_stream():
+        url = f"http://127.0.0.1:{port}/stream/ticks?coins={coin}"
+        with requests.get(url, stream=True, timeout=30) as resp:
+            ready.set()
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith("data: "):
+                    now = time.perf_counter()
+                    for ns in json.loads(line[6:])["ticks"][coin]["ns"]:
+                        received[int(ns)] = now
+
+    threading.Thread(target=read_stream, daemon=True).start()
+    ready.wait(10)
+
+    # Give the dashboard's subscriber time to join before publishing
+    session = zenoh.open(zenoh.Config())
+    time.sleep(2.0)
+    sent = {}
+    price = 100000.0
+    for i in range(n):
+        ts = time.time_ns()
+        payload = encode_price(ts, coin, price + i)
+        sent[ts] = time.perf_counter()
+        session.put(price_key(coin), payload)
+        time.sleep(period)
+    time.sleep(1.0)
+    session.close()
+    server.shutdown()
+    return np.array([(received[ts] - t) * 1000 for ts, t in sent.items() if ts in received])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50, help="ticks to publish")
+    parser.add_argument("--period", type=float, default=0.6, help="seconds between ticks")
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    import zenoh_sub_dash as dash_app
+
+    latencies = measure(dash_app, args.n, args.period, args.port)
+    print(f"{len(latencies)}/{args.n} ticks received, push rate limit {dash_app.PUSH_MAX_RATE}/s")
+    if len(latencies):
+        print(f"put -> SSE client latency ms: p50 {np.percentile(latencies, 50):.1f}  "
+              f"p99 {np.percentile(latencies, 99):.1f}  max {latencies.max():.1f}")
+    print(dash_app.tick_broadcaster.stats())
+
+
+if __name__ == "__main__":
+    main()
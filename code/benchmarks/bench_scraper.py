@@ -0,0 +1,92 @@
+# benchmarks/bench_scraper.py
+#
+# CPU time and peak memory per scrape: BeautifulSoup path vs the raw-byte
+# fast path in scraper_pub, on a saved CoinMarketCap page.
+#
+#   cd code
+#   python -m benchmarks.bench_scraper                      # synthetic fixture
+#   python -m benchmarks.bench_scraper --fixture page.html  # a real saved page
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+
+from scraper_pub import extract_prices_bs, extract_prices_fast
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "coinmarketcap.html")
+
+
+def make_fixture(path, coins=500, seed=1):
+    """Write a page shaped like coinmarketcap.com: lots of markup and scripts,
+    then a large window.__INITIAL_STATE__ blob whose listing starts with BTC/ETH."""
+    rng = random.Random(seed)
+    symbols = ["BTC", "ETH"] + [f"C{i:03d}" for i in range(coins - 2)]
+    listing = [{
+        "id": i + 1, "name": sym.title(), "symbol": sym, "slug": sym.lower(),
+        "cmcRank": i + 1, "tags": [f"tag-{rng.randrange(50)}" for _ in range(8)],
+        "quote": {"USD": {
+            "price": rng.uniform(0.01, 100000), "volume24h": rng.uniform(1e6, 1e10),
+            "percentChange1h": rng.uniform(-5, 5), "percentChange24h": rng.uniform(-10, 10),
+            "marketCap": rng.uniform(1e7, 1e12), "lastUpdated": "2025-06-04T03:03:21.000Z",
+        }},
+        "sparkline": [rng.uniform(0, 1) for _ in range(40)],
+    } for i, sym in enumerate(symbols)]
+    state = {
+        "app": {"locale": "en-US", "theme": "day"},
+        "cryptocurrency": {"listingLatest": {"page": 1, "sort": "rank", "data": listing}},
+        "news": [{"title": "Headline %d" % i, "body": "x" * 400} for i in range(200)],
+    }
+    rows = "".join(f'<tr><td>{i}</td><td><a href="/currencies/{s.lower()}/">{s}</a></td></tr>'
+                   for i, s in enumerate(symbols))
+    scripts = "".join(f"<script>var chunk{i} = {json.dumps(['v' * 50] * 20)};</script>"
+                      for i in range(100))
+    html = (f"<html><head><title>Cryptocurrency Prices</title>{scripts}</head><body>"
+            f"<table>{rows}</table><script>window.__INITIAL_STATE__ = {json.dumps(state)};</script>"
+            f"</body></html>")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def measure(fn, arg, repeat):
+    # CPU time without tracing, then one traced run for peak allocations
+    start = time.process_time()
+    for _ in range(repeat):
+        result = fn(arg)
+    cpu = (time.process_time() - start) / repeat
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, cpu, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.fixture):
+        make_fixture(args.fixture)
+    with open(args.fixture, "rb") as f:
+        raw = f.read()
+    print(f"[BENCH] fixture {args.fixture} ({len(raw) / 1e6:.1f} MB)")
+
+    cases = [("default symbols", None), ("last listed symbol", {"c497": "c497"})]
+    for label, symbols in cases:
+        slow, slow_cpu, slow_peak = measure(
+            lambda page: extract_prices_bs(page.decode("utf-8"), symbols), raw, args.repeat)
+        fast, fast_cpu, fast_peak = measure(
+            lambda page: extract_prices_fast(page, symbols), raw, args.repeat)
+        if slow != fast:
+            print(f"[BENCH] MISMATCH {slow} != {fast}")
+        print(f"[BENCH] {label}: bs4 {slow_cpu * 1e3:8.1f} ms {slow_peak / 1e6:7.1f} MB | "
+              f"fast {fast_cpu * 1e3:8.2f} ms {fast_peak / 1e6:7.2f} MB | "
+              f"{slow_cpu / max(fast_cpu, 1e-9):.0f}x CPU")
+
+
+if __name__ == "__main__":
+    main()
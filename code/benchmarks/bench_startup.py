@@ -0,0 +1,96 @@
+# benchmarks/bench_startup.py
+#
+# Time from a dashboard restart to its first useful render, for growing
+# amounts of persisted history. Each size gets a scratch directory holding
+# what a previous run leaves behind (tick store plus rollup pyramid), and a
+# fresh interpreter there imports zenoh_sub_dash, opens the store, runs
+# start_services() (which tail-reads the last WARM_START_POINTS per coin)
+# and renders the history chart, forecast panel and price card for bitcoin.
+#
+#   cd code
+#   python -m benchmarks.bench_startup --sizes 10000 100000 1000000
+#
+# "full read" is what loading the whole store would cost instead; the
+# startup figures should stay flat while it grows with the history.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import random_walk
+from utils.history_query import HistoryQuery
+from utils.rollup import Rollup, save_rollups
+from utils.tick_store import TickWriter
+
+COINS = ["bitcoin", "ethereum", "dogecoin", "solana"]
+
+CHILD = """
+import json, os, time
+t0 = time.perf_counter()
+import zenoh_sub_dash as d
+t1 = time.perf_counter()
+d.init_csv()
+d.init_store()
+t2 = time.perf_counter()
+d.start_services()
+t3 = time.perf_counter()
+_, cursor = d.render_history("bitcoin", 200, "points")
+forecast = d.update_forecast.__wrapped__(0, None, "bitcoin", None)
+card = d.update_price_card.__wrapped__(0, None, "bitcoin")
+t4 = time.perf_counter()
+print("RESULT " + json.dumps({"import_ms": (t1 - t0) * 1e3, "open_ms": (t2 - t1) * 1e3,
+                              "warm_ms": (t3 - t2) * 1e3, "render_ms": (t4 - t3) * 1e3,
+                              "points": cursor["points"]}), flush=True)
+os._exit(0)
+"""
+
+
+def make_history(directory, rows, batch=4096):
+    """What a previous run leaves behind: store plus rollup pyramid."""
+    ts, prices = random_walk(rows, COINS)
+    store = os.path.join(directory, "crypto_prices.ticks")
+    with TickWriter(store, COINS, batch_size=batch, flush_interval=float("inf")) as writer:
+        for start in range(0, rows, batch):
+            end = min(rows, start + batch)
+            writer.append_many(ts[start:end], [{c: prices[c][i] for c in COINS} for i in range(start, end)])
+    rollups = {c: Rollup() for c in COINS}
+    for c in COINS:
+        rollups[c].extend(ts, prices[c])
+    save_rollups(os.path.join(directory, "crypto_prices.rollup"), rollups)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="*", type=int, default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    code_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=code_dir)
+    print(f"{'rows':>10}{'import ms':>11}{'open ms':>9}{'warm ms':>9}{'render ms':>11}"
+          f"{'restart->render ms':>20}{'full read ms':>14}")
+    for rows in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = make_history(tmp, rows)
+            start = time.perf_counter()
+            HistoryQuery(store).query(COINS)
+            full_ms = (time.perf_counter() - start) * 1e3
+
+            start = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", CHILD], cwd=tmp, env=env,
+                                 capture_output=True, text=True, timeout=300)
+            wall_ms = (time.perf_counter() - start) * 1e3
+            line = [l for l in out.stdout.splitlines() if l.startswith("RESULT ")]
+            if not line:
+                print(out.stdout[-2000:], out.stderr[-2000:])
+                continue
+            r = json.loads(line[0][7:])
+            print(f"{rows:>10}{r['import_ms']:>11.0f}{r['open_ms']:>9.0f}{r['warm_ms']:>9.0f}"
+                  f"{r['render_ms']:>11.0f}{wall_ms:>20.0f}{full_ms:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmarks/bench_universe.py
+#
+# What one price snapshot costs the dashboard's ingest path as the symbol
+# universe grows. Each (size, path) runs in a fresh interpreter in a scratch
+# directory, with a generated universe in $CRYPTO_UNIVERSE:
+#
+#   per-coin  one crypto/prices/<coin> message per coin, as the publishers
+#             send them, through zenoh_sub_dash.apply_batch(): decode, merge
+#             into one price vector, validate_row(), PriceMatrix, and rollups
+#             and trend models for the active coins only (no store writer)
+#   combined  the old path: one JSON blob for every coin on crypto/prices,
+#             validate() and a PriceRing, Rollup and trend model per coin
+#
+# Reported per snapshot after a warm-up, with the anonymous RSS (heap, not
+# mapped files) of the process at the end. "activate" is the time to build
+# a coin outside the initial active set when a chart first asks for it.
+#
+#   cd code
+#   python -m benchmarks.bench_universe --sizes 4 100 500
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import coin_names, random_walk
+
+
+def snapshots(coins, n):
+    ts, prices = random_walk(n, coins)
+    return ts.tolist(), [[float(prices[c][i]) for c in coins] for i in range(n)]
+
+
+def run_per_coin(coins, ts, rows, warmup):
+    import zenoh_sub_dash as d
+    from utils.universe import price_key
+    from utils.wire_codec import encode_price
+
+    keys = [price_key(c) for c in coins]
+    batches = [[(key, encode_price(t, c, p)) for key, c, p in zip(keys, coins, row)]
+               for t, row in zip(ts, rows)]
+    d.init_rollups()
+    for batch in batches[:warmup]:
+        d.apply_batch(batch)
+    start = time.perf_counter()
+    for batch in batches[warmup:]:
+        d.apply_batch(batch)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    d.activate(coins[-1])
+    return elapsed, {"activate_ms": (time.perf_counter() - start) * 1e3, "active": len(d.active_coins),
+                     "capacity": d.HISTORY_CAPACITY}
+
+
+def run_combined(coins, ts, rows, warmup):
+    import zenoh_sub_dash as d
+    from utils.forecasting import ForecastEngine
+    from utils.ring_buffer import PriceRing
+    from utils.rollup import Rollup
+    from utils.tick_validator import TickValidator
+    from utils.wire_codec import decode_tick, encode_tick
+
+    rings = {c: PriceRing(d.HISTORY_CAPACITY) for c in coins}
+    rollups = {c: Rollup() for c in coins}
+    engine = ForecastEngine(coins, models=[d.FORECAST_MODEL], params=d.FORECAST_PARAMS)
+    validator = TickValidator(coins)
+    payloads = [encode_tick(t, dict(zip(coins, row))) for t, row in zip(ts, rows)]
+
+    def apply(payload):
+        # What apply_batch did per tick before per-coin keys
+        tick = decode_tick(payload)
+        prices = validator.validate(tick.timestamp, tick.as_dict(), "crypto/prices")
+        for coin in coins:
+            price = prices.get(coin)
+            if price is not None:
+                rings[coin].append(tick.timestamp, price)
+                rollups[coin].update(tick.timestamp, price)
+        engine.update(tick.timestamp, prices)
+
+    for payload in payloads[:warmup]:
+        apply(payload)
+    start = time.perf_counter()
+    for payload in payloads[warmup:]:
+        apply(payload)
+    return time.perf_counter() - start, {}
+
+
+def child(args):
+    from benchmarks.bench_history import anon_mb
+    from utils.log import flush as log_flush
+
+    coins = coin_names(args.coins)
+    ts, rows = snapshots(coins, args.ticks)
+    run = run_per_coin if args.path == "per-coin" else run_combined
+    elapsed, extra = run(coins, ts, rows, args.ticks // 2)
+    timed = args.ticks - args.ticks // 2
+    log_flush()     # queued log lines would otherwise land inside the RESULT line
+    print("RESULT " + json.dumps({"ms": elapsed / timed * 1e3, "rss_mb": anon_mb(), **extra}), flush=True)
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="*", type=int, default=[4, 100, 500])
+    parser.add_argument("--ticks", type=int, default=400, help="snapshots, half of them warm-up")
+    parser.add_argument("--coins", type=int, default=None)
+    parser.add_argument("--path", choices=["per-coin", "combined"], default=None)
+    args = parser.parse_args()
+    if args.path:
+        return child(args)
+
+    code_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'coins':>6}  {'path':<9}{'ms/snapshot':>12}{'us/coin':>9}{'anon RSS MB':>13}  notes")
+    for n in args.sizes:
+        for path in ("combined", "per-coin"):
+            with tempfile.TemporaryDirectory() as tmp:
+                universe = os.path.join(tmp, "universe.json")
+                with open(universe, "w") as f:
+                    json.dump(coin_names(n), f)
+                env = dict(os.environ, PYTHONPATH=code_dir, CRYPTO_UNIVERSE=universe)
+                out = subprocess.run([sys.executable, "-m", "benchmarks.bench_universe", "--coins", str(n),
+                                      "--path", path, "--ticks", str(args.ticks)],
+                                     cwd=tmp, env=env, capture_output=True, text=True, timeout=900)
+            line = [l for l in out.stdout.splitlines() if l.startswith("RESULT ")]
+            if not line:
+                print(out.stdout[-2000:], out.stderr[-2000:])
+                continue
+            r = json.loads(line[0][7:])
+            notes = ""
+            if "activate_ms" in r:
+                notes = (f"{r['active']} active, ring capacity {r['capacity']}, "
+                         f"activate {r['activate_ms']:.0f} ms")
+            print(f"{n:>6}  {path:<9}{r['ms']:>12.2f}{r['ms'] * 1e3 / n:>9.1f}{r['rss_mb']:>13.0f}  {notes}")
+
+
+if __name__ == "__main__":
+    main()
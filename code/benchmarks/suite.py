@@ -0,0 +1,304 @@
+# benchmarks/suite.py
+#
+# Reproducible benchmark suite for the ingest -> store -> predict -> render
+# pipeline, on synthetic ticks (benchmarks/synthetic.py) with a configurable
+# number of coins and publish rate. Each stage is timed next to the code it
+# replaced, so a result file also shows how far from the baseline we are:
+#
+#   decode    legacy JSON envelope vs utils.wire_codec binary, ns per tick
+#   store     per-tick CSV append (old append_to_csv) vs TickWriter, us per tick
+#   load      pandas read_csv + clean vs analyze_and_predict.load_clean, ms
+#   fit       per-coin sklearn LinearRegression vs predict_all and the
+#             forecast engine, ms
+#   metrics   utils.metrics observe/inc and a rate-limited utils.log call, ns
+#   render    dashboard callbacks per new tick (benchmarks/bench_dashboard)
+#   e2e       put into a local Zenoh peer -> tick on the dashboard's SSE
+#             stream, latency percentiles (benchmarks/bench_push_latency)
+#
+# Results are written as JSON (metadata plus {case: {metric: value}}).
+# Compare a run against an older file to catch regressions; the exit status
+# is 1 if any metric got worse by more than --threshold:
+#
+#   cd code
+#   python -m benchmarks.suite --coins 4 --rate 5 --out before.json
+#   python -m benchmarks.suite --coins 4 --rate 5 --compare before.json
+#
+# Metrics ending in _per_s are better when higher, all others when lower.
+import argparse
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import binary_table, coin_names, random_walk, tick_stream
+from utils.tick_store import FSYNC_BATCH, TickWriter, from_epoch_ns, repr_price
+from utils.wire_codec import decode_tick, encode_tick
+
+CASES = {}
+
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def best_of(fn, repeat=5):
+    """Fastest of `repeat` calls, in seconds (the least disturbed run)."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# ==== Micro-benchmarks ====
+@case("decode")
+def bench_decode(args, tmp):
+    coins = coin_names(args.coins)
+    table = binary_table(coins)
+    payloads = [(json.dumps({"timestamp": from_epoch_ns(ts), "prices": prices}).encode(),
+                 encode_tick(ts, prices, table_id=table))
+                for ts, prices in tick_stream(args.ticks, coins)]
+    legacy = [p for p, _ in payloads]
+    binary = [p for _, p in payloads]
+
+    def legacy_decode():
+        for payload in legacy:
+            data = json.loads(payload.decode())
+            data["timestamp"], data["prices"]
+
+    def binary_decode():
+        for payload in binary:
+            decode_tick(payload).as_dict()
+
+    n = len(payloads)
+    return {"legacy_json_ns": best_of(legacy_decode) / n * 1e9,
+            "binary_ns": best_of(binary_decode) / n * 1e9,
+            "binary_bytes": len(binary[0]), "legacy_json_bytes": len(legacy[0])}
+
+
+@case("store")
+def bench_store(args, tmp):
+    coins = coin_names(args.coins)
+    ticks = list(tick_stream(args.ticks, coins))
+    csv_path = os.path.join(tmp, "append.csv")
+    store_path = os.path.join(tmp, "append.ticks")
+
+    def legacy_append():
+        # One open and one row per tick, as append_to_csv did
+        for ts, prices in ticks:
+            with open(csv_path, "a", newline="") as f:
+                csv.writer(f).writerow([from_epoch_ns(ts)] + [repr_price(prices[c]) for c in coins])
+
+    def store_append():
+        if os.path.exists(store_path):
+            os.remove(store_path)
+        with TickWriter(store_path, coins, fsync=FSYNC_BATCH) as writer:
+            for ts, prices in ticks:
+                writer.append(ts, prices)
+
+    n = len(ticks)
+    return {"legacy_csv_us": best_of(legacy_append, 3) / n * 1e6,
+            "tick_writer_us": best_of(store_append, 3) / n * 1e6}
+
+
+def _history_files(args, tmp):
+    """A synthetic store and its CSV mirror with --rows ticks (at least the
+    four coins analyze_and_predict knows)."""
+    coins = coin_names(max(args.coins, 4))
+    store_path = os.path.join(tmp, "history.ticks")
+    csv_path = os.path.join(tmp, "history.csv")
+    if not os.path.exists(store_path):
+        ts, prices = random_walk(args.rows, coins)
+        with TickWriter(store_path, coins, csv_mirror=csv_path, batch_size=65536,
+                        flush_interval=float("inf")) as writer:
+            writer.append_many(ts, [{c: prices[c][i] for c in coins} for i in range(len(ts))])
+    return coins, store_path, csv_path
+
+
+def _use_store(store_path):
+    import analyze_and_predict as ap
+    ap.TICK_STORE_FILE = store_path
+    ap._history = None
+    ap._engines.clear()
+    return ap
+
+
+def _legacy_load(csv_path, coins):
+    import pandas as pd
+    df = pd.read_csv(csv_path).dropna()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce", format="ISO8601")
+    df = df.dropna(subset=["timestamp"])
+    return df[(df["bitcoin_usd"] > 1000) & (df["ethereum_usd"] > 100) &
+              (df["solana_usd"] > 1) & (df["dogecoin_usd"] < 1)]
+
+
+@case("load")
+def bench_load(args, tmp):
+    coins, store_path, csv_path = _history_files(args, tmp)
+    ap = _use_store(store_path)
+    ap.get_history()
+    return {"rows": args.rows,
+            "legacy_pandas_ms": best_of(lambda: _legacy_load(csv_path, coins), 3) * 1e3,
+            "load_clean_ms": best_of(ap.load_clean) * 1e3}
+
+
+@case("fit")
+def bench_fit(args, tmp):
+    from sklearn.linear_model import LinearRegression
+
+    coins, store_path, csv_path = _history_files(args, tmp)
+    ap = _use_store(store_path)
+    df = _legacy_load(csv_path, coins)
+    ordinal = df["timestamp"].map(datetime.toordinal).to_frame()
+
+    def legacy_fit():
+        for coin in ap.COINS:
+            LinearRegression().fit(ordinal, df[f"{coin}_usd"])
+
+    data = ap.load_clean()
+
+    def engine_fit():
+        engine = ap.ForecastEngine(ap.COINS, models=["linear"])
+        for coin in ap.COINS:
+            engine.fit(coin, data["timestamp"], data[coin])
+
+    return {"rows": args.rows,
+            "legacy_sklearn_ms": best_of(legacy_fit) * 1e3,
+            "predict_all_ms": best_of(lambda: ap.predict_all(ap.COINS)) * 1e3,
+            "engine_fit_ms": best_of(engine_fit) * 1e3}
+
+
+@case("metrics")
+def bench_metrics(args, tmp):
+    from utils.log import Logger
+    from utils.metrics import Counter, Histogram
+
+    histogram = Histogram("bench_seconds", "bench").labels()
+    count = Counter("bench", "bench").labels()
+    # Over its rate limit after the burst, as a log line in a hot loop would be
+    log = Logger("BENCH", rate=0.0, burst=0)
+    n = args.ticks
+    return {"histogram_observe_ns": best_of(lambda: [histogram.observe(1e-4) for _ in range(n)]) / n * 1e9,
+            "counter_inc_ns": best_of(lambda: [count.inc() for _ in range(n)]) / n * 1e9,
+            "log_suppressed_ns": best_of(lambda: [log.info("bench") for _ in range(n)]) / n * 1e9}
+
+
+# ==== Dashboard ====
+def _dash_app():
+    # Starts the dashboard's subscriber and background threads
+    import zenoh_sub_dash
+    zenoh_sub_dash.start_services()
+    return zenoh_sub_dash
+
+
+@case("render")
+def bench_render(args, tmp):
+    from benchmarks import bench_dashboard
+    return bench_dashboard.measure(_dash_app(), history=args.rows, ticks=50)
+
+
+@case("e2e")
+def bench_e2e(args, tmp):
+    from benchmarks import bench_push_latency
+    dash_app = _dash_app()
+    latencies = bench_push_latency.measure(dash_app, n=args.e2e_ticks, period=1.0 / args.rate,
+                                           port=args.port)
+    result = {"rate": args.rate, "sent": args.e2e_ticks, "received": len(latencies),
+              "push_max_rate": dash_app.PUSH_MAX_RATE}
+    if len(latencies):
+        result.update({f"p{q}_ms": float(np.percentile(latencies, q)) for q in (50, 90, 99)})
+        result["max_ms"] = float(latencies.max())
+    return result
+
+
+# ==== Results ====
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"time": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": sys.version.split()[0], "numpy": np.__version__,
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}}
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every metric present in both runs. Returns the
+    number of regressions beyond `threshold` (a fraction)."""
+    regressions = 0
+    print(f"{'metric':<32}{'baseline':>14}{'now':>14}{'change':>9}")
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            worse = -change if metric.endswith("_per_s") else change
+            flag = ""
+            if worse > threshold and not metric.startswith("legacy_"):
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{name + '.' + metric:<32}{old:>14.4g}{value:>14.4g}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tick pipeline")
+    parser.add_argument("cases", nargs="*", default=None, help=f"subset of {list(CASES)}")
+    parser.add_argument("--coins", type=int, default=4, help="coins per tick")
+    parser.add_argument("--rate", type=float, default=5.0, help="end-to-end publish rate, ticks/s")
+    parser.add_argument("--ticks", type=int, default=20_000, help="ticks for the micro-benchmarks")
+    parser.add_argument("--rows", type=int, default=100_000, help="history rows for load/fit/render")
+    parser.add_argument("--e2e-ticks", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--skip", nargs="*", default=[], help="cases to leave out")
+    parser.add_argument("--out", default=None, help="result file (default benchmarks/results/)")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold")
+    args = parser.parse_args()
+
+    names = [n for n in (args.cases or CASES) if n not in args.skip]
+    unknown = set(names) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {sorted(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            print(f"[BENCH] {name} ...")
+            results[name] = CASES[name](args, tmp)
+            print("        " + "  ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                                         for k, v in results[name].items()))
+
+    report = {"meta": metadata(args), "results": results}
+    out = args.out
+    if out is None:
+        os.makedirs(os.path.join("benchmarks", "results"), exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = os.path.join("benchmarks", "results", f"{stamp}-{report['meta']['commit'] or 'local'}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# benchmarks/synthetic.py
+#
+# Synthetic ticks for the benchmarks: geometric random walks for any number
+# of coins, as whole arrays or as a stream paced at a given rate.
+import time
+
+import numpy as np
+
+from utils.wire_codec import SYMBOL_TABLES, register_symbol_table
+
+REAL_COINS = ["bitcoin", "ethereum", "dogecoin", "solana"]
+START_PRICES = {"bitcoin": 100000.0, "ethereum": 2500.0, "dogecoin": 0.2, "solana": 150.0}
+START_EPOCH = 1_750_000_000
+BENCH_TABLE = 0x7F00    # wire_codec symbol table ids from here on are the benchmarks'
+
+
+def coin_names(n):
+    """The four real coins, then coin5, coin6, ... up to n."""
+    return REAL_COINS[:n] + [f"coin{i + 1}" for i in range(len(REAL_COINS), n)]
+
+
+def binary_table(coins):
+    """Register (once) a wire_codec symbol table for `coins` and return its id."""
+    coins = tuple(coins)
+    for table_id, symbols in SYMBOL_TABLES.items():
+        if symbols == coins:
+            return table_id
+    table_id = BENCH_TABLE + len(coins)
+    register_symbol_table(table_id, coins)
+    return table_id
+
+
+def random_walk(n, coins, step=10.0, vol=0.001, seed=0):
+    """n ticks `step` seconds apart: (epoch-ns int64 array, {coin: float64 array})."""
+    rng = np.random.default_rng(seed)
+    ts = ((START_EPOCH + np.arange(n) * step) * 1e9).astype(np.int64)
+    prices = {coin: START_PRICES.get(coin, 10.0 + i) * np.exp(np.cumsum(rng.normal(0, vol, n)))
+              for i, coin in enumerate(coins)}
+    return ts, prices
+
+
+def tick_stream(n, coins, rate=None, seed=0):
+    """Yield n (epoch-ns, {coin: price}) ticks stamped with the current time,
+    `rate` per second (as fast as possible when rate is None)."""
+    _, prices = random_walk(n, coins, seed=seed)
+    period = 1.0 / rate if rate else 0.0
+    due = time.perf_counter()
+    for i in range(n):
+        if period:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            due += period
+        yield time.time_ns(), {coin: float(p[i]) for coin, p in prices.items()}
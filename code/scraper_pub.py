@@ -1,13 +1,37 @@
 import requests
-from bs4 import BeautifulSoup
+import codecs
 import json
+import os
 import re
+import sys
 import time
-import zenoh
+from utils.ingest import IngestScheduler, Source
+from utils.log import get_logger
+from utils.metrics import STAGE_SECONDS, counter, start_metrics_server
+from utils.universe import UNIVERSE, price_key
+from utils.wire_codec import encode_price
 
+log = get_logger("SCRAPER")
+PUBLISH_SECONDS = STAGE_SECONDS.labels(stage="publish")
+PUBLISHED = counter("tracker_published_ticks_total", "Ticks put on crypto/prices/*")
 
-# --- Function: Scrape BTC & ETH from CoinMarketCap ---
-def get_crypto_prices_bs_embedded_json():
+
+# CoinMarketCap ticker -> coin id, from the symbol universe; each coin is
+# published on crypto/prices/<coin id>
+SYMBOLS = UNIVERSE.tickers
+
+STATE_MARKER = b"window.__INITIAL_STATE__"
+LISTING_MARKER = b'"listingLatest"'
+CHUNK_SIZE = 64 * 1024
+
+
+# Prometheus metrics on http://127.0.0.1:<port>/metrics ($METRICS_PORT overrides)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9102))
+
+
+# --- Function: Scrape prices from CoinMarketCap ---
+def get_crypto_prices_bs_embedded_json(http=None, timeout=10, symbols=None, fast=True):
+    http = http or requests
     url = "https://coinmarketcap.com/"
     headers = {
         "User-Agent": "Mozilla/5.0",
@@ -15,13 +39,65 @@ def get_crypto_prices_bs_embedded_json():
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http.get(url, headers=headers, timeout=timeout)
         response.raise_for_status()
     except Exception as e:
-        print("[SCRAPER] Failed to fetch data:", e)
+        log.error("failed to fetch data", error=e)
         return {}
 
-    soup = BeautifulSoup(response.text, "html.parser")
+    if fast:
+        prices = extract_prices_fast(response.content, symbols)
+        if prices is not None:
+            return prices
+    return extract_prices_bs(response.text, symbols)
+
+
+# --- Fast path: scan raw bytes, decode only the listing entries we need ---
+def extract_prices_fast(raw, symbols=None):
+    """Return {coin: price}, or None if the page layout is not recognised."""
+    wanted = dict(SYMBOLS if symbols is None else symbols)
+    state = raw.find(STATE_MARKER)
+    listing = raw.find(LISTING_MARKER, state) if state >= 0 else -1
+    data_key = raw.find(b'"data"', listing) if listing >= 0 else -1
+    pos = raw.find(b"[", data_key) if data_key >= 0 else -1
+    if pos < 0:
+        return None
+
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, offset, src = "", 0, pos + 1
+    prices = {}
+    while wanted:
+        # Skip separators, pulling in more bytes when the buffer runs dry
+        while offset < len(buf) and buf[offset] in " \t\r\n,":
+            offset += 1
+        if offset >= len(buf) or buf[offset] != "]":
+            try:
+                coin, offset = decoder.raw_decode(buf, offset)
+            except json.JSONDecodeError:
+                if src >= len(raw):
+                    return prices or None
+                buf = buf[offset:] + utf8.decode(raw[src:src + CHUNK_SIZE])
+                offset, src = 0, src + CHUNK_SIZE
+                continue
+        else:
+            break  # end of the listing array
+
+        symbol = str(coin.get("symbol", "")).lower() if isinstance(coin, dict) else ""
+        if symbol in wanted:
+            try:
+                # Full precision: sub-cent coins would round to 0
+                prices[wanted.pop(symbol)] = float(coin["quote"]["USD"]["price"])
+            except (KeyError, TypeError, ValueError) as e:
+                log.error("error extracting prices from JSON", error=e)
+    return prices
+
+
+# --- Slow path: full BeautifulSoup parse of the page ---
+def extract_prices_bs(html, symbols=None):
+    from bs4 import BeautifulSoup
+    wanted = SYMBOLS if symbols is None else symbols
+    soup = BeautifulSoup(html, "html.parser")
 
     script_tag = None
     for script in soup.find_all("script"):
@@ -30,19 +106,19 @@ def get_crypto_prices_bs_embedded_json():
             break
 
     if not script_tag:
-        print("[SCRAPER] No script tag with initial state found")
+        log.error("no script tag with initial state found")
         return {}
 
     match = re.search(r"window\.__INITIAL_STATE__\s*=\s*({.*});", script_tag.string, re.DOTALL)
     if not match:
-        print("[SCRAPER] No JSON data found in script")
+        log.error("no JSON data found in script")
         return {}
 
     try:
         json_text = match.group(1)
         data = json.loads(json_text)
     except Exception as e:
-        print("[SCRAPER] Error parsing JSON:", e)
+        log.error("error parsing JSON", error=e)
         return {}
 
     # Extract prices
@@ -51,37 +127,37 @@ def get_crypto_prices_bs_embedded_json():
         listings = data["cryptocurrency"]["listingLatest"]["data"]
         for coin in listings:
             symbol = coin.get("symbol", "").lower()
-            if symbol in ["btc", "eth"]:
-                price = coin["quote"]["USD"]["price"]
-                if symbol == "btc":
-                    prices["bitcoin"] = round(price, 2)
-                elif symbol == "eth":
-                    prices["ethereum"] = round(price, 2)
+            if symbol in wanted:
+                prices[wanted[symbol]] = float(coin["quote"]["USD"]["price"])
     except Exception as e:
-        print("[SCRAPER] Error extracting prices from JSON:", e)
+        log.error("error extracting prices from JSON", error=e)
 
     return prices
 
 # --- Zenoh Publisher Setup ---
 def start_publishing():
     try:
+        import zenoh
+        start_metrics_server(METRICS_PORT)
         z = zenoh.open(zenoh.Config())
-        pub = z.declare_publisher("crypto/prices")
         print("[ZENOH] Publisher ready...")
 
-        while True:
-            prices = get_crypto_prices_bs_embedded_json()
-            if prices:
-                json_str = json.dumps(prices)
-                pub.put(json_str.encode())
-                print("[PUBLISH] Sent:", prices)
-            else:
-                print("[PUBLISH] No prices to send.")
+        def publish(snapshot):
+            # Same per-coin keys and schema as zenoh_pub (see utils/wire_codec.py)
+            start = time.perf_counter()
+            for coin, price in snapshot["prices"].items():
+                z.put(price_key(coin), encode_price(snapshot["timestamp"], coin, price))
+            PUBLISH_SECONDS.observe(time.perf_counter() - start)
+            PUBLISHED.inc()
+            log.info("sent", prices=snapshot["prices"])
 
-            time.sleep(10)  # Scrape every 10 seconds
+        # Scrape every 10 seconds on a fixed-rate clock
+        IngestScheduler([Source("coinmarketcap", get_crypto_prices_bs_embedded_json, timeout=10)],
+                        publish, period=10).run()
 
     except Exception as e:
-        print("[ZENOH ERROR]", e)
+        log.error("publisher stopped", error=e)
+        sys.exit(1)
 
 if __name__ == "__main__":
     start_publishing()
@@ -0,0 +1,5 @@
+# The scripts and utils/ import each other from code/, like `python zenoh_pub.py`
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,22 @@
+import numpy as np
+
+from utils.forecasting import ARForecaster
+
+
+def test_ar_forecast_matches_the_bar_by_bar_recursion():
+    rng = np.random.default_rng(0)
+    t = np.arange(3000) * 30.0
+    model = ARForecaster().fit(t, 100 + np.cumsum(rng.normal(0, 0.1, len(t))))
+    horizon = t[-1] + np.array([3600.0, 60.0, 86400.0, 5.0, 3600.0])
+    got = model.forecast(horizon)
+
+    values = list(model.values)
+    recent = list(np.diff(values[-model.p - 1:])[::-1])
+    level, path = values[-1], []
+    bars = np.maximum(1, np.rint((horizon - model.bars.last_close_t) / model.step).astype(np.int64))
+    for _ in range(bars.max()):
+        change = model.coef[0] + float(np.dot(model.coef[1:], recent))
+        level += change
+        path.append(level)
+        recent = [change] + recent[:-1]
+    np.testing.assert_allclose(got, np.array(path)[bars - 1], rtol=1e-9)
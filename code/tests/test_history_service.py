@@ -0,0 +1,57 @@
+import atexit
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+zenoh = pytest.importorskip("zenoh")
+
+import zenoh_pub
+from utils.history_service import HistoryService, read_history
+from utils.tick_store import TickStore, to_epoch_ns
+from utils.tick_validator import TickValidator
+
+
+@pytest.fixture
+def session():
+    config = zenoh.Config()
+    config.insert_json5("scouting/multicast/enabled", "false")
+    config.insert_json5("listen/endpoints", json.dumps(["tcp/127.0.0.1:0"]))
+    s = zenoh.open(config)
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def publisher(tmp_path, monkeypatch, session):
+    """zenoh_pub with its store and CSV in tmp_path, publishing on `session`."""
+    monkeypatch.setattr(zenoh_pub, "CSV_FILE", str(tmp_path / "prices.csv"))
+    monkeypatch.setattr(zenoh_pub, "TICK_STORE_FILE", str(tmp_path / "prices.ticks"))
+    monkeypatch.setattr(zenoh_pub, "tick_validator", TickValidator(zenoh_pub.CRYPTO_IDS))
+    monkeypatch.setattr(zenoh_pub, "session", session)
+    zenoh_pub.init_csv()
+    zenoh_pub.init_store()
+    writer = zenoh_pub.tick_writer
+    yield zenoh_pub
+    atexit.unregister(writer.close)
+    writer.close()
+    zenoh_pub.tick_writer = None
+
+
+def test_late_joiner_gets_the_newest_ticks(publisher, session):
+    start = datetime(2025, 6, 1, 12, 0, 0)
+    times = [start + timedelta(seconds=10 * i) for i in range(5)]
+    for i, t in enumerate(times):
+        publisher.publish_snapshot({"timestamp": t, "sources": ["test"],
+                                    "prices": {"bitcoin": 100000.0 + i, "ethereum": 2500.0 + i}})
+    # Still buffered: fewer rows than batch_size, well within flush_interval
+    assert len(TickStore(publisher.TICK_STORE_FILE)) == 0
+
+    service = HistoryService(publisher.TICK_STORE_FILE, writer=publisher.tick_writer).start(session)
+    try:
+        ts, columns = read_history(session, coin="bitcoin", last=3, timeout=10.0)
+    finally:
+        service.close()
+    assert ts.tolist() == [to_epoch_ns(t) for t in times[-3:]]
+    np.testing.assert_array_equal(columns["bitcoin"], [100002.0, 100003.0, 100004.0])
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.indicators import DAY_NS, INDICATORS, IndicatorEngine, load_indicators, save_indicators
+
+pd = pytest.importorskip("pandas")
+
+COINS = ["bitcoin", "ethereum", "dogecoin"]
+CSV_FILE = os.path.join(os.path.dirname(__file__), "..", "crypto_prices.csv")
+
+
+@pytest.fixture
+def ticks():
+    # Two days of irregular ticks, each coin missing some, on random walks
+    rng = np.random.default_rng(7)
+    ts = (1.75e9 + np.cumsum(rng.uniform(60, 900, 400))).astype(np.int64) * 1_000_000_000
+    start = np.array([100_000.0, 2_500.0, 0.2])
+    values = start * np.exp(np.cumsum(rng.normal(0, 0.004, (len(ts), len(COINS))), axis=0))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    assert ts[-1] - ts[0] > DAY_NS
+    return ts, values
+
+
+def pandas_indicators(engine, ts, prices):
+    s = pd.Series(prices, index=pd.to_datetime(ts))
+    w, k = engine.window, engine.bb_k
+    sma = s.rolling(w).mean()
+    std = s.rolling(w).std(ddof=0)
+    delta = s.diff()
+    gain = delta.clip(lower=0).ewm(alpha=engine.rsi_alpha, adjust=False).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=engine.rsi_alpha, adjust=False).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+    rsi[delta.notna().cumsum() < engine.rsi_period] = np.nan
+    day = s.index.floor("D")
+    return {
+        "sma": sma,
+        "bb_upper": sma + k * std,
+        "bb_lower": sma - k * std,
+        "ema": s.ewm(span=engine.ema_span, adjust=False).mean(),
+        "rsi": rsi,
+        "vwap": s.groupby(day).cumsum() / s.groupby(day).cumcount().add(1),
+        "volatility": np.log(s).diff().rolling(engine.vol_window).std(),
+    }
+
+
+def assert_matches_pandas(engine, ts, values, got):
+    for i, coin in enumerate(engine.coins):
+        has = ~np.isnan(values[:, i])
+        for name, series in pandas_indicators(engine, ts[has], values[has, i]).items():
+            g, want = got[name][has, i], np.asarray(series, dtype=np.float64)
+            assert np.array_equal(np.isnan(g), np.isnan(want)), f"{coin}: {name} warm-up differs"
+            ok = ~np.isnan(want)
+            assert ok.any()
+            err = np.abs(g[ok] - want[ok]) / np.maximum(np.abs(want[ok]), 1e-12)
+            assert err.max() < 1e-9, f"{coin}: {name} off by {err.max():.2e}"
+
+
+def test_every_tick_matches_pandas_across_a_checkpoint(ticks, tmp_path):
+    ts, values = ticks
+    engine = IndicatorEngine(COINS, window=10, vol_window=15)
+    got = {name: np.full(values.shape, np.nan) for name in INDICATORS}
+    half = len(ts) // 2
+    for j, (t, row) in enumerate(zip(ts.tolist(), values)):
+        if j == half:
+            path = str(tmp_path / "indicators.npz")
+            save_indicators(path, engine)
+            engine = IndicatorEngine(COINS, window=10, vol_window=15)
+            assert load_indicators(path, engine) == len(COINS)
+            engine.update(ts[j - 1], values[j - 1])     # already seen: ignored
+        engine.update(t, row)
+        for name, v in engine.values().items():
+            got[name][j] = v
+    assert_matches_pandas(engine, ts, values, got)
+
+
+def test_bundled_csv_matches_pandas():
+    df = pd.read_csv(CSV_FILE)
+    coins = [column[:-4] for column in df.columns[1:]]
+    values = df[df.columns[1:]].to_numpy(dtype=np.float64)
+    values[~(values > 0)] = np.nan
+    ts = pd.to_datetime(df["timestamp"]).astype("int64").to_numpy()
+    keep = np.r_[True, np.diff(ts) > 0]     # a coin ignores repeated timestamps
+    ts, values = ts[keep], values[keep]
+
+    engine = IndicatorEngine(coins)
+    got = {name: np.full(values.shape, np.nan) for name in INDICATORS}
+    for j, (t, row) in enumerate(zip(ts.tolist(), values)):
+        engine.update(t, row)
+        for name, v in engine.values().items():
+            got[name][j] = v
+    assert_matches_pandas(engine, ts, values, got)
+
+
+def test_extend_matches_update(ticks):
+    ts, values = ticks
+    one = IndicatorEngine(COINS)
+    for t, row in zip(ts.tolist(), values):
+        one.update(t, row)
+    batch = IndicatorEngine(COINS)
+    batch.extend({i: (ts[~np.isnan(values[:, i])], values[~np.isnan(values[:, i]), i]) for i in range(len(COINS))})
+    for name, v in one.values().items():
+        np.testing.assert_allclose(batch.values()[name], v, rtol=1e-12)
+
+
+def test_restore_ignores_other_parameters(ticks, tmp_path):
+    ts, values = ticks
+    engine = IndicatorEngine(COINS)
+    for t, row in zip(ts.tolist(), values):
+        engine.update(t, row)
+    path = str(tmp_path / "indicators.npz")
+    save_indicators(path, engine)
+    assert load_indicators(path, IndicatorEngine(COINS, window=50)) == 0
+    # Coins are matched by name
+    other = IndicatorEngine(["solana", "bitcoin"])
+    assert load_indicators(path, other) == 1
+    assert other.get("bitcoin") == engine.get("bitcoin")
+    assert other.get("solana")["sma"] is None
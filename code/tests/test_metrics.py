@@ -0,0 +1,14 @@
+from utils.metrics import Registry
+
+
+def test_counter_family_and_samples_share_a_name():
+    registry = Registry()
+    ticks = registry.counter("ticks_total", "Ticks handled", ["result"])
+    ticks.labels(result="accepted").inc(3)
+    registry.counter("errors", "Errors seen").inc()
+    lines = registry.render().splitlines()
+    assert "# TYPE ticks_total counter" in lines
+    assert 'ticks_total{result="accepted"} 3' in lines
+    assert "# HELP errors_total Errors seen" in lines
+    assert "# TYPE errors_total counter" in lines
+    assert "errors_total 1" in lines
@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from utils.news_service import FAILED, PLACEHOLDER, NewsService, news_key
+
+FEED = """<?xml version="1.0"?>
+<rss version="2.0"><channel><title>{query}</title>
+<item><title>{query} rallies</title><link>https://example.com/1</link></item>
+<item><title>{query} dips</title></item>
+</channel></rss>"""
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(url.path)
+        # Tests make the feed slow or failing through these
+        time.sleep(self.server.delay)
+        if url.path != "/rss" or self.server.fail:
+            self.send_error(404 if url.path != "/rss" else 503)
+            return
+        body = FEED.format(query=parse_qs(url.query)["q"][0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    server.requests = []
+    server.delay, server.fail = 0.0, False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_refresh_is_cached_and_published_per_coin(feed_server):
+    published = []
+    service = NewsService(["bitcoin", "solana"], ttl=60.0, publish=lambda key, payload: published.append((key, payload)),
+                          url_template=f"http://127.0.0.1:{feed_server.server_port}/rss?q={{query}}").start()
+    try:
+        wait_for(lambda: len(published) == 2)
+        by_key = {key: json.loads(payload) for key, payload in published}
+        assert set(by_key) == {news_key("bitcoin"), news_key("solana")}
+        assert by_key[news_key("bitcoin")] == {"coin": "bitcoin", "news": [
+            {"title": "bitcoin cryptocurrency rallies", "url": "https://example.com/1"},
+            {"title": "bitcoin cryptocurrency dips", "url": "#"},
+        ]}
+        # Served from memory until the ttl runs out
+        assert service.get("solana")[0]["title"] == "solana cryptocurrency rallies"
+        assert len(feed_server.requests) == 2
+        # A coin outside the polled set is fetched on first view
+        assert service.get("dogecoin") == PLACEHOLDER
+        wait_for(lambda: len(published) == 3)
+        assert published[-1][0] == "crypto/news/dogecoin"
+    finally:
+        service.stop()
+
+
+def test_failed_fetch_is_not_published(feed_server):
+    published = []
+    service = NewsService(["bitcoin"], ttl=60.0, publish=lambda key, payload: published.append(key),
+                          url_template=f"http://127.0.0.1:{feed_server.server_port}/missing?q={{query}}").start()
+    try:
+        wait_for(lambda: service.get("bitcoin") == FAILED)
+        assert published == []
+    finally:
+        service.stop()
+
+
+def test_stale_news_is_served_while_revalidating(feed_server):
+    published = []
+    service = NewsService(["bitcoin"], ttl=0.2, max_stale=60.0, publish=lambda key, payload: published.append(key),
+                          url_template=f"http://127.0.0.1:{feed_server.server_port}/rss?q={{query}}").start()
+    try:
+        wait_for(lambda: len(published) == 1)
+        fresh = service.get("bitcoin")
+        assert fresh[0]["title"] == "bitcoin cryptocurrency rallies"
+
+        # Slow upstream: past the ttl, readers still get the cached feed at once
+        feed_server.delay = 1.0
+        time.sleep(0.3)
+        requests_before = len(feed_server.requests)
+        start = time.monotonic()
+        assert service.get("bitcoin") == fresh
+        assert time.monotonic() - start < 0.1
+        wait_for(lambda: len(feed_server.requests) > requests_before)
+
+        # Failing upstream: the stale feed is kept rather than replaced by FAILED
+        feed_server.delay, feed_server.fail = 0.0, True
+        failed_from = len(feed_server.requests)
+        wait_for(lambda: len(feed_server.requests) >= failed_from + 2)
+        assert service.get("bitcoin") == fresh
+    finally:
+        service.stop()
+
+
+def test_concurrent_misses_share_one_fetch(feed_server):
+    feed_server.delay = 0.5
+    service = NewsService([], ttl=60.0,
+                          url_template=f"http://127.0.0.1:{feed_server.server_port}/rss?q={{query}}").start()
+    try:
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(service.get("dogecoin"))) for _ in range(20)]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        assert results == [PLACEHOLDER] * 20
+        wait_for(lambda: service.get("dogecoin") != PLACEHOLDER)
+        assert service.get("dogecoin")[0]["title"] == "dogecoin cryptocurrency rallies"
+        assert feed_server.requests == ["/rss"]
+    finally:
+        service.stop()
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.online_regression import OnlineLinearRegression, SlidingWindowRegression
+
+LinearRegression = pytest.importorskip("sklearn.linear_model").LinearRegression
+
+CSV_FILE = os.path.join(os.path.dirname(__file__), "..", "crypto_prices.csv")
+
+
+@pytest.fixture
+def series():
+    # A day of minute ticks at epoch-second scale: trend, a wave and noise
+    rng = np.random.default_rng(3)
+    x = 1.75e9 + np.sort(rng.uniform(0, 86_400, 1000))
+    y = 100_000 + 0.05 * (x - x[0]) + 500 * np.sin((x - x[0]) / 7200) + rng.normal(0, 50, len(x))
+    return x, y
+
+
+def sklearn_predict(x, y, at, sample_weight=None):
+    return LinearRegression().fit(x.reshape(-1, 1), y, sample_weight=sample_weight).predict([[at]])[0]
+
+
+def assert_close(got, want):
+    assert abs(got - want) / max(abs(want), 1.0) < 1e-6, (got, want)
+
+
+def test_full_fit_matches_sklearn(series):
+    x, y = series
+    at = x[-1] + 3600.0
+    want = sklearn_predict(x, y, at)
+    online = OnlineLinearRegression()
+    for xi, yi in zip(x, y):
+        online.update(xi, yi)
+    assert_close(online.predict(at), want)
+    assert_close(OnlineLinearRegression().partial_fit(x, y).predict(at), want)
+    # Batches then single samples land on the same fit
+    mixed = OnlineLinearRegression().partial_fit(x[:600], y[:600])
+    for xi, yi in zip(x[600:], y[600:]):
+        mixed.update(xi, yi)
+    assert_close(mixed.predict(at), want)
+
+
+def test_decay_matches_weighted_sklearn(series):
+    x, y = series
+    at = x[-1] + 3600.0
+    weights = 0.99 ** np.arange(len(x) - 1, -1, -1)
+    want = sklearn_predict(x, y, at, sample_weight=weights)
+    assert_close(OnlineLinearRegression(decay=0.99).partial_fit(x, y).predict(at), want)
+    online = OnlineLinearRegression(decay=0.99).partial_fit(x[:500], y[:500])
+    for xi, yi in zip(x[500:], y[500:]):
+        online.update(xi, yi)
+    assert_close(online.predict(at), want)
+
+
+def test_sliding_windows_match_sklearn(series):
+    x, y = series
+    at = x[-1] + 3600.0
+    window = SlidingWindowRegression(window=100).partial_fit(x, y)
+    assert_close(window.predict(at), sklearn_predict(x[-100:], y[-100:], at))
+    span = SlidingWindowRegression(span=3 * 3600).partial_fit(x, y)
+    inside = x[-1] - x <= 3 * 3600
+    assert_close(span.predict(at), sklearn_predict(x[inside], y[inside], at))
+    assert len(span.samples) == inside.sum()
+
+
+def test_not_ready_without_two_distinct_x():
+    model = OnlineLinearRegression()
+    assert not model.ready
+    model.update(1.0, 5.0)
+    model.update(1.0, 7.0)
+    assert not model.ready
+    assert model.slope == 0.0
+    assert model.predict(2.0) == 6.0
+
+
+def test_bundled_csv_matches_batch_ols():
+    pd = pytest.importorskip("pandas")
+    df = pd.read_csv(CSV_FILE).dropna()
+    x = (pd.to_datetime(df["timestamp"]).astype("int64") / 1e9).to_numpy()
+    at = x[-1] + 3600.0
+    for column in df.columns[1:]:
+        y = df[column].to_numpy(dtype=np.float64)
+        ref = LinearRegression().fit(x.reshape(-1, 1), y)
+        online = OnlineLinearRegression()
+        for xi, yi in zip(x, y):
+            online.update(xi, yi)
+        for model in (online, OnlineLinearRegression().partial_fit(x, y)):
+            assert model.slope == pytest.approx(ref.coef_[0], rel=1e-6, abs=1e-12), column
+            assert_close(model.intercept, ref.intercept_)
+            assert_close(model.predict(at), ref.predict([[at]])[0])
+        window = SlidingWindowRegression(window=100).partial_fit(x, y)
+        assert_close(window.predict(at), sklearn_predict(x[-100:], y[-100:], at))
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+from utils.rollup import INITIAL_BARS, NS, Rollup, load_rollups, save_rollups
+
+# Small retention so the rings grow, fill and wrap within the test
+LEVELS = (("1s", NS, 1000), ("1min", 60 * NS, 700), ("1h", 3600 * NS, 300), ("1d", 86400 * NS, 5000))
+
+
+def ticks(n, seed=1):
+    rng = np.random.default_rng(seed)
+    ts = 1_750_000_000 * NS + np.cumsum(rng.integers(1, 20, n)) * NS
+    return ts, 100 + np.cumsum(rng.normal(0, 0.1, n))
+
+
+def test_rings_grow_to_the_history_held():
+    ts, prices = ticks(300_000)
+    block, single = Rollup(LEVELS), Rollup(LEVELS)
+    block.extend(ts, prices)
+    for t, p in zip(ts[:5000].tolist(), prices[:5000].tolist()):
+        single.update(t, p)
+    single.extend(ts[5000:], prices[5000:])
+    for a, b in zip(block.levels, single.levels):
+        ta, va = a.window()
+        tb, vb = b.window()
+        np.testing.assert_array_equal(ta, tb)
+        np.testing.assert_allclose(va, vb)
+    sizes = {level.name: level.bars.size for level in block.levels}
+    # ~66 days of ticks: the 1 d ring is still at its first allocation
+    assert sizes == {"1s": 1000, "1min": 700, "1h": 300, "1d": INITIAL_BARS}
+
+
+def test_save_rewrites_only_changed_levels(tmp_path):
+    ts, prices = ticks(50_000)
+    rollup = Rollup(LEVELS)
+    rollup.extend(ts, prices)
+    path = str(tmp_path / "prices.rollup")
+    save_rollups(path, {"bitcoin": rollup})
+    written = {name: os.stat(os.path.join(path, name)).st_mtime_ns for name in os.listdir(path)}
+    assert sorted(written) == ["bitcoin.1d.npz", "bitcoin.1h.npz", "bitcoin.1min.npz",
+                               "bitcoin.1s.npz", "bitcoin.open.npz"]
+
+    # A tick in the open 1 s bar seals nothing
+    for name in written:
+        os.utime(os.path.join(path, name), ns=(0, 0))
+    rollup.update(int(ts[-1]), float(prices[-1]))
+    save_rollups(path, {"bitcoin": rollup})
+    changed = [name for name in written if os.stat(os.path.join(path, name)).st_mtime_ns != 0]
+    assert changed == ["bitcoin.open.npz"]
+
+    restored = load_rollups(path, ["bitcoin", "solana"])
+    for a, b in zip(rollup.levels, restored["bitcoin"].levels):
+        ta, va = a.window()
+        tb, vb = b.window()
+        np.testing.assert_array_equal(ta, tb)
+        np.testing.assert_array_equal(va, vb)
+    assert restored["solana"].levels[0].open_t is None
@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from scraper_pub import extract_prices_bs, extract_prices_fast
+
+SYMBOLS = {"btc": "bitcoin", "doge": "dogecoin", "tiny": "tiny-coin"}
+LISTING = [
+    {"symbol": "BTC", "quote": {"USD": {"price": 104867.6412}}},
+    {"symbol": "DOGE", "quote": {"USD": {"price": 0.196011}}},
+    {"symbol": "TINY", "quote": {"USD": {"price": 0.0000123}}},
+]
+PAGE = ("<html><script>window.__INITIAL_STATE__ = "
+        + json.dumps({"cryptocurrency": {"listingLatest": {"data": LISTING}}}) + ";</script></html>")
+WANT = {"bitcoin": 104867.6412, "dogecoin": 0.196011, "tiny-coin": 0.0000123}
+
+
+def test_fast_path_keeps_full_precision():
+    assert extract_prices_fast(PAGE.encode(), SYMBOLS) == WANT
+
+
+def test_parser_path_keeps_full_precision():
+    pytest.importorskip("bs4")
+    assert extract_prices_bs(PAGE, SYMBOLS) == WANT
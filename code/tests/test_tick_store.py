@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from utils.tick_store import StoreLocked, TickStore, TickWriter, open_writer
+
+COINS = ["bitcoin", "ethereum"]
+
+
+def test_second_writer_is_refused(tmp_path):
+    path = str(tmp_path / "prices.ticks")
+    with TickWriter(path, COINS) as writer:
+        with pytest.raises(StoreLocked):
+            TickWriter(path, COINS)
+        with pytest.raises(StoreLocked):
+            open_writer(path, COINS + ["solana"])     # would widen under the writer
+        writer.append_rows([1, 2, 3], [[1.0, 10.0], [2.0, 20.0], [3.0, 30.0]])
+    # Released on close
+    with TickWriter(path, COINS) as writer:
+        writer.append_rows([4], [[4.0, 40.0]])
+    ts, cols = TickStore(path).read_all()
+    assert ts.tolist() == [1, 2, 3, 4]
+    assert cols["bitcoin"].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert TickStore(path).symbols == COINS
+
+
+def _overlay(base, data, at):
+    """`base` with `data` written over it at offset `at` (extending it)."""
+    out = bytearray(base)
+    out[at:at + len(data)] = data
+    return bytes(out)
+
+
+def test_interrupted_append_reopens(tmp_path):
+    path = str(tmp_path / "prices.ticks")
+    ts = np.arange(1, 17, dtype=np.int64)
+    cols = {"bitcoin": ts * 1.0, "ethereum": ts * 10.0}
+    with TickWriter(path, COINS, batch_size=4) as writer:
+        writer.append_columns(ts[:12], {c: v[:12] for c, v in cols.items()})
+        footer = writer._footer_offset
+        with open(path, "rb") as f:
+            before = f.read()
+        writer.append_columns(ts[12:], {c: v[12:] for c, v in cols.items()})
+    with open(path, "rb") as f:
+        after = f.read()
+    data_end = TickStore(path).segments[-1].offset + 4 * 8 * (1 + len(COINS))
+
+    # The file as a crash (or a reader racing the writer) can find it: cut
+    # anywhere past the old footer, or part way through each write of the append
+    states = [after[:n] for n in range(footer, len(after) + 1)]
+    states += [_overlay(before, after[footer + 32:n], footer + 32) for n in range(footer + 32, data_end + 1)]
+    states += [_overlay(before, after[footer:data_end], footer)]
+    states += [_overlay(before, after[:n], 0) for n in range(data_end, len(after) + 1)]
+    for k, state in enumerate(states):
+        copy = str(tmp_path / f"crash{k}.ticks")
+        with open(copy, "wb") as f:
+            f.write(state)
+        store = TickStore(copy)
+        assert len(store.segments) in (3, 4), k
+        got, prices = store.read_all()
+        rows = len(got)
+        assert got.tolist() == ts[:rows].tolist()
+        assert prices["ethereum"].tolist() == cols["ethereum"][:rows].tolist()
+        # The writer drops the torn segment and carries on
+        with TickWriter(copy, COINS) as writer:
+            writer.append_rows([100], [[1.5, 2.5]])
+        got, prices = TickStore(copy).read_all()
+        assert got.tolist() == ts[:rows].tolist() + [100]
+        assert prices["bitcoin"][-1] == 1.5
+
+
+def test_tail_stops_for_a_symbol_without_prices(tmp_path):
+    path = str(tmp_path / "prices.ticks")
+    ts = np.arange(1000, dtype=np.int64)
+    with TickWriter(path, COINS, batch_size=10) as writer:
+        writer.append_columns(ts, {"bitcoin": ts * 1.0, "ethereum": ts * 2.0})
+    widened = str(tmp_path / "widened.ticks")
+    with open(path, "rb") as src, open(widened, "wb") as dst:
+        dst.write(src.read())
+    open_writer(widened, COINS + ["solana"]).close()
+
+    store = TickStore(widened)
+    mapped = []
+    read_segment = store.read_segment
+    store.read_segment = lambda index, symbols=None: mapped.append(index) or read_segment(index, symbols)
+    got, cols = store.tail(5)
+    assert got.tolist() == list(range(995, 1000))
+    assert cols["ethereum"].tolist() == [t * 2.0 for t in range(995, 1000)]
+    assert np.isnan(cols["solana"]).all()
+    assert len(mapped) == 2        # 15 rows: n per symbol, not all 100 segments
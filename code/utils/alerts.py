@@ -0,0 +1,260 @@
+# utils/alerts.py
+#
+# Price alerts: user rules checked on every tick, all of them at once.
+#
+# A rule watches one coin and fires when a series crosses a level, or
+# another series, in a given direction:
+#
+#   {"id": "btc-100k", "coin": "bitcoin", "series": "price", "op": "above", "level": 100000}
+#   {"id": "eth-dump", "coin": "ethereum", "series": "move", "window": 300, "op": "below", "level": -3}
+#   {"id": "sol-cross", "coin": "solana", "series": "price", "op": "above", "ref": "sma"}
+#   {"id": "doge-rsi", "coin": "dogecoin", "series": "rsi", "op": "below", "level": 30,
+#    "hysteresis": 0.1, "cooldown": 3600}
+#
+# Series are the price, the indicators of utils/indicators.py (sma, ema, rsi,
+# bb_upper, ...) and "move": the % change over the last `window` seconds.
+# A rule fires on a crossing, not while its condition holds. It fires once,
+# then re-arms only after the series moves back past the level by
+# `hysteresis` (a fraction of the level; default DEFAULT_HYSTERESIS), so
+# noise around a level does not fire it over and over. A rule that crosses
+# again within `cooldown` seconds of its last alert is re-armed as usual
+# but the repeat is dropped (counted as suppressed).
+#
+# set_rules() compiles the rules into arrays sorted by coin, and update()
+# takes the tick's price vector, gathers each rule's two sides from one
+# (series x coin) matrix and checks every rule of the coins that ticked in
+# a single vectorized pass: thousands of rules cost about as much as one.
+#
+# A rule's condition is unknown until the first tick with both sides
+# available; if it already holds then, the rule waits for the series to
+# come back first, so loading rules never fires a burst of alerts.
+#
+#   $CRYPTO_ALERTS   JSON file with a list of rules (see load_rules())
+import json
+import os
+
+import numpy as np
+
+from utils.indicators import INDICATORS
+
+ALERT_KEY = "crypto/alerts"
+ALERTS_ENV = "CRYPTO_ALERTS"
+DEFAULT_HYSTERESIS = 0.002
+DEFAULT_COOLDOWN = 300.0
+# A move window's reference price is sampled at most every window / MOVE_RESOLUTION
+MOVE_RESOLUTION = 64
+NS = 1_000_000_000
+NO_TICK = np.iinfo(np.int64).min
+OPS = {"above": 1.0, "below": -1.0}
+UNKNOWN, DISARMED, ARMED = -1, 0, 1
+
+
+class _Lag:
+    """Each coin's price `width` ns before its latest tick, from samples
+    taken at least width / MOVE_RESOLUTION apart."""
+
+    def __init__(self, n, width, resolution=MOVE_RESOLUTION):
+        self.width = width
+        self.step = max(width // resolution, 1)
+        self.capacity = resolution + 2      # enough samples to span the window
+        # Coin c's samples are [c * capacity, (c + 1) * capacity), flat for cheap gathers
+        self.ts = np.full(n * self.capacity, NO_TICK, dtype=np.int64)
+        self.price = np.full(n * self.capacity, np.nan)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.ref = np.full(n, -1, dtype=np.int64)     # newest sample <= latest tick - width
+
+    def push(self, rows, ts, x):
+        """Record the tick at `ts` (epoch ns) of coins `rows` at prices x."""
+        cap = self.capacity
+        base = rows * cap
+        count = self.count[rows]
+        take = (count == 0) | (ts >= self.ts[base + (count - 1) % cap] + self.step)
+        if take.any():
+            slot = base[take] + count[take] % cap
+            self.ts[slot], self.price[slot] = ts, x[take]
+            count = count + take
+            self.count[rows] = count
+        # Advance each coin's reference, usually by one sample at most
+        target = ts - self.width
+        ref = np.maximum(self.ref[rows], count - cap)
+        while True:
+            nxt = ref + 1
+            move = (nxt < count) & (self.ts[base + nxt % cap] <= target)
+            if not move.any():
+                break
+            ref += move
+        self.ref[rows] = ref
+
+    def change(self, rows, x):
+        """% change of x from each coin's reference price, NaN without one."""
+        ref = self.ref[rows]
+        price = np.where(ref >= 0, self.price[rows * self.capacity + ref % self.capacity], np.nan)
+        return (x / price - 1.0) * 100.0
+
+
+class AlertEngine:
+    def __init__(self, coins, rules=()):
+        self.coins = list(coins)
+        self.index = {coin: i for i, coin in enumerate(self.coins)}
+        self.lags = {}          # window seconds -> _Lag
+        self.counts = {"fired": 0, "suppressed": 0}
+        self.set_rules(rules)
+
+    # ---- rules ----
+    def set_rules(self, rules):
+        """Compile `rules` (dicts, see the header). Rules that keep their id
+        keep their armed state and cooldown. Raises ValueError on a bad rule."""
+        old = {rid: (self.armed[k], self.last_fired[k]) for k, rid in enumerate(getattr(self, "ids", []))}
+        specs = sorted((self._compile(rule) for rule in rules), key=lambda spec: spec["column"])
+        if len({spec["id"] for spec in specs}) != len(specs):
+            raise ValueError("alert rule ids must be unique")
+        self.rules = [spec["rule"] for spec in specs]
+        self.ids = [spec["id"] for spec in specs]
+        self.column = np.array([s["column"] for s in specs], dtype=np.int64)
+        self.lhs = np.array([s["lhs"] for s in specs], dtype=np.int64)
+        self.rhs = np.array([s["rhs"] for s in specs], dtype=np.int64)
+        self.level = np.array([s["level"] for s in specs], dtype=np.float64)
+        self.sign = np.array([s["sign"] for s in specs], dtype=np.float64)
+        self.hysteresis = np.array([s["hysteresis"] for s in specs], dtype=np.float64)
+        self.cooldown = np.array([s["cooldown"] for s in specs], dtype=np.int64)
+        self.armed = np.full(len(specs), UNKNOWN, dtype=np.int8)
+        self.last_fired = np.full(len(specs), NO_TICK, dtype=np.int64)
+        for k, rid in enumerate(self.ids):
+            if rid in old:
+                self.armed[k], self.last_fired[k] = old[rid]
+        # Rules of coin c are [starts[c], starts[c + 1])
+        self.starts = np.searchsorted(self.column, np.arange(len(self.coins) + 1))
+        # The series some rule reads; the others are not computed per tick
+        used = set(self.lhs.tolist()) | set(self.rhs[self.rhs >= 0].tolist())
+        self.uses_indicators = any(1 <= s <= len(INDICATORS) for s in used)
+        self.move_sources = [(s, self.windows[s - 1 - len(INDICATORS)]) for s in sorted(used)
+                             if s > len(INDICATORS)]
+        return self
+
+    def _compile(self, rule):
+        rid = str(rule.get("id") or _default_id(rule))
+        try:
+            column = self.index[rule["coin"]]
+            sign = OPS[rule.get("op", "above")]
+            lhs = self._source(rule.get("series", "price"), rule.get("window"))
+            if "ref" in rule:
+                rhs, level = self._source(rule["ref"], rule.get("ref_window")), np.nan
+            else:
+                rhs, level = -1, float(rule["level"])
+            hysteresis = float(rule.get("hysteresis", DEFAULT_HYSTERESIS))
+            cooldown = int(float(rule.get("cooldown", DEFAULT_COOLDOWN)) * NS)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"alert rule {rid}: {e!r}") from None
+        return {"id": rid, "rule": dict(rule, id=rid), "column": column, "lhs": lhs, "rhs": rhs,
+                "level": level, "sign": sign, "hysteresis": hysteresis, "cooldown": cooldown}
+
+    def _source(self, series, window=None):
+        """Row of the series in the (series x coin) matrix update() builds:
+        0 price, then INDICATORS, then one per move window."""
+        if series == "price":
+            return 0
+        if series in INDICATORS:
+            return 1 + INDICATORS.index(series)
+        if series == "move":
+            window = float(window)
+            if window <= 0:
+                raise ValueError("a move rule needs a window > 0 seconds")
+            if window not in self.lags:
+                self.lags[window] = _Lag(len(self.coins), int(window * NS))
+            return 1 + len(INDICATORS) + self.windows.index(window)
+        raise ValueError(f"unknown series {series!r}")
+
+    @property
+    def windows(self):
+        return list(self.lags)
+
+    # ---- ticks ----
+    def observe(self, ts, prices):
+        """Record a price vector for the move windows without checking rules
+        (e.g. history replayed on startup). Returns the columns that ticked."""
+        prices = np.asarray(prices, dtype=np.float64)
+        rows = np.flatnonzero(prices == prices)
+        if len(rows):
+            for _, window in self.move_sources:
+                self.lags[window].push(rows, ts, prices[rows])
+        return rows
+
+    def update(self, ts, prices, indicators=None):
+        """Check the rules of every coin in the price vector (NaN = no tick)
+        at `ts` (epoch ns). `indicators` is the IndicatorEngine, already
+        updated with this tick, for rules on indicators. Returns the alerts
+        fired, as dicts."""
+        prices = np.asarray(prices, dtype=np.float64)
+        rows = self.observe(ts, prices)
+        if not len(rows) or not len(self.ids):
+            return []
+        if len(rows) == 1:
+            sel = np.arange(self.starts[rows[0]], self.starts[rows[0] + 1])
+        else:
+            ticked = np.zeros(len(self.coins), dtype=bool)
+            ticked[rows] = True
+            sel = np.flatnonzero(ticked[self.column])
+        if not len(sel):
+            return []
+
+        # The series of the coins that ticked, one row per series
+        values = np.full((1 + len(INDICATORS) + len(self.lags), len(rows)), np.nan)
+        values[0] = prices[rows]
+        if self.uses_indicators and indicators is not None:
+            current = indicators.values(rows)
+            for k, name in enumerate(INDICATORS):
+                values[1 + k] = current[name]
+        for source, window in self.move_sources:
+            values[source] = self.lags[window].change(rows, prices[rows])
+        position = np.full(len(self.coins), -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+
+        at = position[self.column[sel]]
+        lhs = values[self.lhs[sel], at]
+        rhs_source = self.rhs[sel]
+        rhs = np.where(rhs_source >= 0, values[np.maximum(rhs_source, 0), at], self.level[sel])
+        beyond = self.sign[sel] * (lhs - rhs)    # > 0: the condition holds
+        known = beyond == beyond
+
+        armed = self.armed[sel]
+        armed = np.where(known & (armed == UNKNOWN), np.where(beyond > 0, DISARMED, ARMED), armed)
+        fire = known & (armed == ARMED) & (beyond > 0)
+        rearm = known & (armed == DISARMED) & (beyond < -self.hysteresis[sel] * np.abs(rhs))
+        armed[fire] = DISARMED
+        armed[rearm] = ARMED
+        self.armed[sel] = armed
+        if not fire.any():
+            return []
+
+        last = self.last_fired[sel]
+        never = last == NO_TICK
+        due = fire & (never | (ts - np.where(never, ts, last) >= self.cooldown[sel]))
+        self.counts["suppressed"] += int(fire.sum() - due.sum())
+        self.last_fired[sel[due]] = ts
+        self.counts["fired"] += int(due.sum())
+        return [dict(self.rules[sel[k]], timestamp=int(ts), value=float(lhs[k]), reference=float(rhs[k]))
+                for k in np.flatnonzero(due).tolist()]
+
+    def stats(self):
+        return dict(self.counts, rules=len(self.ids))
+
+
+def _default_id(rule):
+    series = rule.get("series", "price")
+    if series == "move":
+        series += f":{rule.get('window')}"
+    other = rule["ref"] if "ref" in rule else rule.get("level")
+    return f"{rule.get('coin')}/{series} {rule.get('op', 'above')} {other}"
+
+
+def load_rules(path=None):
+    """Rules from the JSON list in `path` (default $CRYPTO_ALERTS), or none."""
+    path = path or os.environ.get(ALERTS_ENV)
+    if not path:
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def encode_alert(alert):
+    return json.dumps(alert).encode()
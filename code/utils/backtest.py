@@ -0,0 +1,194 @@
+# utils/backtest.py
+#
+# Parallel walk-forward backtests over every (coin x model x window) combination.
+#
+# The history is placed once in multiprocessing.shared_memory (epoch seconds,
+# then one float64 row per coin) and every worker of a ProcessPoolExecutor
+# maps it in its initializer, so jobs carry only (coin, model, window) and no
+# price data is pickled or copied per job.
+#
+# A job slides fixed-length test folds over the history. Before each fold
+# the model is refitted on the preceding `window` seconds. Within the fold
+# it walks forward one observation at a time: it forecasts `horizon` seconds
+# past the latest observation, scores that against the first observation at
+# or after that time, then takes the next observation as an update.
+#
+#   python -m utils.backtest --workers 4
+#   python analyze_and_predict.py --backtest
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.forecasting import FORECASTERS, make_forecaster
+
+WINDOWS = (3600.0, 6 * 3600.0, 86400.0)     # training window, seconds
+HORIZON = 600.0
+# Rough relative cost, so the slowest jobs are scheduled first
+_COST = {"ar": 8, "holt-winters": 2}
+
+_shared = {}     # per worker process: shm, t, Y, coins
+
+
+# ==== Shared input ====
+def share_history(t, Y):
+    """Copy (t, Y[coin, row]) into a new shared memory block. Returns (shm, spec)."""
+    t = np.asarray(t, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(8, (1 + len(Y)) * len(t) * 8))
+    block = np.ndarray((1 + len(Y), len(t)), dtype=np.float64, buffer=shm.buf)
+    block[0] = t
+    block[1:] = Y
+    del block
+    return shm, {"name": shm.name, "rows": len(t), "series": len(Y)}
+
+
+def _attach(spec, coins):
+    # Pool workers share the parent's resource tracker, so attaching normally
+    # is right here: the parent unlinks the block once
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    block = np.ndarray((1 + spec["series"], spec["rows"]), dtype=np.float64, buffer=shm.buf)
+    _shared.update(shm=shm, t=block[0], Y=block[1:], coins=list(coins))
+
+
+# ==== One job ====
+def walk_forward_windows(factory, t, y, window, horizon=HORIZON, fold=None):
+    """Walk-forward with a refit on the last `window` seconds before every
+    `fold`-second test fold (fold defaults to the window)."""
+    fold = fold or window
+    n = len(t)
+    targets = np.searchsorted(t, t + horizon, side="left")
+    errors, actual = [], []
+    fit_ns = update_ns = forecast_ns = 0
+    fits = points = 0
+    if n == 0:
+        origins = []
+    else:
+        origins = np.arange(t[0] + window, t[-1], fold)
+    for start in origins:
+        lo, mid, hi = np.searchsorted(t, [start - window, start, start + fold], side="left")
+        if mid - lo < 2 or hi <= mid:
+            continue
+        model = factory()
+        began = time.perf_counter_ns()
+        model.fit(t[lo:mid], y[lo:mid])
+        fit_ns += time.perf_counter_ns() - began
+        fits += 1
+        for i in range(mid, hi):
+            j = targets[i - 1]
+            if j < n and model.ready:
+                began = time.perf_counter_ns()
+                pred = model.forecast((t[i - 1] + horizon,))[0]
+                forecast_ns += time.perf_counter_ns() - began
+                errors.append(pred - y[j])
+                actual.append(y[j])
+            began = time.perf_counter_ns()
+            model.update(t[i], y[i])
+            update_ns += time.perf_counter_ns() - began
+            points += 1
+
+    errors, actual = np.array(errors), np.array(actual)
+    scored = len(errors) > 0
+    return {
+        "folds": fits,
+        "points": points,
+        "forecasts": len(errors),
+        "mae": float(np.mean(np.abs(errors))) if scored else float("nan"),
+        "rmse": float(np.sqrt(np.mean(errors ** 2))) if scored else float("nan"),
+        "mape": float(np.mean(np.abs(errors / actual)) * 100) if scored else float("nan"),
+        "fit_ms": fit_ns / max(fits, 1) / 1e6,
+        "update_us": update_ns / max(points, 1) / 1e3,
+        "forecast_us": forecast_ns / max(len(errors), 1) / 1e3,
+    }
+
+
+def _run_job(job):
+    coin, model, window, horizon, fold, params = job
+    t = _shared["t"]
+    y = _shared["Y"][_shared["coins"].index(coin)]
+    present = ~np.isnan(y)
+    if not present.all():
+        t, y = t[present], y[present]
+    began, cpu = time.perf_counter(), time.process_time()
+    result = walk_forward_windows(lambda: make_forecaster(model, **params), t, y, window, horizon, fold)
+    seconds = time.perf_counter() - began
+    return dict(coin=coin, model=model, window=window, seconds=seconds, cpu_s=time.process_time() - cpu,
+                points_per_s=result["points"] / seconds if seconds else 0.0, **result)
+
+
+# ==== Driver ====
+def run_backtests(ts, prices, coins=None, models=None, windows=WINDOWS, horizon=HORIZON,
+                  fold=None, params=None, workers=None):
+    """Backtest every (coin x model x window) on epoch-ns `ts` and {coin: prices}.
+
+    Returns (results, summary): one dict per job, sorted by coin then MAPE,
+    and the wall time, summed job CPU time and throughput of the whole run.
+    Efficiency is job CPU time over wall time times the usable cores."""
+    coins = list(prices if coins is None else coins)
+    models = list(FORECASTERS if models is None else models)
+    params = params or {}
+    workers = workers or os.cpu_count() or 1
+    jobs = [(coin, model, float(window), horizon, fold, params.get(model, {}))
+            for coin in coins for model in models for window in windows]
+    jobs.sort(key=lambda job: -_COST.get(job[1], 1) * job[2])
+
+    shm, spec = share_history(np.asarray(ts) / 1e9, [prices[c] for c in coins])
+    began = time.perf_counter()
+    try:
+        if workers == 1:
+            _attach(spec, coins)
+            results = [_run_job(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(spec, coins)) as pool:
+                futures = [pool.submit(_run_job, job) for job in jobs]
+                results = [future.result() for future in as_completed(futures)]
+    finally:
+        wall = time.perf_counter() - began
+        if workers == 1:
+            _shared.clear()
+        shm.close()
+        shm.unlink()
+
+    results.sort(key=lambda r: (coins.index(r["coin"]), r["mape"] if r["mape"] == r["mape"] else np.inf))
+    busy = sum(r["cpu_s"] for r in results)
+    cores = min(workers, os.cpu_count() or 1)
+    summary = {"jobs": len(jobs), "workers": workers, "wall_s": wall, "job_s": busy,
+               "points_per_s": sum(r["points"] for r in results) / wall if wall else 0.0,
+               "efficiency": busy / (wall * cores) if wall else 0.0}
+    return results, summary
+
+
+def print_results(results, summary):
+    print(f"{'coin':<10}{'model':<14}{'window':>8}{'folds':>7}{'n':>8}{'MAE':>11}{'RMSE':>11}"
+          f"{'MAPE %':>9}{'fit ms':>9}{'upd us':>8}{'fc us':>8}{'pts/s':>10}")
+    for r in results:
+        print(f"{r['coin']:<10}{r['model']:<14}{r['window'] / 3600:>7g}h{r['folds']:>7}{r['forecasts']:>8}"
+              f"{r['mae']:>11.4g}{r['rmse']:>11.4g}{r['mape']:>9.3f}{r['fit_ms']:>9.2f}"
+              f"{r['update_us']:>8.2f}{r['forecast_us']:>8.1f}{r['points_per_s']:>10.0f}")
+    print(f"{summary['jobs']} jobs on {summary['workers']} workers: {summary['wall_s']:.2f} s wall, "
+          f"{summary['job_s']:.2f} CPU s in jobs, {summary['points_per_s']:.0f} points/s, "
+          f"parallel efficiency {summary['efficiency']:.0%}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils.history_query import HistoryQuery
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtests over the tick store")
+    parser.add_argument("--store", default="crypto_prices.ticks")
+    parser.add_argument("--coins", nargs="*", default=None)
+    parser.add_argument("--models", nargs="*", default=None)
+    parser.add_argument("--windows", nargs="*", type=float, default=list(WINDOWS), help="seconds")
+    parser.add_argument("--horizon", type=float, default=HORIZON, help="seconds ahead")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    history = HistoryQuery(args.store)
+    data = history.query(args.coins)
+    coins = args.coins or history.symbols
+    print_results(*run_backtests(data["timestamp"], {c: data[c] for c in coins}, models=args.models,
+                                 windows=args.windows, horizon=args.horizon, workers=args.workers))
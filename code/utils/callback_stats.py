@@ -0,0 +1,104 @@
+# utils/callback_stats.py
+#
+# Latency and response size per Dash callback.
+#
+# Wrap a callback with @timed_callback(name) (below @app.callback) and every
+# call records its wall time; the serialized size of the response is sampled
+# every PAYLOAD_SAMPLE_EVERY calls so the measurement does not double the
+# JSON encoding cost. install_stats_route() exposes the numbers as JSON at
+# /debug/callbacks (the dashboard only with DASH_DEBUG=1);
+# benchmarks/bench_dashboard.py uses them offline. Wall
+# times also go to the tracker_callback_seconds histogram (utils/metrics.py).
+import functools
+import threading
+import time
+
+from dash.exceptions import PreventUpdate
+from plotly.io.json import to_json_plotly
+
+from utils.metrics import CALLBACK_SECONDS
+
+PAYLOAD_SAMPLE_EVERY = 10
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def payload_size(result):
+    """Bytes Dash would put on the wire for a callback's return value."""
+    return len(to_json_plotly(result))
+
+
+class CallbackStats:
+    def __init__(self):
+        self.calls = 0
+        self.skipped = 0            # PreventUpdate: nothing sent
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.payload_samples = 0
+        self.total_bytes = 0
+        self.last_bytes = 0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "skipped": self.skipped,
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "last_ms": round(self.last_ms, 3),
+            "mean_bytes": self.total_bytes // self.payload_samples if self.payload_samples else 0,
+            "last_bytes": self.last_bytes,
+        }
+
+
+def timed_callback(name):
+    def decorator(fn):
+        with _lock:
+            stats = _stats.setdefault(name, CallbackStats())
+        histogram = CALLBACK_SECONDS.labels(callback=name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except PreventUpdate:
+                with _lock:
+                    stats.skipped += 1
+                raise
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed)
+            elapsed *= 1000
+            with _lock:
+                stats.calls += 1
+                stats.total_ms += elapsed
+                stats.max_ms = max(stats.max_ms, elapsed)
+                stats.last_ms = elapsed
+                sample = stats.calls % PAYLOAD_SAMPLE_EVERY == 1 or PAYLOAD_SAMPLE_EVERY == 1
+            if sample:
+                size = payload_size(result)
+                with _lock:
+                    stats.payload_samples += 1
+                    stats.total_bytes += size
+                    stats.last_bytes = size
+            return result
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    with _lock:
+        return {name: s.as_dict() for name, s in _stats.items()}
+
+
+def reset():
+    with _lock:
+        for stats in _stats.values():
+            stats.__init__()
+
+
+def install_stats_route(server, path="/debug/callbacks"):
+    """Serve snapshot() as JSON from the Dash app's Flask server."""
+    from flask import jsonify
+    server.add_url_rule(path, "callback_stats", lambda: jsonify(snapshot()))
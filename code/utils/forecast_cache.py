@@ -0,0 +1,102 @@
+# utils/forecast_cache.py
+#
+# Versioned cache of per-coin dashboard views (forecast, figures, table).
+#
+# The subscriber bumps a coin's data version on every tick; a background
+# worker recomputes the views for every (coin, view params) that a client
+# asked for recently, once per new version. Dash callbacks only read the
+# cache, so CPU follows the tick rate rather than viewers x refresh rate.
+import threading
+import time
+from collections import defaultdict
+
+from utils.log import get_logger
+
+log = get_logger("FORECAST")
+
+
+class ForecastCache:
+    def __init__(self, compute, idle_timeout=600.0):
+        """`compute(coin, *params)` builds the cached value (params is e.g. the
+        history length). Keys nobody has requested for `idle_timeout` seconds
+        stop being refreshed."""
+        self.compute = compute
+        self.idle_timeout = idle_timeout
+        self._versions = defaultdict(int)
+        self._entries = {}        # (coin, *params) -> (version, value)
+        self._wanted = {}         # (coin, *params) -> last request time
+        self._cond = threading.Condition()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.computes = 0
+
+    def bump(self, coins):
+        """Mark new data for `coins` and wake the worker."""
+        with self._cond:
+            for coin in coins:
+                self._versions[coin] += 1
+            self._cond.notify()
+
+    def version(self, coin):
+        with self._cond:
+            return self._versions[coin]
+
+    def get(self, coin, *params):
+        """Return the freshest cached value, computing it inline only on a cold miss."""
+        key = (coin,) + params
+        with self._cond:
+            self._wanted[key] = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                if entry[0] != self._versions[coin]:
+                    self._cond.notify()
+                return entry[1]
+            self.misses += 1
+            version = self._versions[coin]
+        return self._refresh(key, version)
+
+    def _refresh(self, key, version):
+        value = self.compute(*key)
+        with self._cond:
+            self.computes += 1
+            current = self._entries.get(key)
+            if current is None or current[0] <= version:
+                self._entries[key] = (version, value)
+        return value
+
+    def _stale_keys(self):
+        now = time.monotonic()
+        for key, seen in list(self._wanted.items()):
+            if now - seen > self.idle_timeout:
+                del self._wanted[key]
+                self._entries.pop(key, None)
+        return [(key, self._versions[key[0]]) for key in self._wanted
+                if key not in self._entries or self._entries[key][0] != self._versions[key[0]]]
+
+    def run(self):
+        while True:
+            with self._cond:
+                stale = self._stale_keys()
+                while not stale:
+                    self._cond.wait(timeout=self.idle_timeout)
+                    stale = self._stale_keys()
+            for key, version in stale:
+                try:
+                    self._refresh(key, version)
+                except Exception as e:
+                    log.error("refresh failed", key=key, error=e)
+                    # Keep serving the previous value until the next tick
+                    # instead of retrying in a tight loop
+                    with self._cond:
+                        if key in self._entries:
+                            self._entries[key] = (version, self._entries[key][1])
+                        else:
+                            self._wanted.pop(key, None)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+        return self
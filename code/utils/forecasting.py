@@ -0,0 +1,427 @@
+# utils/forecasting.py
+#
+# Forecaster registry shared by the dashboard and analyze_and_predict.
+#
+# Every model works on epoch seconds as floats, so ticks a fraction of a
+# second apart stay distinct, and has the same interface:
+#
+#   fit(t, y)           rebuild from a batch of history
+#   update(t, y)        add one observation, O(1) amortized
+#   forecast(horizon)   predicted prices at the epoch-second timestamps in
+#                       `horizon`
+#   ready               True once the model can forecast
+#
+# Registered models: naive (last price, the baseline), linear (OLS over a
+# sliding span), ewma (exponential smoothing with a half-life in seconds),
+# holt-winters (additive trend and seasonality) and ar (AR(p) on price
+# changes). The last two need evenly spaced input: ticks are bucketed into
+# `step`-second bars, the last price in a bar wins, and empty bars repeat the
+# previous one.
+#
+# walk_forward() replays a history through a model and reports accuracy next
+# to fit, update and forecast latency; backtest() does it for several models:
+#
+#   python -m utils.forecasting --coin bitcoin --horizon 600
+import math
+import time
+from collections import deque
+
+import numpy as np
+
+from utils.online_regression import OnlineLinearRegression, SlidingWindowRegression
+
+
+class Forecaster:
+    name = None
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        pass
+
+    def fit(self, t, y):
+        self.reset()
+        for ti, yi in zip(np.asarray(t, dtype=np.float64).tolist(), np.asarray(y, dtype=np.float64).tolist()):
+            self.update(ti, yi)
+        return self
+
+    def update(self, t, y):
+        raise NotImplementedError
+
+    def forecast(self, horizon):
+        raise NotImplementedError
+
+    @property
+    def ready(self):
+        raise NotImplementedError
+
+
+class NaiveForecaster(Forecaster):
+    name = "naive"
+
+    def reset(self):
+        self.last = None
+
+    def update(self, t, y):
+        self.last = y
+
+    def forecast(self, horizon):
+        return np.full(len(horizon), np.nan if self.last is None else self.last)
+
+    @property
+    def ready(self):
+        return self.last is not None
+
+
+class LinearForecaster(Forecaster):
+    name = "linear"
+
+    def __init__(self, span=None):
+        """OLS over the last `span` seconds (all history if None)."""
+        self.span = span
+        super().__init__()
+
+    def reset(self):
+        self.model = SlidingWindowRegression(span=self.span) if self.span else OnlineLinearRegression()
+
+    def fit(self, t, y):
+        self.reset()
+        t, y = np.asarray(t, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        if self.span and len(t):
+            keep = t >= t[-1] - self.span
+            t, y = t[keep], y[keep]
+        self.model.partial_fit(t, y)
+        return self
+
+    def update(self, t, y):
+        self.model.update(t, y)
+
+    def forecast(self, horizon):
+        return np.array([self.model.predict(h) for h in horizon])
+
+    @property
+    def ready(self):
+        return self.model.ready
+
+
+class EWMAForecaster(Forecaster):
+    name = "ewma"
+
+    def __init__(self, halflife=600.0):
+        """Level with a half-life in seconds, so irregular ticks weigh by elapsed time."""
+        self.halflife = halflife
+        super().__init__()
+
+    def reset(self):
+        self.level = None
+        self.last_t = None
+
+    def update(self, t, y):
+        if self.level is None:
+            self.level = y
+        else:
+            alpha = 1.0 - 2.0 ** (-max(t - self.last_t, 0.0) / self.halflife)
+            self.level += alpha * (y - self.level)
+        self.last_t = t
+
+    def forecast(self, horizon):
+        return np.full(len(horizon), np.nan if self.level is None else self.level)
+
+    @property
+    def ready(self):
+        return self.level is not None
+
+
+class _Bars:
+    """Turns irregular ticks into closed `step`-second bars (last price wins,
+    gaps of up to max_fill bars repeat the previous bar)."""
+
+    def __init__(self, step, max_fill=10_000):
+        self.step = step
+        self.max_fill = max_fill
+        self.index = None        # bucket number of the open bar
+        self.value = None
+
+    def push(self, t, y):
+        """Add a tick; return the values of the bars it closed, oldest first."""
+        index = math.floor(t / self.step)
+        if self.index is None:
+            self.index, self.value = index, y
+            return []
+        if index <= self.index:
+            self.value = y
+            return []
+        closed = [self.value] * min(index - self.index, self.max_fill)
+        self.index, self.value = index, y
+        return closed
+
+    @property
+    def last_close_t(self):
+        """Start time of the last closed bar."""
+        return (self.index - 1) * self.step
+
+
+class HoltWintersForecaster(Forecaster):
+    name = "holt-winters"
+
+    def __init__(self, step=3600.0, season=24, alpha=0.3, beta=0.05, gamma=0.1):
+        """Additive Holt-Winters on `step`-second bars with `season` bars per cycle
+        (hourly bars and a daily cycle by default). Seasonal terms start at zero
+        and are learned as cycles go by."""
+        self.step = step
+        self.season = season
+        self.alpha, self.beta, self.gamma = alpha, beta, gamma
+        super().__init__()
+
+    def reset(self):
+        self.bars = _Bars(self.step)
+        self.level = None
+        self.trend = 0.0
+        self.seasonal = np.zeros(self.season)
+        self.k = 0              # bars processed
+
+    def update(self, t, y):
+        for value in self.bars.push(t, y):
+            self._step(value)
+
+    def _step(self, y):
+        i = self.k % self.season
+        s = self.seasonal[i]
+        if self.level is None:
+            self.level = y - s
+        else:
+            previous = self.level
+            self.level = self.alpha * (y - s) + (1 - self.alpha) * (self.level + self.trend)
+            self.trend = self.beta * (self.level - previous) + (1 - self.beta) * self.trend
+        self.seasonal[i] = self.gamma * (y - self.level) + (1 - self.gamma) * s
+        self.k += 1
+
+    def forecast(self, horizon):
+        if not self.ready:
+            return np.full(len(horizon), np.nan)
+        h = np.maximum(1, np.rint((np.asarray(horizon, dtype=np.float64) - self.bars.last_close_t)
+                                  / self.step).astype(np.int64))
+        return self.level + h * self.trend + self.seasonal[(self.k - 1 + h) % self.season]
+
+    @property
+    def ready(self):
+        return self.k >= 2
+
+
+class ARForecaster(Forecaster):
+    name = "ar"
+
+    def __init__(self, p=6, step=60.0, window=1440, refit=60):
+        """AR(p) with intercept on bar-to-bar price changes of `step`-second bars,
+        refitted by least squares over the last `window` changes every `refit`
+        bars."""
+        self.p = p
+        self.step = step
+        self.window = window
+        self.refit = refit
+        super().__init__()
+
+    def reset(self):
+        self.bars = _Bars(self.step)
+        self.values = deque(maxlen=self.window + 1)
+        self.coef = None
+        self._since_fit = 0
+
+    def update(self, t, y):
+        for value in self.bars.push(t, y):
+            self.values.append(value)
+            self._since_fit += 1
+            if self._since_fit >= self.refit or (self.coef is None and len(self.values) > 3 * self.p):
+                self._fit()
+
+    def _fit(self):
+        d = np.diff(np.fromiter(self.values, dtype=np.float64, count=len(self.values)))
+        p = self.p
+        if len(d) <= 2 * p:
+            return
+        # Row k: [1, d[k+p-1], ..., d[k]] -> d[k+p]
+        lags = np.lib.stride_tricks.sliding_window_view(d[:-1], p)[:, ::-1]
+        X = np.column_stack([np.ones(len(lags)), lags])
+        self.coef, *_ = np.linalg.lstsq(X, d[p:], rcond=None)
+        self._since_fit = 0
+
+    def forecast(self, horizon):
+        if not self.ready:
+            return np.full(len(horizon), np.nan)
+        h = np.maximum(1, np.rint((np.asarray(horizon, dtype=np.float64) - self.bars.last_close_t)
+                                  / self.step).astype(np.int64))
+        values = list(self.values)
+        p = self.p
+        # State [1, level, newest change, ..., p-th newest change]; one bar
+        # ahead is step @ state, so h bars ahead is a matrix power away
+        state = np.concatenate([[1.0, values[-1]], np.diff(values[-p - 1:])[::-1]])
+        step = np.zeros((p + 2, p + 2))
+        step[0, 0] = 1.0
+        step[1, 0] = step[2, 0] = self.coef[0]
+        step[1, 2:] = step[2, 2:] = self.coef[1:]
+        step[1, 1] = 1.0
+        step[np.arange(3, p + 2), np.arange(2, p + 1)] = 1.0
+        ahead = np.unique(h)
+        levels = np.empty(len(ahead))
+        done = 0
+        for k, bars in enumerate(ahead.tolist()):
+            state = np.linalg.matrix_power(step, bars - done) @ state
+            levels[k] = state[1]
+            done = bars
+        return levels[np.searchsorted(ahead, h)]
+
+    @property
+    def ready(self):
+        return self.coef is not None
+
+
+# ==== Registry ====
+FORECASTERS = {}
+
+
+def register_forecaster(name, factory):
+    """`factory(**params)` must return a Forecaster."""
+    FORECASTERS[name] = factory
+
+
+def make_forecaster(name, **params):
+    if name not in FORECASTERS:
+        raise ValueError(f"unknown forecaster {name!r} (have: {', '.join(FORECASTERS)})")
+    return FORECASTERS[name](**params)
+
+
+for _cls in (NaiveForecaster, LinearForecaster, EWMAForecaster, HoltWintersForecaster, ARForecaster):
+    register_forecaster(_cls.name, _cls)
+
+
+class ForecastEngine:
+    """One instance of each chosen model per coin, fed tick by tick."""
+
+    def __init__(self, coins, models=("linear",), params=None):
+        self.params = params or {}
+        self.names = list(models)
+        self.models = {}
+        for coin in coins:
+            self.add(coin)
+
+    def add(self, coin):
+        """Give a coin fresh (unfitted) models, unless it has some already."""
+        if coin not in self.models:
+            self.models[coin] = {name: make_forecaster(name, **self.params.get(name, {}))
+                                 for name in self.names}
+
+    def drop(self, coin):
+        self.models.pop(coin, None)
+
+    def fit(self, coin, ts, prices):
+        """Rebuild a coin's models from epoch-ns timestamps and prices (NaN skipped)."""
+        ts, prices = np.asarray(ts), np.asarray(prices, dtype=np.float64)
+        keep = ~np.isnan(prices)
+        for model in self.models[coin].values():
+            model.fit(ts[keep] / 1e9, prices[keep])
+
+    def update(self, ts, prices):
+        """One tick: epoch-ns timestamp and {coin: price}."""
+        t = ts / 1e9
+        for coin, price in prices.items():
+            models = self.models.get(coin)
+            if models is None or price != price:
+                continue
+            for model in models.values():
+                model.update(t, price)
+
+    def ready(self, coin, model=None):
+        return self.models[coin][model or self.names[0]].ready
+
+    def forecast(self, coin, horizon, model=None):
+        """Prices at the epoch-second timestamps in `horizon`, or None if the
+        model does not have enough data yet."""
+        forecaster = self.models[coin][model or self.names[0]]
+        if not forecaster.ready:
+            return None
+        return forecaster.forecast(horizon)
+
+
+# ==== Walk-forward backtest ====
+def walk_forward(factory, t, y, horizon=600.0, initial=0.2, stride=1):
+    """Fit on the first `initial` share (or count) of the history, then walk
+    forward one observation at a time: forecast `horizon` seconds ahead of the
+    latest observation, score it against the first observation at or after
+    that time, and feed the next observation in."""
+    t, y = np.asarray(t, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(t)
+    start = max(1, int(n * initial) if isinstance(initial, float) else initial)
+    targets = np.searchsorted(t, t + horizon, side="left")
+
+    model = factory()
+    began = time.perf_counter()
+    model.fit(t[:start], y[:start])
+    fit_ms = (time.perf_counter() - began) * 1000
+
+    errors, actual = [], []
+    update_ns = forecast_ns = 0
+    forecasts = 0
+    for i in range(start, n):
+        j = targets[i - 1]
+        if j < n and model.ready and (i - start) % stride == 0:
+            began = time.perf_counter_ns()
+            pred = model.forecast([t[i - 1] + horizon])[0]
+            forecast_ns += time.perf_counter_ns() - began
+            forecasts += 1
+            errors.append(pred - y[j])
+            actual.append(y[j])
+        began = time.perf_counter_ns()
+        model.update(t[i], y[i])
+        update_ns += time.perf_counter_ns() - began
+
+    errors, actual = np.array(errors), np.array(actual)
+    scored = len(errors) > 0
+    return {
+        "forecasts": forecasts,
+        "mae": float(np.mean(np.abs(errors))) if scored else float("nan"),
+        "rmse": float(np.sqrt(np.mean(errors ** 2))) if scored else float("nan"),
+        "mape": float(np.mean(np.abs(errors / actual)) * 100) if scored else float("nan"),
+        "fit_ms": fit_ms,
+        "update_us": update_ns / max(n - start, 1) / 1000,
+        "forecast_us": forecast_ns / max(forecasts, 1) / 1000,
+    }
+
+
+def backtest(t, y, models=None, horizon=600.0, initial=0.2, params=None):
+    """walk_forward() for each registered model (or the given names)."""
+    params = params or {}
+    results = []
+    for name in models or FORECASTERS:
+        result = walk_forward(lambda: make_forecaster(name, **params.get(name, {})),
+                              t, y, horizon=horizon, initial=initial)
+        results.append(dict(model=name, **result))
+    return results
+
+
+def print_backtest(results):
+    print(f"{'model':<14}{'n':>7}{'MAE':>12}{'RMSE':>12}{'MAPE %':>9}"
+          f"{'fit ms':>9}{'upd us':>9}{'fc us':>9}")
+    for r in results:
+        print(f"{r['model']:<14}{r['forecasts']:>7}{r['mae']:>12.4g}{r['rmse']:>12.4g}{r['mape']:>9.3f}"
+              f"{r['fit_ms']:>9.2f}{r['update_us']:>9.2f}{r['forecast_us']:>9.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils.history_query import HistoryQuery
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the registered forecasters")
+    parser.add_argument("--store", default="crypto_prices.ticks")
+    parser.add_argument("--coin", default="bitcoin")
+    parser.add_argument("--horizon", type=float, default=600.0, help="seconds ahead")
+    parser.add_argument("--initial", type=float, default=0.2, help="share of history used to fit")
+    parser.add_argument("--models", nargs="*", default=None)
+    args = parser.parse_args()
+
+    data = HistoryQuery(args.store).query([args.coin])
+    keep = ~np.isnan(data[args.coin])
+    print(f"{args.coin}: {keep.sum()} ticks, horizon {args.horizon:g} s")
+    print_backtest(backtest(data["timestamp"][keep] / 1e9, data[args.coin][keep],
+                            models=args.models, horizon=args.horizon, initial=args.initial))
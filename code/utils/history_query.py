@@ -0,0 +1,203 @@
+# utils/history_query.py
+#
+# Time-window queries over a tick store.
+#
+# The store footer already records min/max timestamp per segment; that is the
+# sparse index. A query binary-searches it to find the few segments that can
+# overlap [start, end], binary-searches inside each (segments are usually
+# sorted), and only ever touches those columns. Decoded blocks are kept in a
+# small LRU so repeated queries over the recent past are served from memory.
+#
+# scan() walks the same index but yields fixed-size chunks straight from the
+# memory-mapped columns (bypassing the LRU), for readers that stream a large
+# window somewhere else, e.g. utils.history_service.
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.tick_store import FLAG_SORTED, TickStore, to_epoch_ns
+
+_UNITS = {"ns": 1, "us": 1_000, "ms": 1_000_000, "s": 1_000_000_000,
+          "min": 60_000_000_000, "h": 3_600_000_000_000, "d": 86_400_000_000_000}
+
+
+def parse_interval(value):
+    """'10s', '1min', '1h', '1d' or a number of seconds -> nanoseconds."""
+    if isinstance(value, (int, float)):
+        return int(value * 1_000_000_000)
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)?\s*([a-z]+)\s*", value.lower())
+    if not match or match.group(2) not in _UNITS:
+        raise ValueError(f"bad interval: {value!r}")
+    return int(float(match.group(1) or 1) * _UNITS[match.group(2)])
+
+
+class HistoryQuery:
+    def __init__(self, store, cache_blocks=256):
+        self.store = TickStore(store) if isinstance(store, str) else store
+        self.cache_blocks = cache_blocks
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_index()
+
+    def _build_index(self):
+        segs = self.store.segments
+        self._min = np.array([s.min_ts for s in segs], dtype=np.int64)
+        self._max = np.array([s.max_ts for s in segs], dtype=np.int64)
+        # Segments written by a single writer are in time order, which lets us
+        # binary-search the index; otherwise fall back to a mask over it.
+        self._ordered = bool(np.all(self._min[1:] >= self._max[:-1])) if len(segs) > 1 else True
+
+    def refresh(self):
+        """Pick up segments appended since construction. Cached blocks stay valid
+        because segments are immutable once written."""
+        self.store.refresh()
+        self._build_index()
+        return self
+
+    @property
+    def symbols(self):
+        return self.store.symbols
+
+    def _segments_for(self, start, end):
+        if self._ordered:
+            lo = int(np.searchsorted(self._max, start, side="left"))
+            hi = int(np.searchsorted(self._min, end, side="right"))
+            return range(lo, hi)
+        return np.nonzero((self._max >= start) & (self._min <= end))[0]
+
+    def _block(self, index, name):
+        key = (index, name)
+        with self._lock:
+            block = self._cache.get(key)
+            if block is not None:
+                self._cache.move_to_end(key)
+                return block
+        block = np.array(self.store.column(index, name))
+        with self._lock:
+            self._cache[key] = block
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return block
+
+    def _coins(self, coins):
+        return list(self.symbols if coins is None else ([coins] if isinstance(coins, str) else coins))
+
+    def query(self, coins=None, start=None, end=None, resample=None, flags=False):
+        """Return {"timestamp": int64 epoch-ns, coin: float64, ...} for [start, end].
+
+        `start`/`end` accept anything utils.tick_store.to_epoch_ns does; None
+        leaves that side open. With `resample` (e.g. "1min"), rows are bucketed
+        and the last observation in each bucket is kept, stamped with the
+        bucket start. With `flags`, the result also has a "flags" column: the
+        segment flags (e.g. FLAG_VALIDATED) of the segment each row came from.
+        """
+        coins = self._coins(coins)
+        start, end = _bounds(start, end)
+
+        ts_parts, flag_parts, col_parts = [], [], {c: [] for c in coins}
+        for i in self._segments_for(start, end):
+            i = int(i)
+            ts = self._block(i, "timestamp")
+            if start <= self._min[i] and self._max[i] <= end:
+                sel = slice(None)
+            elif self.store.segments[i].flags & FLAG_SORTED:
+                sel = slice(int(np.searchsorted(ts, start, side="left")),
+                            int(np.searchsorted(ts, end, side="right")))
+            else:
+                sel = (ts >= start) & (ts <= end)
+            ts_parts.append(ts[sel])
+            if flags:
+                flag_parts.append(np.full(len(ts_parts[-1]), self.store.segments[i].flags, dtype=np.uint32))
+            for c in coins:
+                col_parts[c].append(self._block(i, c)[sel])
+
+        result = {"timestamp": np.concatenate(ts_parts) if ts_parts else np.empty(0, dtype=np.int64)}
+        for c in coins:
+            result[c] = np.concatenate(col_parts[c]) if col_parts[c] else np.empty(0)
+        if flags:
+            result["flags"] = np.concatenate(flag_parts) if flag_parts else np.empty(0, dtype=np.uint32)
+        if resample is not None:
+            result = _resample_last(result, coins, parse_interval(resample))
+        return result
+
+    def _rows(self, i, start, end, present=()):
+        """Row numbers of segment i inside [start, end], optionally only those
+        with a price for every coin in `present`."""
+        seg = self.store.segments[i]
+        if start <= seg.min_ts and seg.max_ts <= end:
+            rows = np.arange(seg.rows)
+        elif seg.flags & FLAG_SORTED:
+            ts = self.store.column(i)
+            rows = np.arange(int(np.searchsorted(ts, start, side="left")),
+                             int(np.searchsorted(ts, end, side="right")))
+        else:
+            ts = self.store.column(i)
+            rows = np.flatnonzero((ts >= start) & (ts <= end))
+        for c in present:
+            rows = rows[~np.isnan(self.store.column(i, c)[rows])]
+        return rows
+
+    def _gather(self, parts, coins):
+        out = {"timestamp": np.concatenate([self.store.column(i)[rows] for i, rows in parts])}
+        for c in coins:
+            out[c] = np.concatenate([self.store.column(i, c)[rows] for i, rows in parts])
+        return out
+
+    def scan(self, coins=None, start=None, end=None, last=None, chunk_rows=8192, dropna=False):
+        """Yield the rows of query() in chunks of at most `chunk_rows`, reading
+        the columns segment by segment, so even a scan of the whole history
+        only ever holds one chunk. Rows come in store order (time order for a
+        single writer). With `last`, only the last `last` rows of the window
+        are returned, found by walking the index backwards; with `dropna`,
+        rows missing a price for any of `coins` are skipped (and not counted).
+        """
+        coins = self._coins(coins)
+        start, end = _bounds(start, end)
+        present = coins if dropna else ()
+        segments = [int(i) for i in self._segments_for(start, end)]
+        skip = dict.fromkeys(segments, 0)
+        if last is not None:
+            need, picked = last, []
+            for i in reversed(segments):
+                if need <= 0:
+                    break
+                n = len(self._rows(i, start, end, present))
+                skip[i] = max(0, n - need)
+                need -= n
+                picked.append(i)
+            segments = picked[::-1]
+
+        parts, buffered = [], 0
+        for i in segments:
+            rows = self._rows(i, start, end, present)[skip[i]:]
+            while len(rows):
+                take, rows = rows[:chunk_rows - buffered], rows[chunk_rows - buffered:]
+                parts.append((i, take))
+                buffered += len(take)
+                if buffered == chunk_rows:
+                    yield self._gather(parts, coins)
+                    parts, buffered = [], 0
+        if parts:
+            yield self._gather(parts, coins)
+
+
+def _bounds(start, end):
+    """Open-ended [start, end] as int64 epoch-ns."""
+    return (np.iinfo(np.int64).min if start is None else to_epoch_ns(start),
+            np.iinfo(np.int64).max if end is None else to_epoch_ns(end))
+
+
+def _resample_last(result, coins, width):
+    ts = result["timestamp"]
+    if len(ts) == 0:
+        return result
+    order = np.argsort(ts, kind="stable")
+    buckets = (ts[order] // width) * width
+    # Last row of each run of equal buckets
+    last = np.flatnonzero(np.append(buckets[1:] != buckets[:-1], True))
+    out = {"timestamp": buckets[last]}
+    for c in coins + (["flags"] if "flags" in result else []):
+        out[c] = result[c][order][last]
+    return out
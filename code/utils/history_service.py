@@ -0,0 +1,341 @@
+# utils/history_service.py
+#
+# Tick history over Zenoh, for consumers that join late (a new dashboard
+# worker, analyze_and_predict.py on another machine) and should not need
+# the publisher's disk.
+#
+# HistoryService declares a queryable on crypto/history/* next to the tick
+# store and answers from its segment index (utils.history_query):
+#
+#   crypto/history/bitcoin?last=5000               last 5000 bitcoin prices
+#   crypto/history/bitcoin?start=2025-06-01T00:00:00;end=2025-06-02T00:00:00
+#   crypto/history/*?start=1750000000000000000     every coin, one row per tick
+#
+# start/end take ISO timestamps or epoch nanoseconds; chunk=N sets the rows
+# per reply. A single coin skips ticks without its price, "*" keeps every
+# row (NaN = missing).
+#
+# Replies are streamed as a sequence of binary chunks, read segment by
+# segment from the memory-mapped store, so neither side ever holds more than
+# a few chunks however long the window. Chunk layout (little-endian):
+#
+#   offset  size  field
+#   0       4     magic b"CTKH"
+#   4       1     version (1)
+#   5       1     flags (1 = last chunk of the reply)
+#   6       2     length of the symbol list (padded to 8 bytes)
+#   8       4     sequence number, from 0
+#   12      4     rows
+#   16      L     comma-separated symbols, NUL padded
+#   16+L    8*R   int64 epoch-ns timestamps, then float64 prices per symbol
+#
+# Pass the process's own TickWriter on the store as `writer` and its
+# buffered rows are flushed before each query is answered, so a late joiner
+# gets the newest ticks whatever the writer's batch size and flush interval.
+#
+# Identical queries against an unchanged store (same segment count) are
+# replayed from an LRU of encoded replies, bounded by CACHE_BYTES; replies
+# over CACHE_MAX_REPLY (whole-history backfills) stream without being kept.
+#
+#   service = HistoryService("crypto_prices.ticks").start(session)
+#   for chunk in fetch_history(session, "bitcoin", last=5000): ...
+#   python -m utils.history_service --store crypto_prices.ticks
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.history_query import HistoryQuery
+from utils.log import get_logger
+from utils.metrics import STAGE_SECONDS, counter, register_stats
+from utils.tick_store import FSYNC_INTERVAL, TickStore, open_writer
+
+HISTORY_PREFIX = "crypto/history"
+CHUNK_ROWS = 8192
+MAX_CHUNK_ROWS = 65536
+CACHE_BYTES = 64 * 1024 * 1024
+CACHE_MAX_REPLY = 4 * 1024 * 1024     # larger replies (backfills) are streamed, not kept
+FETCH_CAPACITY = 16        # chunks a consumer buffers before Zenoh holds the rest back
+FETCH_TIMEOUT = 300.0      # seconds for a whole reply
+
+MAGIC = b"CTKH"
+VERSION = 1
+FLAG_LAST = 1
+HEADER = struct.Struct("<4sBBHII")
+
+log = get_logger("HISTORY")
+HISTORY_SECONDS = STAGE_SECONDS.labels(stage="history")
+QUERIES = counter("tracker_history_queries_total", "History queries answered", ["result"])
+ROWS_SENT = counter("tracker_history_rows_total", "Rows read from the store for history replies")
+
+
+# ==== Chunk codec ====
+class HistoryChunk(namedtuple("HistoryChunk", "seq last timestamp columns")):
+    """timestamp: int64 epoch-ns array; columns: {symbol: float64 array}."""
+
+
+def encode_chunk(seq, symbols, data, last=False):
+    ts = np.asarray(data["timestamp"], dtype="<i8")
+    names = ",".join(symbols).encode()
+    names += b"\0" * (-len(names) % 8)
+    parts = [HEADER.pack(MAGIC, VERSION, FLAG_LAST if last else 0, len(names), seq, len(ts)),
+             names, ts.tobytes()]
+    parts += [np.asarray(data[s], dtype="<f8").tobytes() for s in symbols]
+    return b"".join(parts)
+
+
+def decode_chunk(payload):
+    if len(payload) < HEADER.size:
+        raise ValueError("truncated history chunk")
+    magic, version, flags, names_len, seq, rows = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("not a history chunk")
+    if version != VERSION:
+        raise ValueError(f"unsupported history chunk version {version}")
+    offset = HEADER.size + names_len
+    names = bytes(payload[HEADER.size:offset]).rstrip(b"\0").decode()
+    symbols = names.split(",") if names else []
+    if len(payload) != offset + 8 * rows * (1 + len(symbols)):
+        raise ValueError("history chunk length does not match its header")
+    ts = np.frombuffer(payload, dtype="<i8", count=rows, offset=offset)
+    columns = {s: np.frombuffer(payload, dtype="<f8", count=rows, offset=offset + 8 * rows * (k + 1))
+               for k, s in enumerate(symbols)}
+    return HistoryChunk(seq, bool(flags & FLAG_LAST), ts, columns)
+
+
+def history_selector(coin="*", last=None, start=None, end=None, chunk=None, prefix=HISTORY_PREFIX):
+    params = [f"{k}={v}" for k, v in (("last", last), ("start", start), ("end", end), ("chunk", chunk))
+              if v is not None]
+    return f"{prefix}/{coin}" + ("?" + ";".join(params) if params else "")
+
+
+def _parse_time(value):
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+# ==== Service ====
+class HistoryService:
+    def __init__(self, store_path, prefix=HISTORY_PREFIX, chunk_rows=CHUNK_ROWS,
+                 cache_bytes=CACHE_BYTES, workers=2, writer=None):
+        self.store_path = store_path
+        self.writer = writer
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+        self.cache_bytes = cache_bytes
+        self._history = None
+        self._cache = OrderedDict()     # request -> [payloads]
+        self._cached = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="history")
+        self._queryable = None
+        self.hits = self.misses = self.errors = 0
+
+    def start(self, session):
+        # complete=True: consumers querying with the default target get one
+        # whole answer from the nearest service rather than several merged
+        self._queryable = session.declare_queryable(f"{self.prefix}/*", self._on_query, complete=True)
+        register_stats("tracker_history_cache", self.stats, "History reply cache")
+        print(f"[HISTORY] Serving {self.store_path} on {self.prefix}/*")
+        return self
+
+    def close(self):
+        if self._queryable is not None:
+            self._queryable.undeclare()
+            self._queryable = None
+        self._pool.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors,
+                    "cached_replies": len(self._cache), "cached_bytes": self._cached}
+
+    def _on_query(self, query):
+        # Zenoh's thread only hands the query over; replies are sent from the pool
+        self._pool.submit(self._answer, query)
+
+    def _answer(self, query):
+        with query:
+            key = str(query.key_expr)
+            try:
+                payloads = self.replies(key.rsplit("/", 1)[-1], dict(query.parameters))
+                for payload in payloads:
+                    query.reply(key, payload)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                QUERIES.labels(result="error").inc()
+                log.warn("history query failed", selector=str(query.selector), error=e)
+                query.reply_err(str(e).encode())
+
+    def _open(self):
+        if self.writer is not None:
+            self.writer.flush()
+        with self._lock:
+            if self._history is None:
+                if not os.path.exists(self.store_path):
+                    raise ValueError(f"no history at {self.store_path} yet")
+                self._history = HistoryQuery(self.store_path)
+            else:
+                self._history.refresh()
+            return self._history
+
+    def replies(self, coin, params):
+        """Encoded chunks answering one query, from the cache if an identical
+        query already ran against the same store contents."""
+        unknown = set(params) - {"last", "start", "end", "chunk"}
+        if unknown:
+            raise ValueError(f"unknown parameters: {sorted(unknown)}")
+        history = self._open()
+        if coin == "*":
+            coins = list(history.symbols)
+        elif coin in history.symbols:
+            coins = [coin]
+        else:
+            raise ValueError(f"unknown coin {coin!r}")
+        last = int(params["last"]) if "last" in params else None
+        start = _parse_time(params["start"]) if "start" in params else None
+        end = _parse_time(params["end"]) if "end" in params else None
+        chunk = min(int(params.get("chunk", self.chunk_rows)), MAX_CHUNK_ROWS)
+        if chunk <= 0 or (last is not None and last < 0):
+            raise ValueError("chunk must be positive and last non-negative")
+
+        request = (coin, last, start, end, chunk, len(history.store.segments))
+        with self._lock:
+            cached = self._cache.get(request)
+            if cached is not None:
+                self._cache.move_to_end(request)
+                self.hits += 1
+        if cached is not None:
+            QUERIES.labels(result="hit").inc()
+            yield from cached
+            return
+        with self._lock:
+            self.misses += 1
+        QUERIES.labels(result="miss").inc()
+
+        keep, size, seq = [], 0, 0
+        started = time.perf_counter()
+        scan = history.scan(coins, start, end, last=last, chunk_rows=chunk, dropna=coin != "*")
+        data = next(scan, None)
+        while True:
+            following = next(scan, None) if data is not None else None
+            payload = encode_chunk(seq, coins, data or {"timestamp": [], **{c: [] for c in coins}},
+                                   last=following is None)
+            HISTORY_SECONDS.observe(time.perf_counter() - started)
+            ROWS_SENT.inc(len(data["timestamp"]) if data else 0)
+            if keep is not None:
+                size += len(payload)
+                if size <= min(CACHE_MAX_REPLY, self.cache_bytes):
+                    keep.append(payload)
+                else:
+                    keep = None
+            if following is None:
+                # Cached before the last chunk goes out, so a consumer that
+                # repeats the query straight away already hits it
+                if keep is not None:
+                    self._store(request, keep, size)
+                yield payload
+                break
+            yield payload
+            data, seq, started = following, seq + 1, time.perf_counter()
+
+    def _store(self, request, payloads, size):
+        with self._lock:
+            if request in self._cache:
+                return
+            self._cache[request] = payloads
+            self._cached += size
+            while self._cached > self.cache_bytes:
+                _, old = self._cache.popitem(last=False)
+                self._cached -= sum(len(p) for p in old)
+
+
+# ==== Consumers ====
+def fetch_history(session, coin="*", last=None, start=None, end=None, chunk=None,
+                  timeout=FETCH_TIMEOUT, prefix=HISTORY_PREFIX, capacity=FETCH_CAPACITY):
+    """Query the history service and yield its HistoryChunks in order.
+
+    Replies wait in a FIFO of `capacity` chunks; while the caller is busy
+    with one, Zenoh holds the rest back, so memory stays bounded however
+    much history is asked for. Raises RuntimeError if no service answers,
+    the service reports an error or a chunk goes missing."""
+    import zenoh
+    selector = history_selector(coin, last, start, end, chunk, prefix)
+    replies = session.get(selector, zenoh.handlers.FifoChannel(capacity),
+                          consolidation=zenoh.ConsolidationMode.NONE, timeout=timeout)
+    expected, replier = 0, None
+    for reply in replies:
+        if reply.ok is None:
+            raise RuntimeError(f"history query {selector} failed: {reply.err.payload.to_bytes().decode()}")
+        # Only ever follow one service, should several answer
+        if replier is None:
+            replier = str(reply.replier_id)
+        elif str(reply.replier_id) != replier:
+            continue
+        chunk = decode_chunk(reply.ok.payload.to_bytes())
+        if chunk.seq != expected:
+            raise RuntimeError(f"history query {selector}: chunk {chunk.seq} arrived, expected {expected}")
+        expected += 1
+        yield chunk
+        if chunk.last:
+            return
+    if replier is None:
+        raise RuntimeError(f"no history service answered {selector}")
+    raise RuntimeError(f"history query {selector} ended after {expected} chunks without the last one")
+
+
+def read_history(session, coins=None, **kwargs):
+    """fetch_history() concatenated: (int64 epoch-ns, {coin: float64}). For
+    small windows such as a dashboard warm start; stream larger ones."""
+    ts, columns = [], {}
+    for chunk in fetch_history(session, **kwargs):
+        ts.append(chunk.timestamp)
+        for c, values in chunk.columns.items():
+            if coins is None or c in coins:
+                columns.setdefault(c, []).append(values)
+    return (np.concatenate(ts) if ts else np.empty(0, dtype=np.int64),
+            {c: np.concatenate(v) for c, v in columns.items()})
+
+
+def backfill_store(session, store_path, symbols=None, batch_size=65536, **kwargs):
+    """Append what the history service has after the newest local row to the
+    tick store at `store_path`, one chunk at a time. Creates the store (with
+    the service's symbols) if missing. Returns the number of rows written."""
+    if os.path.exists(store_path) and os.path.getsize(store_path) > 0:
+        store = TickStore(store_path)
+        symbols = symbols or store.symbols
+        if store.segments:
+            kwargs.setdefault("start", max(s.max_ts for s in store.segments) + 1)
+    writer, rows = None, 0
+    try:
+        for chunk in fetch_history(session, "*", **kwargs):
+            if writer is None:
+                writer = open_writer(store_path, symbols or list(chunk.columns), batch_size=batch_size,
+                                     fsync=FSYNC_INTERVAL)
+            rows += writer.append_columns(chunk.timestamp, chunk.columns)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the tick store on crypto/history/*")
+    parser.add_argument("--store", default="crypto_prices.ticks")
+    parser.add_argument("--prefix", default=HISTORY_PREFIX)
+    args = parser.parse_args()
+
+    import zenoh
+    session = zenoh.open(zenoh.Config())
+    HistoryService(args.store, prefix=args.prefix).start(session)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        session.close()
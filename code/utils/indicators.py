@@ -0,0 +1,233 @@
+# utils/indicators.py
+#
+# Streaming technical indicators for every coin of the universe at once.
+#
+# The engine holds one state array per indicator with an entry per coin, and
+# update() folds a price vector (NaN where a coin has no new price) into all
+# of them with a few NumPy operations: O(1) per tick and coin, however much
+# history there is. Per coin, over that coin's own ticks:
+#
+#   sma                  mean of the last `window` prices
+#   bb_upper, bb_lower   Bollinger bands: sma +- bb_k population standard
+#                        deviations of the same window
+#   ema                  exponential average, alpha = 2 / (ema_span + 1)
+#   rsi                  Wilder's RSI: gains and losses smoothed with
+#                        alpha = 1 / rsi_period
+#   vwap                 session VWAP since 00:00 UTC. Volume is the tick
+#                        count, as in the rollups: the feeds carry no volume
+#   volatility           sample standard deviation of the last `vol_window`
+#                        log returns
+#
+# A value is NaN until its coin has enough ticks. Rolling sums are kept
+# relative to a per-coin reference price and recomputed from the window each
+# time it wraps, so they do not drift over millions of ticks.
+#
+# state() / restore() checkpoint the engine as named arrays (save_indicators()
+# writes them to an .npz). Coins are matched by name, so the universe may
+# change between runs, and a coin ignores prices at or before its last
+# timestamp, so a restored engine can be fed history that overlaps it.
+import os
+from contextlib import nullcontext
+
+import numpy as np
+
+INDICATORS = ("sma", "bb_upper", "bb_lower", "ema", "rsi", "vwap", "volatility")
+DAY_NS = 86400 * 1_000_000_000
+NO_TICK = np.iinfo(np.int64).min
+
+
+class _Rolling:
+    """Sum and sum of squares of each row's last `window` values."""
+
+    def __init__(self, n, window):
+        self.window = window
+        self.buf = np.zeros((n, window))
+        self.count = np.zeros(n, dtype=np.int64)
+        self.ref = np.zeros(n)
+        self.s1 = np.zeros(n)
+        self.s2 = np.zeros(n)
+
+    def push(self, rows, x):
+        count = self.count[rows]
+        self.ref[rows[count == 0]] = x[count == 0]
+        slot = count % self.window
+        ref = self.ref[rows]
+        new = x - ref
+        old = np.where(count >= self.window, self.buf[rows, slot] - ref, 0.0)
+        self.s1[rows] += new - old
+        self.s2[rows] += new * new - old * old
+        self.buf[rows, slot] = x
+        self.count[rows] = count + 1
+        wrapped = rows[(count + 1) % self.window == 0]
+        if len(wrapped):
+            # Exact sums again, around the window's mean
+            buf = self.buf[wrapped]
+            ref = buf.mean(axis=1)
+            dev = buf - ref[:, None]
+            self.ref[wrapped] = ref
+            self.s1[wrapped] = dev.sum(axis=1)
+            self.s2[wrapped] = (dev * dev).sum(axis=1)
+
+    def mean(self, rows):
+        full = self.count[rows] >= self.window
+        return np.where(full, self.ref[rows] + self.s1[rows] / self.window, np.nan)
+
+    def var(self, rows, ddof=0):
+        full = self.count[rows] >= self.window
+        s1, w = self.s1[rows], self.window
+        var = np.maximum(self.s2[rows] - s1 * s1 / w, 0.0) / (w - ddof)
+        return np.where(full, var, np.nan)
+
+    def arrays(self):
+        return {"buf": self.buf, "count": self.count, "ref": self.ref, "s1": self.s1, "s2": self.s2}
+
+
+class IndicatorEngine:
+    def __init__(self, coins, window=20, bb_k=2.0, ema_span=20, rsi_period=14, vol_window=30):
+        self.coins = list(coins)
+        self.index = {coin: i for i, coin in enumerate(self.coins)}
+        self.window, self.bb_k = window, bb_k
+        self.ema_span, self.rsi_period, self.vol_window = ema_span, rsi_period, vol_window
+        self.ema_alpha = 2.0 / (ema_span + 1)
+        self.rsi_alpha = 1.0 / rsi_period
+        n = len(self.coins)
+        self.prices = _Rolling(n, window)
+        self.returns = _Rolling(n, vol_window)
+        self.last_ts = np.full(n, NO_TICK, dtype=np.int64)
+        self.last = np.full(n, np.nan)
+        self.ema = np.full(n, np.nan)
+        self.gain = np.full(n, np.nan)
+        self.loss = np.full(n, np.nan)
+        self.moves = np.zeros(n, dtype=np.int64)
+        self.session = np.full(n, NO_TICK, dtype=np.int64)
+        self.session_sum = np.zeros(n)
+        self.session_ticks = np.zeros(n, dtype=np.int64)
+
+    def update(self, ts, prices):
+        """Fold one price vector (universe order, NaN = no price) in at `ts`
+        (epoch ns). Returns the columns that took a price."""
+        prices = np.asarray(prices, dtype=np.float64)
+        rows = np.flatnonzero((prices == prices) & (self.last_ts < ts))
+        if len(rows):
+            self._push(rows, np.full(len(rows), ts, dtype=np.int64), prices[rows])
+        return rows
+
+    def extend(self, samples):
+        """update() for {column: (ts, prices)}, each coin's new samples in time
+        order: the k-th sample of every coin goes in one vectorized step."""
+        samples = {column: (np.asarray(ts, dtype=np.int64), np.asarray(prices, dtype=np.float64))
+                   for column, (ts, prices) in samples.items() if len(ts)}
+        if not samples:
+            return
+        columns = np.fromiter(samples, dtype=np.int64)
+        steps = max(len(ts) for ts, _ in samples.values())
+        ts = np.full((steps, len(columns)), NO_TICK, dtype=np.int64)
+        prices = np.full((steps, len(columns)), np.nan)
+        for j, (t, p) in enumerate(samples.values()):
+            ts[:len(t), j], prices[:len(p), j] = t, p
+        for t, p in zip(ts, prices):
+            keep = (p == p) & (self.last_ts[columns] < t)
+            if keep.any():
+                self._push(columns[keep], t[keep], p[keep])
+
+    def _push(self, rows, ts, x):
+        last = self.last[rows]
+        moved = last == last
+        if moved.any():
+            m = rows[moved]
+            delta = x[moved] - last[moved]
+            gain, loss = np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+            first = self.moves[m] == 0
+            a = self.rsi_alpha
+            self.gain[m] = np.where(first, gain, self.gain[m] + a * (gain - self.gain[m]))
+            self.loss[m] = np.where(first, loss, self.loss[m] + a * (loss - self.loss[m]))
+            self.moves[m] += 1
+            self.returns.push(m, np.log(x[moved] / last[moved]))
+
+        ema = self.ema[rows]
+        self.ema[rows] = np.where(moved, ema + self.ema_alpha * (x - ema), x)
+        self.prices.push(rows, x)
+
+        day = ts // DAY_NS
+        fresh = day != self.session[rows]
+        self.session[rows] = day
+        self.session_sum[rows] = np.where(fresh, 0.0, self.session_sum[rows]) + x
+        self.session_ticks[rows] = np.where(fresh, 0, self.session_ticks[rows]) + 1
+
+        self.last[rows] = x
+        self.last_ts[rows] = ts
+
+    # ---- reading ----
+    def values(self, rows=None):
+        """{indicator: array} for `rows` (default every coin), NaN where a
+        coin does not have enough ticks yet."""
+        rows = np.arange(len(self.coins)) if rows is None else np.asarray(rows, dtype=np.int64)
+        sma = self.prices.mean(rows)
+        band = self.bb_k * np.sqrt(self.prices.var(rows))
+        gain, loss = self.gain[rows], self.loss[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+            vwap = self.session_sum[rows] / self.session_ticks[rows]
+        return {
+            "sma": sma,
+            "bb_upper": sma + band,
+            "bb_lower": sma - band,
+            "ema": self.ema[rows],
+            "rsi": np.where(self.moves[rows] >= self.rsi_period, rsi, np.nan),
+            "vwap": vwap,
+            "volatility": np.sqrt(self.returns.var(rows, ddof=1)),
+        }
+
+    def get(self, coin):
+        """{indicator: float or None} for one coin"""
+        values = self.values([self.index[coin]])
+        return {name: None if v[0] != v[0] else float(v[0]) for name, v in values.items()}
+
+    # ---- persistence ----
+    def params(self):
+        return np.array([self.window, self.bb_k, self.ema_span, self.rsi_period, self.vol_window], dtype=np.float64)
+
+    def _arrays(self):
+        out = {f"prices/{k}": v for k, v in self.prices.arrays().items()}
+        out.update({f"returns/{k}": v for k, v in self.returns.arrays().items()})
+        for name in ("last_ts", "last", "ema", "gain", "loss", "moves", "session", "session_sum", "session_ticks"):
+            out[name] = getattr(self, name)
+        return out
+
+    def state(self):
+        return {"coins": np.array(self.coins), "params": self.params(), **self._arrays()}
+
+    def restore(self, state):
+        """Load the coins of a state() that are in this engine's universe.
+        A state saved with other parameters is ignored. Returns the number of
+        coins restored."""
+        if "params" not in state or not np.array_equal(state["params"], self.params()):
+            return 0
+        saved = [str(coin) for coin in state["coins"]]
+        pairs = [(i, self.index[coin]) for i, coin in enumerate(saved) if coin in self.index]
+        if not pairs:
+            return 0
+        src, dst = (np.array(side, dtype=np.int64) for side in zip(*pairs))
+        for name, array in self._arrays().items():
+            array[dst] = state[name][src]
+        return len(pairs)
+
+
+def save_indicators(path, engine, lock=None):
+    """Atomically write an engine's state() to an .npz file. With the `lock`
+    that guards `engine`, it is held only while the state is copied."""
+    with lock or nullcontext():
+        state = {name: np.array(value) for name, value in engine.state().items()}
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **state)
+    os.replace(tmp, path)
+
+
+def load_indicators(path, engine):
+    """Restore `engine` from save_indicators()'s file, if there is one.
+    Returns the number of coins restored."""
+    if not os.path.exists(path):
+        return 0
+    with np.load(path) as state:
+        return engine.restore(dict(state))
@@ -0,0 +1,168 @@
+# utils/ingest.py
+#
+# Fixed-rate, concurrent price ingestion.
+#
+# All sources share one keep-alive HTTP session and run in parallel on a
+# thread pool. Ticks are scheduled against an absolute clock
+# (start + k * period), so fetch latency never accumulates into drift; a
+# tick that overruns simply skips the slots it missed. Each source has its
+# own timeout, jittered exponential retries and a circuit breaker, and the
+# results of one tick are merged into a single timestamped snapshot.
+# Fetch latency, failures and missed ticks are recorded in utils.metrics.
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.log import get_logger
+from utils.metrics import STAGE_SECONDS, counter
+from utils.tick_validator import clean_price
+
+log = get_logger("INGEST")
+FETCH_SECONDS = STAGE_SECONDS.labels(stage="fetch")
+FETCH_FAILURES = counter("tracker_fetch_failures_total", "Failed fetch attempts per source", ["source"])
+MISSED_TICKS = counter("tracker_fetch_missed_total", "Ticks a source did not answer in time", ["source"])
+SNAPSHOTS = counter("tracker_snapshots_total", "Merged price snapshots handed to publish")
+
+
+def make_session(pool_size=16, user_agent="Mozilla/5.0"):
+    """requests.Session with a connection pool shared by every source."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = user_agent
+    return session
+
+
+class CircuitBreaker:
+    """Open after `threshold` consecutive failures; allow one trial call
+    after `reset_timeout` seconds (half-open) and close again on success."""
+
+    def __init__(self, threshold=5, reset_timeout=60.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class Source:
+    """A price source: `fetch(session, timeout)` returns {coin: price} or a falsy value."""
+
+    def __init__(self, name, fetch, timeout=5.0, retries=2, backoff=0.5, breaker=None):
+        self.name = name
+        self.fetch = fetch
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+    @property
+    def budget(self):
+        """Worst-case seconds one tick can spend on this source."""
+        return sum(self.timeout + self.backoff * 2 ** i * 1.5 for i in range(self.retries + 1))
+
+    def poll(self, session):
+        if not self.breaker.allow():
+            return None
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                prices = self.fetch(session, self.timeout)
+            except Exception as e:
+                log.warn("fetch failed", source=self.name, error=e)
+                prices = None
+            FETCH_SECONDS.observe(time.perf_counter() - start)
+            if prices:
+                self.breaker.record_success()
+                return prices
+            FETCH_FAILURES.labels(source=self.name).inc()
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+        self.breaker.record_failure()
+        if self.breaker.state != "closed":
+            log.warn("circuit open", source=self.name)
+        return None
+
+
+class IngestScheduler:
+    def __init__(self, sources, publish, period=10.0, session=None):
+        """`publish(snapshot)` receives {"timestamp", "prices", "sources"}.
+        Earlier sources win when several report the same coin."""
+        self.sources = list(sources)
+        self.publish = publish
+        self.period = period
+        self.session = session or make_session(pool_size=max(4, 2 * len(self.sources)))
+        self._pool = ThreadPoolExecutor(max_workers=2 * len(self.sources), thread_name_prefix="ingest")
+        self._stop = threading.Event()
+
+    def tick(self):
+        futures = {self._pool.submit(src.poll, self.session): src for src in self.sources}
+        deadline = max(src.budget for src in self.sources)
+        done, _ = wait(futures, timeout=min(deadline, self.period))
+        timestamp = datetime.now().isoformat()
+
+        merged, names = {}, []
+        for future, src in futures.items():
+            if future not in done:
+                MISSED_TICKS.labels(source=src.name).inc()
+                log.warn("missed the tick", source=src.name)
+                continue
+            prices = future.result()
+            if not prices:
+                continue
+            names.append(src.name)
+            for coin, price in prices.items():
+                # A source's 0 / "NA" must not hide a real price from the next one
+                if clean_price(price) == clean_price(price):
+                    merged.setdefault(coin, price)
+        if not merged:
+            return None
+        return {"timestamp": timestamp, "prices": merged, "sources": names}
+
+    def run(self):
+        start = time.monotonic()
+        k = 0
+        while not self._stop.is_set():
+            snapshot = self.tick()
+            if snapshot:
+                SNAPSHOTS.inc()
+                try:
+                    self.publish(snapshot)
+                except Exception as e:
+                    log.error("publish failed", error=e)
+            # Next slot on the absolute grid; skip slots we overran
+            k = max(k + 1, int((time.monotonic() - start) // self.period) + 1)
+            self._stop.wait(max(0.0, start + k * self.period - time.monotonic()))
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)
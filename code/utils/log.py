@@ -0,0 +1,162 @@
+# utils/log.py
+#
+# Asynchronous, rate-limited structured logging for the hot path.
+#
+#   log = get_logger("ZENOH")
+#   log.error("decode failed", error=e, key=key)
+#   -> [ZENOH ERROR] decode failed error="bad magic" key=crypto/prices
+#
+# Lines keep the "[TAG]" / "[TAG WARN]" / "[TAG ERROR]" prefixes the services
+# always printed, followed by key=value fields; LOG_FORMAT=json prints one
+# JSON object per line instead.
+#
+# The calling thread never touches stdout. It checks a token bucket per
+# (tag, message) - LOG_RATE lines per second with bursts of LOG_BURST - and
+# appends the record to a bounded queue; a daemon thread formats and writes.
+# Lines over the rate are counted and the count is reported on the next line
+# that gets through ("suppressed=N"). If the writer falls behind by
+# QUEUE_SIZE lines, new lines are dropped and counted rather than blocking.
+# Counts are exported through utils.metrics.
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from utils.metrics import counter
+
+RATE = float(os.environ.get("LOG_RATE", 1.0))
+BURST = float(os.environ.get("LOG_BURST", 5))
+FORMAT = os.environ.get("LOG_FORMAT", "text")
+QUEUE_SIZE = 10_000
+
+INFO, WARN, ERROR = "info", "warn", "error"
+
+_lines = counter("tracker_log_lines_total", "Log lines written", ["level"])
+_suppressed = counter("tracker_log_suppressed_total", "Log lines held back by the rate limit")
+_dropped = counter("tracker_log_dropped_total", "Log lines dropped because the writer fell behind")
+
+
+class _Writer:
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, record):
+        if len(self._queue) >= QUEUE_SIZE:
+            _dropped.inc()
+            return
+        self._queue.append(record)
+        if self._thread is None:
+            self._start()
+        self._wake.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="log-writer")
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines = []
+            while self._queue:
+                record = self._queue.popleft()
+                lines.append(_format(record))
+                _lines.labels(level=record[1]).inc()
+            if lines:
+                stream = self.stream or sys.stdout
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+
+
+def _format(record):
+    ts, level, tag, message, fields = record
+    if FORMAT == "json":
+        return json.dumps({"ts": datetime.fromtimestamp(ts).isoformat(), "level": level, "tag": tag,
+                           "msg": message, **{k: _plain(v) for k, v in fields.items()}})
+    prefix = f"[{tag}]" if level == INFO else f"[{tag} {level.upper()}]"
+    parts = [prefix, message] + [f"{k}={_quote(v)}" for k, v in fields.items()]
+    return " ".join(parts)
+
+
+def _plain(value):
+    return value if isinstance(value, (int, float, str, bool, type(None))) else str(value)
+
+
+def _quote(value):
+    text = str(value)
+    return json.dumps(text) if not text or any(c in text for c in ' "=') else text
+
+
+_writer = _Writer()
+
+
+class Logger:
+    def __init__(self, tag, rate=None, burst=None):
+        self.tag = tag
+        self.rate = RATE if rate is None else rate
+        self.burst = BURST if burst is None else burst
+        self._buckets = {}          # message -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+
+    def _allow(self, message):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(message)
+            if bucket is None:
+                bucket = self._buckets[message] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                _suppressed.inc()
+                return None
+            bucket[0] -= 1.0
+            suppressed, bucket[2] = bucket[2], 0
+            return suppressed
+
+    def log(self, level, message, **fields):
+        suppressed = self._allow(message)
+        if suppressed is None:
+            return
+        if suppressed:
+            fields["suppressed"] = suppressed
+        _writer.submit((time.time(), level, self.tag, message, fields))
+
+    def info(self, message, **fields):
+        self.log(INFO, message, **fields)
+
+    def warn(self, message, **fields):
+        self.log(WARN, message, **fields)
+
+    def error(self, message, **fields):
+        self.log(ERROR, message, **fields)
+
+
+_loggers = {}
+
+
+def get_logger(tag):
+    logger = _loggers.get(tag)
+    if logger is None:
+        logger = _loggers.setdefault(tag, Logger(tag))
+    return logger
+
+
+def flush():
+    """Write everything queued so far (tests, shutdown paths that skip atexit)."""
+    _writer.flush()
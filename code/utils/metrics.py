@@ -0,0 +1,317 @@
+# utils/metrics.py
+#
+# Counters, gauges and latency histograms for the hot path, exposed in the
+# Prometheus text format.
+#
+# Histograms are HDR-style: log-linear buckets, SUB_BUCKETS per power of two
+# from MIN_VALUE up, so any recorded value is kept to within ~6% relative
+# error over nine decades at a fixed memory cost. observe() is one frexp and
+# a list increment under a lock (about a microsecond). Scrapes report
+# the octave boundaries as Prometheus `le` buckets, which sum the fine
+# buckets exactly, plus p50/p90/p99 from the fine buckets as a separate
+# `<name>_quantile` gauge.
+#
+# Components that already keep their own counters (SampleQueue.stats(),
+# TickValidator.stats(), ...) are exported with register_stats(), which
+# reads them only when scraped.
+#
+#   STAGE_SECONDS.labels(stage="decode").observe(elapsed)
+#   install_metrics_route(app.server)       # /metrics on the Dash server
+#   start_metrics_server(9101)              # publishers without a web server
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MIN_VALUE = 1e-6        # seconds; anything faster lands in the first bucket
+OCTAVES = 28            # 1 us .. ~268 s
+SUB_BUCKETS = 8
+QUANTILES = (0.5, 0.9, 0.99)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    """A metric name with a fixed set of label names; one child per label set."""
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def labels(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def __getattr__(self, attr):
+        # Unlabelled families forward inc()/set()/observe() to their only child
+        if attr.startswith("_") or self.labelnames:
+            raise AttributeError(attr)
+        return getattr(self._children[()], attr)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(child.lines(self.name, dict(zip(self.labelnames, key))))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def lines(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {_format_value(self.value)}"]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        # Always <name>_total, on the HELP/TYPE lines and the samples alike
+        super().__init__(name if name.endswith("_total") else f"{name}_total", help, labelnames)
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+
+class _HistogramValue:
+    def __init__(self):
+        self.counts = [0] * (OCTAVES * SUB_BUCKETS + 2)    # + underflow, overflow
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        if value < MIN_VALUE:
+            index = 0
+        else:
+            mantissa, exponent = math.frexp(value / MIN_VALUE)     # mantissa in [0.5, 1)
+            index = (exponent - 1) * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS) + 1
+            if index > OCTAVES * SUB_BUCKETS:
+                index = OCTAVES * SUB_BUCKETS + 1
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    @staticmethod
+    def upper_bound(index):
+        if index == 0:
+            return MIN_VALUE
+        if index > OCTAVES * SUB_BUCKETS:
+            return math.inf
+        octave, sub = divmod(index - 1, SUB_BUCKETS)
+        return MIN_VALUE * 2 ** octave * (1 + (sub + 1) / SUB_BUCKETS)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def quantile(self, q, snapshot=None):
+        counts, count, _ = snapshot or self.snapshot()
+        if not count:
+            return math.nan
+        rank = q * count
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if n and seen >= rank:
+                return float(f"{min(self.upper_bound(index), MIN_VALUE * 2 ** OCTAVES):.6g}")
+        return MIN_VALUE * 2 ** OCTAVES
+
+    def lines(self, name, labels, snapshot=None):
+        counts, count, total = snapshot or self.snapshot()
+        cumulative = counts[0]
+        out = [f"{name}_bucket{_format_labels({**labels, 'le': repr(MIN_VALUE)})} {cumulative}"]
+        for octave in range(OCTAVES):
+            start = 1 + octave * SUB_BUCKETS
+            cumulative += sum(counts[start:start + SUB_BUCKETS])
+            le = MIN_VALUE * 2 ** (octave + 1)
+            out.append(f"{name}_bucket{_format_labels({**labels, 'le': repr(le)})} {cumulative}")
+        out.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+        out.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        out.append(f"{name}_count{_format_labels(labels)} {count}")
+        return out
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def _new_child(self):
+        return _HistogramValue()
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        # HDR quantiles from the fine buckets, as a companion gauge family
+        quantiles = [f"# HELP {self.name}_quantile {self.help}, quantiles since start",
+                     f"# TYPE {self.name}_quantile gauge"]
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            snapshot = child.snapshot()
+            lines.extend(child.lines(self.name, labels, snapshot))
+            if snapshot[1]:
+                quantiles += [f"{self.name}_quantile{_format_labels({**labels, 'quantile': str(q)})} "
+                              f"{_format_value(child.quantile(q, snapshot))}" for q in QUANTILES]
+        return lines + quantiles
+
+
+class _Timer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+# ==== Registry ====
+class Registry:
+    def __init__(self):
+        self._families = {}
+        self._stats = []
+        self._lock = threading.Lock()
+
+    def _add(self, cls, name, help, labelnames):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = cls(name, help, labelnames)
+            elif not isinstance(family, cls) or family.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} is already registered differently")
+            return family
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=()):
+        return self._add(Histogram, name, help, labelnames)
+
+    def register_stats(self, prefix, stats, help=None):
+        """Export every numeric value of `stats()` as the gauge <prefix>_<key> at scrape time."""
+        with self._lock:
+            self._stats.append((prefix, stats, help or prefix.replace("_", " ")))
+
+    def render(self):
+        with self._lock:
+            families = list(self._families.values())
+            stats = list(self._stats)
+        lines = []
+        for family in families:
+            lines.extend(family.collect())
+        for prefix, fn, help in stats:
+            try:
+                values = fn()
+            except Exception as e:
+                lines.append(f"# {prefix}: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    name = f"{prefix}_{key}"
+                    lines += [f"# HELP {name} {help}: {key}", f"# TYPE {name} gauge",
+                              f"{name} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+register_stats = REGISTRY.register_stats
+render = REGISTRY.render
+
+# Shared by every process: one histogram per pipeline stage
+STAGE_SECONDS = histogram("tracker_stage_seconds",
+                          "Seconds per call of a pipeline stage (fetch, publish, decode, persist, predict)",
+                          ["stage"])
+CALLBACK_SECONDS = histogram("tracker_callback_seconds", "Seconds per Dash callback render", ["callback"])
+gauge("tracker_process_start_time_seconds", "Unix time the process started").set(time.time())
+
+
+# ==== Exposition ====
+def install_metrics_route(server, path="/metrics"):
+    """Serve the registry from a Flask server (the Dash app's)."""
+    from flask import Response
+    server.add_url_rule(path, "metrics", lambda: Response(render(), mimetype=CONTENT_TYPE.split(";")[0],
+                                                          content_type=CONTENT_TYPE))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread, for processes without a web server.
+    The port defaults to $METRICS_PORT; 0 or unset disables it. Returns the
+    server or None."""
+    port = int(os.environ.get("METRICS_PORT", 0)) if port is None else port
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
@@ -0,0 +1,141 @@
+# utils/news_service.py
+#
+# Per-coin news fetched on a background asyncio loop.
+#
+# Readers only ever touch the in-memory cache: fresh entries are returned as
+# is, stale ones are returned immediately while a refresh runs in the
+# background (stale-while-revalidate), and concurrent refreshes of the same
+# coin share one request. Every successful refresh can be published on Zenoh,
+# on the coin's own key (crypto/news/<coin>; the publisher's general feed
+# keeps crypto/news itself).
+import asyncio
+import json
+import threading
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import quote_plus
+
+import requests
+
+from utils.log import get_logger
+
+log = get_logger("NEWS")
+
+NEWS_URL_TEMPLATE = "https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
+NEWS_PREFIX = "crypto/news"
+PLACEHOLDER = [{"title": "Loading news...", "url": "#"}]
+FAILED = [{"title": "Failed to load news. Please try again later.", "url": "#"}]
+
+
+def news_key(coin):
+    return f"{NEWS_PREFIX}/{coin}"
+
+
+def parse_rss(content, limit=5):
+    root = ET.fromstring(content)
+    news = []
+    for item in root.iter("item"):
+        title = item.findtext("title")
+        if title:
+            news.append({"title": title, "url": item.findtext("link") or "#"})
+        if len(news) >= limit:
+            break
+    return news
+
+
+class NewsService:
+    def __init__(self, coins, ttl=300.0, max_stale=3600.0, timeout=10.0,
+                 url_template=NEWS_URL_TEMPLATE, publish=None):
+        """`publish(key, payload)` is called with each refreshed feed (e.g. session.put).
+        Entries older than `ttl` are revalidated; after `max_stale` they are dropped."""
+        self.coins = list(coins)
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.url_template = url_template
+        self.publish = publish
+        self._cache = {}        # coin -> (fetched_at, items)
+        self._inflight = {}     # coin -> asyncio.Task
+        self._lock = threading.Lock()
+        self._http = requests.Session()
+        self._loop = None
+        self._thread = None
+
+    # ---- reader side (any thread, never blocks on the network) ----
+    def get(self, coin):
+        with self._lock:
+            entry = self._cache.get(coin)
+        now = time.monotonic()
+        if entry is None or now - entry[0] > self.ttl:
+            self.refresh(coin)
+        if entry is None or now - entry[0] > self.max_stale:
+            return PLACEHOLDER
+        return entry[1]
+
+    def refresh(self, coin):
+        """Schedule a refresh of `coin` on the news loop (coalesced)."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._ensure_refresh, coin)
+
+    # ---- news loop ----
+    def _ensure_refresh(self, coin):
+        task = self._inflight.get(coin)
+        if task is None or task.done():
+            self._inflight[coin] = self._loop.create_task(self._refresh(coin))
+        return self._inflight[coin]
+
+    async def _refresh(self, coin):
+        try:
+            items = await self._loop.run_in_executor(None, self._fetch, coin)
+        except Exception as e:
+            log.error("fetch failed", coin=coin, error=e)
+            with self._lock:
+                if coin not in self._cache:
+                    # Cache the failure briefly so readers stop seeing "Loading"
+                    self._cache[coin] = (time.monotonic() - self.ttl + 30.0, FAILED)
+            return
+        with self._lock:
+            self._cache[coin] = (time.monotonic(), items)
+        if self.publish is not None:
+            try:
+                self.publish(news_key(coin), json.dumps({"coin": coin, "news": items}))
+            except Exception as e:
+                log.error("publish failed", coin=coin, error=e)
+
+    def _fetch(self, coin):
+        url = self.url_template.format(query=quote_plus(f"{coin} cryptocurrency"))
+        response = self._http.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return parse_rss(response.content)
+
+    async def _poll(self):
+        # Keep every configured coin warm so first viewers rarely wait
+        while True:
+            await asyncio.gather(*(self._ensure_refresh(c) for c in self.coins),
+                                 return_exceptions=True)
+            await asyncio.sleep(self.ttl)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.create_task(self._poll())
+        self._loop.run_forever()
+
+    def start(self):
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            if not self._thread.is_alive():
+                # Let the poller and any refresh unwind instead of being destroyed pending
+                tasks = asyncio.all_tasks(self._loop)
+                for task in tasks:
+                    task.cancel()
+                self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+                self._loop.close()
+            self._loop = self._thread = None
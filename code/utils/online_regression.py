@@ -0,0 +1,154 @@
+# utils/online_regression.py
+#
+# Ordinary least squares y = a + b*x kept as running sufficient statistics
+# (n, Σx, Σy, Σxy, Σx²), so adding or removing a sample is O(1) and a
+# prediction is always available without refitting.
+from collections import deque
+
+import numpy as np
+
+
+class OnlineLinearRegression:
+    """Single-feature linear regression updated one sample at a time.
+
+    decay < 1 turns it into an exponentially weighted fit: every update first
+    scales the existing statistics by `decay`, so a sample k updates old has
+    weight decay**k. x is stored relative to the first x seen to keep the
+    sums well conditioned for large values such as epoch seconds.
+    """
+
+    def __init__(self, decay=1.0):
+        if not 0.0 < decay <= 1.0:
+            raise ValueError("decay must be in (0, 1]")
+        self.decay = decay
+        self.x0 = None
+        self.reset()
+
+    def reset(self):
+        self.n = 0.0
+        self.sx = self.sy = self.sxy = self.sxx = 0.0
+
+    def update(self, x, y):
+        if self.x0 is None:
+            self.x0 = float(x)
+        if self.decay != 1.0:
+            d = self.decay
+            self.n *= d
+            self.sx *= d
+            self.sy *= d
+            self.sxy *= d
+            self.sxx *= d
+        dx = float(x) - self.x0
+        y = float(y)
+        self.n += 1.0
+        self.sx += dx
+        self.sy += y
+        self.sxy += dx * y
+        self.sxx += dx * dx
+
+    def remove(self, x, y):
+        """Subtract a sample previously added (only meaningful without decay)."""
+        dx = float(x) - self.x0
+        y = float(y)
+        self.n -= 1.0
+        self.sx -= dx
+        self.sy -= y
+        self.sxy -= dx * y
+        self.sxx -= dx * dx
+
+    def partial_fit(self, x, y):
+        """Add a batch of samples; vectorized equivalent of calling update() per row."""
+        x = np.asarray(x, dtype=np.float64).ravel()
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if len(x) == 0:
+            return self
+        if self.x0 is None:
+            self.x0 = float(x[0])
+        dx = x - self.x0
+        if self.decay != 1.0:
+            w = self.decay ** np.arange(len(x) - 1, -1, -1, dtype=np.float64)
+            scale = self.decay ** len(x)
+        else:
+            w = np.ones_like(dx)
+            scale = 1.0
+        self.n = self.n * scale + w.sum()
+        self.sx = self.sx * scale + (w * dx).sum()
+        self.sy = self.sy * scale + (w * y).sum()
+        self.sxy = self.sxy * scale + (w * dx * y).sum()
+        self.sxx = self.sxx * scale + (w * dx * dx).sum()
+        return self
+
+    @property
+    def ready(self):
+        return self.n >= 2 and self._denominator() > 0
+
+    def _denominator(self):
+        return self.n * self.sxx - self.sx * self.sx
+
+    @property
+    def slope(self):
+        den = self._denominator()
+        if self.n < 2 or den <= 0:
+            return 0.0
+        return (self.n * self.sxy - self.sx * self.sy) / den
+
+    @property
+    def intercept(self):
+        """Intercept in the caller's x units (not the centred ones)."""
+        if self.n == 0:
+            return float("nan")
+        b = self.slope
+        return (self.sy - b * self.sx) / self.n - b * self.x0
+
+    def predict(self, x):
+        if self.n == 0:
+            return float("nan")
+        b = self.slope
+        return (self.sy - b * self.sx) / self.n + b * (float(x) - self.x0)
+
+
+class SlidingWindowRegression(OnlineLinearRegression):
+    """OLS over the last `window` samples and/or the last `span` x-units.
+
+    Evicted samples are subtracted from the sums. Because repeated add/subtract
+    accumulates rounding error, the sums are rebuilt from the window after
+    every `window` evictions, which keeps updates amortized O(1).
+    """
+
+    def __init__(self, window=None, span=None):
+        if window is None and span is None:
+            raise ValueError("need a window size or a span")
+        super().__init__()
+        self.window = window
+        self.span = span
+        self.samples = deque()
+        self._evictions = 0
+
+    def update(self, x, y):
+        x, y = float(x), float(y)
+        super().update(x, y)
+        self.samples.append((x, y))
+        while self.samples and (
+                (self.window is not None and len(self.samples) > self.window) or
+                (self.span is not None and x - self.samples[0][0] > self.span)):
+            self.remove(*self.samples.popleft())
+            self._evictions += 1
+        if self._evictions >= max(len(self.samples), 1):
+            self._rebuild()
+
+    def partial_fit(self, x, y):
+        for xi, yi in zip(np.asarray(x).ravel(), np.asarray(y).ravel()):
+            self.update(xi, yi)
+        return self
+
+    def _rebuild(self):
+        self.reset()
+        self.x0 = self.samples[0][0] if self.samples else None
+        for x, y in self.samples:
+            dx = x - self.x0
+            self.n += 1.0
+            self.sx += dx
+            self.sy += y
+            self.sxy += dx * y
+            self.sxx += dx * dx
+        self._evictions = 0
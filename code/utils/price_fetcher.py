@@ -1,12 +1,13 @@
 # utils/price_fetcher.py
 import requests
 
-def fetch_crypto_prices():
+def fetch_crypto_prices(http=None, timeout=10):
+    http = http or requests
     try:
         url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin,ethereum&vs_currencies=usd"
         print(f"Making request to: {url}")  # Debug line
         
-        response = requests.get(url)
+        response = http.get(url, timeout=timeout)
         print(f"Response status: {response.status_code}")  # Debug line
         print(f"Raw response: {response.text}")  # Debug line
         
@@ -0,0 +1,152 @@
+# utils/ring_buffer.py
+#
+# Fixed-capacity (timestamp, price) history backed by preallocated NumPy
+# arrays.
+#
+# Every sample is written twice, at i and i + capacity, so the most recent
+# n samples always sit in one contiguous slice. window(n) therefore returns
+# plain array views: no copy, no wrap-around handling, whatever n is.
+#
+# PriceMatrix holds the rings of many coins as one (coins, 2 * capacity)
+# array per field: a tick is a price vector in coin order, appended with a
+# few fancy-indexed writes however many coins there are. m[coin] is a
+# PriceRing over that coin's row, for readers.
+import numpy as np
+
+
+class PriceRing:
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._ts = np.zeros(2 * self.capacity, dtype=np.int64)
+        self._price = np.full(2 * self.capacity, np.nan, dtype=np.float64)
+        self._count = 0     # total samples ever appended
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def total(self):
+        return self._count
+
+    def append(self, ts, price):
+        i = self._count % self.capacity
+        self._ts[i] = self._ts[i + self.capacity] = ts
+        self._price[i] = self._price[i + self.capacity] = price
+        self._count += 1
+
+    def extend(self, ts, prices):
+        """Append many samples with a few slice assignments."""
+        ts = np.asarray(ts, dtype=np.int64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(ts) > self.capacity:
+            self._count += len(ts) - self.capacity
+            ts, prices = ts[-self.capacity:], prices[-self.capacity:]
+        start = self._count % self.capacity
+        first = min(len(ts), self.capacity - start)
+        for offset, (lo, hi) in ((start, (0, first)), (0, (first, len(ts)))):
+            n = hi - lo
+            if n:
+                for buf, src in ((self._ts, ts), (self._price, prices)):
+                    buf[offset:offset + n] = src[lo:hi]
+                    buf[offset + self.capacity:offset + self.capacity + n] = src[lo:hi]
+        self._count += len(ts)
+
+    def window(self, n=None):
+        """Views of the last n samples (all retained samples by default), oldest first.
+
+        The views alias the buffer: they stay valid until another `capacity`
+        samples have been appended. Copy them if you need to keep them longer.
+        """
+        size = len(self)
+        n = size if n is None else max(0, min(int(n), size))
+        end = (self._count - 1) % self.capacity + self.capacity + 1 if self._count else 0
+        ts = self._ts[end - n:end]
+        prices = self._price[end - n:end]
+        ts.flags.writeable = prices.flags.writeable = False
+        return ts, prices
+
+    def since(self, start_ts):
+        """Views of the samples with timestamp >= start_ts (timestamps appended in order)."""
+        ts, prices = self.window()
+        i = int(np.searchsorted(ts, start_ts, side="left"))
+        return ts[i:], prices[i:]
+
+    def last(self):
+        if not self._count:
+            return None
+        i = (self._count - 1) % self.capacity
+        return int(self._ts[i]), float(self._price[i])
+
+
+def append_row(ts_buf, price_buf, counts, capacity, ts, prices):
+    """Append one tick (prices in row order, NaN = no price) to double-written
+    (rows, 2 * capacity) ring arrays. Returns the rows that got a sample."""
+    rows = np.flatnonzero(~np.isnan(prices))
+    i = counts[rows] % capacity
+    ts_buf[rows, i] = ts_buf[rows, i + capacity] = ts
+    price_buf[rows, i] = price_buf[rows, i + capacity] = prices[rows]
+    counts[rows] += 1
+    return rows
+
+
+class PriceMatrix:
+    def __init__(self, coins, capacity):
+        self.coins = list(coins)
+        self.index = {coin: i for i, coin in enumerate(self.coins)}
+        self.capacity = int(capacity)
+        n = len(self.coins)
+        self._ts = np.zeros((n, 2 * self.capacity), dtype=np.int64)
+        self._price = np.full((n, 2 * self.capacity), np.nan, dtype=np.float64)
+        self._counts = np.zeros(n, dtype=np.int64)
+        self._rings = {}
+
+    def __len__(self):
+        return len(self.coins)
+
+    def __iter__(self):
+        return iter(self.coins)
+
+    def __contains__(self, coin):
+        return coin in self.index
+
+    def __getitem__(self, coin):
+        ring = self._rings.get(coin)
+        if ring is None:
+            ring = self._rings[coin] = MatrixRing(self, self.index[coin])
+        return ring
+
+    @property
+    def totals(self):
+        return self._counts
+
+    def append_row(self, ts, prices):
+        """One tick: epoch-ns timestamp and a float64 vector in coin order (NaN
+        where a coin has no price). Returns the indices of the coins appended to."""
+        return append_row(self._ts, self._price, self._counts, self.capacity, ts,
+                          np.asarray(prices, dtype=np.float64))
+
+    def latest(self):
+        """(ts, prices) vectors of every coin's newest sample; 0 / NaN for coins without one."""
+        have = self._counts > 0
+        i = np.where(have, (self._counts - 1) % self.capacity, 0)
+        rows = np.arange(len(self.coins))
+        return np.where(have, self._ts[rows, i], 0), np.where(have, self._price[rows, i], np.nan)
+
+
+class MatrixRing(PriceRing):
+    """PriceRing over one row of a PriceMatrix; appends go into the matrix."""
+
+    def __init__(self, matrix, row):
+        self.capacity = matrix.capacity
+        self._ts = matrix._ts[row]
+        self._price = matrix._price[row]
+        self._counts = matrix._counts
+        self._row = row
+
+    @property
+    def _count(self):
+        return int(self._counts[self._row])
+
+    @_count.setter
+    def _count(self, value):
+        self._counts[self._row] = value
@@ -0,0 +1,293 @@
+# utils/rollup.py
+#
+# Multi-resolution OHLCV bars per coin (1 s -> 1 min -> 1 h -> 1 d).
+#
+# Every tick updates the open bar of each level in O(1); when a tick falls in
+# a new bucket the open bar is sealed into that level's ring. extend() does
+# the same for a block of ticks with NumPy reductions, for rebuilding a
+# coin's pyramid from the tick store. Long-range
+# charts ask query() for a time range and a target point count and get bars
+# from the coarsest level that still has about that many points, so the
+# payload size does not depend on how much history we hold.
+#
+# Volume is the number of ticks in the bar: the feeds carry no traded volume.
+#
+# Rings start small and double as bars are sealed, up to the level's
+# retention, so a coin with a few days of history holds a few days of bars
+# rather than 5 years of empty 1 h slots. save_rollups() writes a directory
+# with one file per coin and level and rewrites a level's bars only when
+# they changed since the last save; the open bars go in a small file per
+# coin that is rewritten every time.
+import os
+from contextlib import nullcontext
+
+import numpy as np
+
+NS = 1_000_000_000
+# (name, bar width in ns, bars retained)
+LEVELS = (
+    ("1s", NS, 6 * 3600),               # 6 hours
+    ("1min", 60 * NS, 30 * 24 * 60),    # 30 days
+    ("1h", 3600 * NS, 5 * 365 * 24),    # 5 years
+    ("1d", 86400 * NS, 20 * 365),       # 20 years
+)
+FIELDS = ("open", "high", "low", "close", "volume")
+INITIAL_BARS = 256      # first ring allocation, doubled as bars arrive
+
+
+class BarRing:
+    """Sealed bars of one level, stored twice (like PriceRing) for contiguous
+    views. Holds at most `capacity` bars; the arrays grow to that as needed."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.size = min(capacity, INITIAL_BARS)    # bars the arrays hold now
+        self.t = np.zeros(2 * self.size, dtype=np.int64)
+        self.v = np.zeros((len(FIELDS), 2 * self.size), dtype=np.float64)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def reserve(self, n):
+        """Grow the arrays to hold n bars (at most capacity). Only called
+        before the ring wraps, so the bars are at 0..count-1."""
+        if n <= self.size or self.size == self.capacity:
+            return
+        size = min(self.capacity, max(n, 2 * self.size))
+        t = np.zeros(2 * size, dtype=np.int64)
+        v = np.zeros((len(FIELDS), 2 * size), dtype=np.float64)
+        n = self.count
+        t[:n] = t[size:size + n] = self.t[:n]
+        v[:, :n] = v[:, size:size + n] = self.v[:, :n]
+        self.t, self.v, self.size = t, v, size
+
+    def append(self, t, bar):
+        self.reserve(self.count + 1)
+        i = self.count % self.size
+        self.t[i] = self.t[i + self.size] = t
+        self.v[:, i] = self.v[:, i + self.size] = bar
+        self.count += 1
+
+    def extend(self, t, v):
+        """Append bars t[k], v[:, k] in order with a few slice assignments."""
+        self.reserve(self.count + len(t))
+        cap = self.size
+        if len(t) > cap:
+            self.count += len(t) - cap
+            t, v = t[-cap:], v[:, -cap:]
+        start = self.count % cap
+        first = min(len(t), cap - start)
+        for offset, (lo, hi) in ((start, (0, first)), (0, (first, len(t)))):
+            n = hi - lo
+            if n:
+                self.t[offset:offset + n] = self.t[offset + cap:offset + cap + n] = t[lo:hi]
+                self.v[:, offset:offset + n] = self.v[:, offset + cap:offset + cap + n] = v[:, lo:hi]
+        self.count += len(t)
+
+    def window(self):
+        n = len(self)
+        end = (self.count - 1) % self.size + self.size + 1 if self.count else 0
+        return self.t[end - n:end], self.v[:, end - n:end]
+
+    def load(self, t, v):
+        """Replace the contents with the last `capacity` of bars t, v (one copy)."""
+        t, v = t[-self.capacity:], v[:, -self.capacity:]
+        self.count = 0
+        self.reserve(len(t))
+        n, cap = len(t), self.size
+        self.t[:n] = self.t[cap:cap + n] = t
+        self.v[:, :n] = self.v[:, cap:cap + n] = v
+        self.count = n
+
+
+class Level:
+    def __init__(self, name, width, capacity):
+        self.name = name
+        self.width = width
+        self.bars = BarRing(capacity)
+        self.open_t = None
+        self.open_bar = np.zeros(len(FIELDS))
+        self.saved = None       # (path, bars.count) of the last save_rollups()
+
+    def update(self, ts, price):
+        t = ts - ts % self.width
+        if self.open_t is not None and t < self.open_t:
+            t = self.open_t     # late tick: fold it into the open bar
+        bar = self.open_bar
+        if t != self.open_t:
+            if self.open_t is not None:
+                self.bars.append(self.open_t, bar)
+            self.open_t = t
+            bar[:] = (price, price, price, price, 0.0)
+        else:
+            bar[1] = max(bar[1], price)
+            bar[2] = min(bar[2], price)
+            bar[3] = price
+        bar[4] += 1.0
+
+    def extend(self, ts, prices):
+        """update() for a whole block of ticks (int64 ts, float64 prices, no NaN)."""
+        if not len(ts):
+            return
+        t = ts - ts % self.width
+        if self.open_t is not None:
+            t[0] = max(t[0], self.open_t)
+        # A late tick goes into the open bar: each tick's bar is the latest so far
+        t = np.maximum.accumulate(t)
+        starts = np.flatnonzero(np.r_[True, t[1:] != t[:-1]])
+        ends = np.r_[starts[1:], len(t)]
+        bar_t = t[starts]
+        bars = np.vstack([prices[starts], np.maximum.reduceat(prices, starts),
+                          np.minimum.reduceat(prices, starts), prices[ends - 1],
+                          (ends - starts).astype(np.float64)])
+        if self.open_t is not None:
+            bar = self.open_bar
+            if bar_t[0] == self.open_t:
+                bars[:, 0] = (bar[0], max(bar[1], bars[1, 0]), min(bar[2], bars[2, 0]),
+                              bars[3, 0], bar[4] + bars[4, 0])
+            else:
+                self.bars.append(self.open_t, bar)
+        self.bars.extend(bar_t[:-1], bars[:, :-1])
+        self.open_t = int(bar_t[-1])
+        self.open_bar = bars[:, -1].copy()
+
+    def window(self):
+        """Sealed bars plus the open one, oldest first (copies only when a bar is open)."""
+        t, v = self.bars.window()
+        if self.open_t is None:
+            return t, v
+        return np.append(t, self.open_t), np.column_stack([v, self.open_bar])
+
+
+class Rollup:
+    def __init__(self, levels=LEVELS):
+        self.levels = [Level(*spec) for spec in levels]
+
+    def update(self, ts, price):
+        if price != price:
+            return
+        for level in self.levels:
+            level.update(ts, price)
+
+    def extend(self, ts, prices):
+        """update() for many ticks at once, a few array operations per level."""
+        ts, prices = np.asarray(ts, dtype=np.int64), np.asarray(prices, dtype=np.float64)
+        keep = ~np.isnan(prices)
+        ts, prices = ts[keep], prices[keep]
+        for level in self.levels:
+            level.extend(ts, prices)
+
+    def query(self, start, end, target_points=500, max_points=None):
+        """Bars covering [start, end] (epoch ns) from the coarsest level with at
+        least target_points / 2 bars in range (or the finest level if none has).
+        If that still exceeds max_points (default 4 * target_points), adjacent
+        bars are merged. Returns (level name, t, {field: array})."""
+        max_points = max_points or 4 * target_points
+        chosen = None
+        for level in self.levels:
+            t, v = level.window()
+            lo, hi = np.searchsorted(t, start - level.width + 1), np.searchsorted(t, end, side="right")
+            if chosen is None or hi - lo >= target_points / 2:
+                chosen = (level.name, t[lo:hi], v[:, lo:hi])
+        name, t, v = chosen
+        if len(t) > max_points:
+            t, v = _merge(t, v, -(-len(t) // max_points))
+        return name, t, dict(zip(FIELDS, v))
+
+    # ---- persistence ----
+    def restore(self, state, prefix=""):
+        for level in self.levels:
+            key = f"{prefix}{level.name}"
+            if f"{key}/t" not in state:
+                continue
+            t, v = state[f"{key}/t"], state[f"{key}/v"]
+            level.bars = BarRing(level.bars.capacity)
+            level.bars.load(t, v)
+            open_t = int(state[f"{key}/open_t"][0])
+            level.open_t = None if open_t < 0 else open_t
+            level.open_bar = np.array(state[f"{key}/open_bar"], dtype=np.float64)
+            if level.open_t is not None and len(t) and level.open_t <= t[-1]:
+                # Saved before the bars it was sealed into: drop it rather
+                # than seal it twice
+                level.open_t = None
+        return self
+
+
+def _merge(t, v, factor):
+    starts = np.arange(0, len(t), factor)
+    merged = np.vstack([
+        v[0, starts],
+        np.maximum.reduceat(v[1], starts),
+        np.minimum.reduceat(v[2], starts),
+        v[3, np.minimum(starts + factor, len(t)) - 1],
+        np.add.reduceat(v[4], starts),
+    ])
+    return t[starts], merged
+
+
+def _write_npz(path, arrays):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def save_rollups(path, rollups, lock=None):
+    """Write {coin: Rollup} to the directory `path`: <coin>.<level>.npz with
+    each level's sealed bars, only if bars were sealed since the last save,
+    and <coin>.open.npz with the open bars. Each file is replaced atomically.
+    With the `lock` that guards `rollups`, it is held only while each coin's
+    bars are copied, not while the files are written."""
+    lock = lock or nullcontext()
+    os.makedirs(path, exist_ok=True)
+    with lock:
+        coins = list(rollups)
+    for coin in coins:
+        files, saved = {}, []
+        with lock:
+            if coin not in rollups:
+                continue
+            opened = {}
+            for level in rollups[coin].levels:
+                opened[f"{level.name}/open_t"] = np.array([-1 if level.open_t is None else level.open_t])
+                opened[f"{level.name}/open_bar"] = level.open_bar.copy()
+                mark = (path, level.bars.count)
+                if level.saved != mark:
+                    t, v = level.bars.window()
+                    files[os.path.join(path, f"{coin}.{level.name}.npz")] = {"t": t.copy(), "v": v.copy()}
+                    saved.append((level, mark))
+        # Open bars last: they are newer than any bars written before them
+        files[os.path.join(path, f"{coin}.open.npz")] = opened
+        for name, arrays in files.items():
+            _write_npz(name, arrays)
+        for level, mark in saved:
+            level.saved = mark
+
+
+def load_rollups(path, coins):
+    """{coin: Rollup} from a save_rollups() directory, or from the single
+    .npz file earlier versions wrote. Coins not saved get an empty Rollup."""
+    rollups = {coin: Rollup() for coin in coins}
+    if os.path.isdir(path):
+        for coin, rollup in rollups.items():
+            opened = os.path.join(path, f"{coin}.open.npz")
+            if not os.path.exists(opened):
+                continue
+            with np.load(opened) as f:
+                state = dict(f)
+            for level in rollup.levels:
+                name = os.path.join(path, f"{coin}.{level.name}.npz")
+                if os.path.exists(name):
+                    with np.load(name) as f:
+                        state[f"{level.name}/t"], state[f"{level.name}/v"] = f["t"], f["v"]
+            rollup.restore(state)
+            for level in rollup.levels:
+                if f"{level.name}/t" in state:
+                    level.saved = (path, level.bars.count)
+    elif os.path.exists(path):
+        with np.load(path) as state:
+            state = dict(state)
+        for coin, rollup in rollups.items():
+            rollup.restore(state, prefix=f"{coin}/")
+    return rollups
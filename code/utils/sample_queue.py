@@ -0,0 +1,92 @@
+# utils/sample_queue.py
+#
+# Bounded hand-off between the Zenoh callback thread and a consumer.
+#
+# The callback only calls put(); the consumer drains with get_batch() and
+# does the decoding, state updates and persistence for many samples at once.
+# What happens when the queue is full is a policy choice:
+#
+#   drop-oldest  evict the oldest queued sample (never blocks the network)
+#   block        wait for space, pushing backpressure onto Zenoh
+#   coalesce     replace the queued sample with the same key (latest wins),
+#                evicting the oldest only when the key is not queued
+import threading
+import time
+from collections import deque
+
+DROP_OLDEST = "drop-oldest"
+BLOCK = "block"
+COALESCE = "coalesce"
+
+
+class SampleQueue:
+    def __init__(self, capacity=4096, policy=DROP_OLDEST, block_timeout=None):
+        if policy not in (DROP_OLDEST, BLOCK, COALESCE):
+            raise ValueError(f"unknown overflow policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._items = deque()       # [key, item] entries
+        self._by_key = {}           # key -> newest queued entry (coalesce only)
+        self._cond = threading.Condition()
+        # Counters
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._cond:
+            return {"depth": len(self._items), "max_depth": self.max_depth,
+                    "enqueued": self.enqueued, "dropped": self.dropped,
+                    "coalesced": self.coalesced, "blocked_seconds": self.blocked_seconds}
+
+    def put(self, item, key=None):
+        """Enqueue one sample. Returns False if it was dropped."""
+        with self._cond:
+            if len(self._items) >= self.capacity:
+                if self.policy == BLOCK:
+                    start = time.monotonic()
+                    ok = self._cond.wait_for(lambda: len(self._items) < self.capacity,
+                                             timeout=self.block_timeout)
+                    self.blocked_seconds += time.monotonic() - start
+                    if not ok:
+                        self.dropped += 1
+                        return False
+                elif self.policy == COALESCE and key in self._by_key:
+                    self._by_key[key][1] = item
+                    self.coalesced += 1
+                    return True
+                else:
+                    old = self._items.popleft()
+                    if self._by_key.get(old[0]) is old:
+                        del self._by_key[old[0]]
+                    self.dropped += 1
+            entry = [key, item]
+            self._items.append(entry)
+            if self.policy == COALESCE:
+                self._by_key[key] = entry
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get_batch(self, max_items=1024, timeout=None):
+        """Wait up to `timeout` for at least one sample, then take up to max_items."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait_for(lambda: self._items, timeout=timeout)
+            batch = []
+            while self._items and len(batch) < max_items:
+                entry = self._items.popleft()
+                if self._by_key.get(entry[0]) is entry:
+                    del self._by_key[entry[0]]
+                batch.append(entry[1])
+            if batch:
+                self._cond.notify_all()
+            return batch
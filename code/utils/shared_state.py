@@ -0,0 +1,236 @@
+# utils/shared_state.py
+#
+# Per-coin (timestamp, price) ring buffers in multiprocessing.shared_memory,
+# written by one ingest process and read by any number of dashboard workers.
+#
+# Layout (native endian, all fields 8 bytes):
+#
+#   0     meta    int64[8]   magic, layout version, capacity, n_coins,
+#                            seq, writer pid, names size, 0
+#   64    names   names size JSON list of coins, NUL padded to 8 bytes
+#         counts  int64[n]   samples ever appended per coin
+#         ts      int64[n, 2 * capacity]
+#         price   float64[n, 2 * capacity]
+#
+# Rings are double-written like utils/ring_buffer.PriceMatrix (the same
+# append_row() writes both), so the last n samples of a coin are one
+# contiguous slice and a tick is one vector write whatever n_coins is.
+#
+# Consistency is a seqlock over the whole region: the writer makes `seq`
+# odd, writes, then makes it even again. Readers copy what they need and
+# retry if `seq` was odd or changed meanwhile, so every read is a snapshot
+# of a completed batch and readers never block the writer. This relies on
+# stores becoming visible in program order (true on x86-64); there is one
+# writer per region.
+import json
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.ring_buffer import append_row
+
+MAGIC = int.from_bytes(b"CTKSHM01", "little")
+LAYOUT_VERSION = 2
+META = 8
+
+
+def _names_size(names):
+    return (len(names) + 7) // 8 * 8
+
+
+def _region_size(names_size, n_coins, capacity):
+    return META * 8 + names_size + n_coins * 8 + 2 * n_coins * 2 * capacity * 8
+
+
+def _attach(name):
+    try:
+        # Python 3.13+: readers must not unlink the segment when they exit
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedPriceState:
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self._meta = np.ndarray(META, dtype=np.int64, buffer=buf)
+        if self._meta[0] != MAGIC or self._meta[1] != LAYOUT_VERSION:
+            raise ValueError(f"{shm.name} is not a price state segment")
+        self.capacity = int(self._meta[2])
+        n = int(self._meta[3])
+        offset = META * 8 + int(self._meta[6])
+        names = bytes(buf[META * 8:offset]).rstrip(b"\0")
+        self.coins = json.loads(names)
+        self.index = {coin: i for i, coin in enumerate(self.coins)}
+        self._counts = np.ndarray(n, dtype=np.int64, buffer=buf, offset=offset)
+        offset += n * 8
+        self._ts = np.ndarray((n, 2 * self.capacity), dtype=np.int64, buffer=buf, offset=offset)
+        offset += n * 2 * self.capacity * 8
+        self._price = np.ndarray((n, 2 * self.capacity), dtype=np.float64, buffer=buf, offset=offset)
+
+    @classmethod
+    def create(cls, name, coins, capacity):
+        """Create (replacing a stale segment of the same name) and own the region."""
+        coins = list(coins)
+        names = json.dumps(coins).encode()
+        names_size = _names_size(names)
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True,
+                                         size=_region_size(names_size, len(coins), capacity))
+        meta = np.ndarray(META, dtype=np.int64, buffer=shm.buf)
+        meta[:] = (MAGIC, LAYOUT_VERSION, capacity, len(coins), 0, os.getpid(), names_size, 0)
+        shm.buf[META * 8:META * 8 + len(names)] = names
+        del meta
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name, wait=None):
+        """Attach read-only to an existing region, polling up to `wait` seconds for it."""
+        deadline = time.monotonic() + (wait or 0)
+        while True:
+            try:
+                return cls(_attach(name))
+            except FileNotFoundError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+
+    def close(self):
+        # Drop the views before closing the mapping
+        self._meta = self._counts = self._ts = self._price = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # ---- writer ----
+    def write_rows(self, timestamps, values):
+        """Append a batch of ticks as one seqlock step: epoch-ns timestamps and
+        a (ticks, coins) price matrix in `coins` order, NaN = no price."""
+        values = np.asarray(values, dtype=np.float64)
+        self._meta[4] += 1          # odd: write in progress
+        try:
+            for ts, prices in zip(timestamps, values):
+                append_row(self._ts, self._price, self._counts, self.capacity, ts, prices)
+        finally:
+            self._meta[4] += 1      # even: consistent again
+
+    def write(self, timestamps, rows):
+        """write_rows() for ticks given as {coin: price} dicts."""
+        values = np.full((len(rows), len(self.coins)), np.nan)
+        for r, prices in enumerate(rows):
+            for coin, price in prices.items():
+                c = self.index.get(coin)
+                if c is not None:
+                    values[r, c] = price
+        self.write_rows(timestamps, values)
+
+    # ---- readers ----
+    @property
+    def seq(self):
+        return int(self._meta[4])
+
+    def read(self, fn):
+        """Run fn() (which must copy what it reads) until it saw no concurrent write."""
+        while True:
+            start = int(self._meta[4])
+            if start & 1:
+                time.sleep(0)
+                continue
+            result = fn()
+            if int(self._meta[4]) == start:
+                return result
+
+    def totals(self):
+        return self.read(lambda: self._counts.copy())
+
+    def latest(self):
+        """(totals, ts, prices) vectors: every coin's sample count and newest
+        sample (0 / NaN for coins without one), from one snapshot."""
+        rows = np.arange(len(self.coins))
+
+        def latest():
+            counts = self._counts.copy()
+            i = np.where(counts > 0, (counts - 1) % self.capacity, 0)
+            return counts, self._ts[rows, i], self._price[rows, i]
+        counts, ts, prices = self.read(latest)
+        have = counts > 0
+        return counts, np.where(have, ts, 0), np.where(have, prices, np.nan)
+
+    def _window_views(self, c, n):
+        total = int(self._counts[c])
+        size = min(total, self.capacity)
+        n = size if n is None else max(0, min(int(n), size))
+        end = (total - 1) % self.capacity + self.capacity + 1 if total else 0
+        return total, self._ts[c, end - n:end], self._price[c, end - n:end]
+
+    def _window(self, c, n):
+        total, ts, prices = self._window_views(c, n)
+        return total, ts.copy(), prices.copy()
+
+    def window(self, coin, n=None):
+        """Copies of the last n samples of a coin, oldest first, from one snapshot."""
+        c = self.index[coin]
+        _, ts, prices = self.read(lambda: self._window(c, n))
+        return ts, prices
+
+    def since(self, coin, start_ts):
+        """Copies of the samples with timestamp >= start_ts."""
+        c = self.index[coin]
+
+        def since():
+            total, ts, prices = self._window_views(c, None)
+            i = int(np.searchsorted(ts, start_ts, side="left"))
+            return ts[i:].copy(), prices[i:].copy()
+        return self.read(since)
+
+    def newer_than(self, coin, seen):
+        """(total, ts, prices): samples appended since the coin's total was `seen`."""
+        c = self.index[coin]
+        return self.read(lambda: self._window(c, int(self._counts[c]) - seen))
+
+    def ring(self, coin):
+        return SharedRing(self, coin)
+
+
+class SharedRing:
+    """Read-only PriceRing look-alike over one coin of a SharedPriceState.
+
+    Unlike PriceRing, window() and since() return copies: a view could be
+    overwritten by the ingest process while a callback is still using it."""
+
+    def __init__(self, state, coin):
+        self.state = state
+        self.coin = coin
+        self.capacity = state.capacity
+        self._c = state.index[coin]
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def total(self):
+        return int(self.state._counts[self._c])
+
+    def window(self, n=None):
+        return self.state.window(self.coin, n)
+
+    def since(self, start_ts):
+        return self.state.since(self.coin, start_ts)
+
+    def last(self):
+        ts, prices = self.window(1)
+        if not len(ts):
+            return None
+        return int(ts[0]), float(prices[0])
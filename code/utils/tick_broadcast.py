@@ -0,0 +1,169 @@
+# utils/tick_broadcast.py
+#
+# Server-sent events fan-out of live ticks to dashboard clients.
+#
+# The subscriber calls publish() for every decoded tick. Each connected
+# client owns a ClientChannel that accumulates ticks per coin until the
+# client's rate limit allows the next message, so a slow client (or a burst
+# of ticks) costs one merged message instead of one per tick. At most
+# max_points ticks per coin are kept while waiting; older ones are dropped.
+#
+# Wire format, one SSE "data:" line per message:
+#
+#   {"sent_ms": <server send time, true UTC epoch ms>,
+#    "queued_ms": <how long the oldest tick in it waited on the server>,
+#    "ticks": {coin: {"ns": ["<epoch ns>", ...],    # strings: > 2**53
+#                     "x":  ["<ISO time>", ...],
+#                     "y":  [price, ...],
+#                     "ts_ms": <last tick, epoch ms>}}}
+#
+# Tick timestamps are on the publishers' clock (naive local time stored as
+# UTC), so latency is measured from sent_ms, a true UTC time a browser's
+# Date.now() can be compared with, plus queued_ms.
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+HEARTBEAT = 15.0     # seconds between keep-alive comments on an idle stream
+
+
+class ClientChannel:
+    def __init__(self, coins=None, max_rate=4.0, max_points=1000):
+        self.coins = set(coins) if coins else None
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.max_points = max_points
+        self._pending = {}          # coin -> deque of (ts_ns, price)
+        self._last_sent = 0.0
+        self._first_at = None       # monotonic arrival of the oldest pending tick
+        self._cond = threading.Condition()
+        self.closed = False
+        # Counters
+        self.messages = 0
+        self.ticks = 0
+        self.coalesced = 0          # ticks that shared a message with an earlier one
+
+    def offer(self, ts, prices):
+        with self._cond:
+            for coin, price in prices.items():
+                if self.coins is not None and coin not in self.coins:
+                    continue
+                points = self._pending.get(coin)
+                if points is None:
+                    points = self._pending[coin] = deque(maxlen=self.max_points)
+                elif points:
+                    self.coalesced += 1
+                points.append((ts, price))
+                self.ticks += 1
+            if self._pending and self._first_at is None:
+                self._first_at = time.monotonic()
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+
+    def next(self, timeout=HEARTBEAT):
+        """Wait for pending ticks and the rate limit, then return the merged
+        message; None after `timeout` seconds without one."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.closed:
+                    return None
+                ready_at = self._last_sent + self.min_interval if self._pending else float("inf")
+                if now >= ready_at:
+                    break
+                if now >= deadline:
+                    return None
+                self._cond.wait(min(ready_at, deadline) - now)
+            pending, self._pending = self._pending, {}
+            queued, self._first_at = now - self._first_at, None
+            self._last_sent = now
+            self.messages += 1
+        return {"sent_ms": time.time() * 1000, "queued_ms": queued * 1000,
+                "ticks": {coin: _points(p) for coin, p in pending.items()}}
+
+
+def _points(points):
+    ts = np.fromiter((t for t, _ in points), dtype=np.int64, count=len(points))
+    return {
+        "ns": [str(t) for t in ts.tolist()],
+        "x": np.datetime_as_string(ts.astype("datetime64[ns]")).tolist(),
+        "y": [p for _, p in points],
+        "ts_ms": int(ts[-1]) / 1e6,
+    }
+
+
+class TickBroadcaster:
+    def __init__(self, max_rate=4.0, max_points=1000):
+        """`max_rate` caps messages per second per client; clients may ask for less."""
+        self.max_rate = max_rate
+        self.max_points = max_points
+        self._clients = set()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, coins=None, max_rate=None):
+        rate = self.max_rate if not max_rate else min(max_rate, self.max_rate)
+        channel = ClientChannel(coins, rate, self.max_points)
+        with self._lock:
+            self._clients.add(channel)
+        return channel
+
+    def unsubscribe(self, channel):
+        channel.close()
+        with self._lock:
+            self._clients.discard(channel)
+
+    @property
+    def active(self):
+        """Whether any client is connected, so callers can skip building ticks for nobody."""
+        return bool(self._clients)
+
+    def publish(self, ts, prices):
+        """Hand one tick (epoch ns, {coin: price}) to every connected client."""
+        with self._lock:
+            clients = list(self._clients)
+            self.published += 1
+        for channel in clients:
+            channel.offer(ts, prices)
+
+    def stats(self):
+        with self._lock:
+            clients = list(self._clients)
+        return {"clients": len(clients), "published": self.published,
+                "messages": sum(c.messages for c in clients),
+                "coalesced": sum(c.coalesced for c in clients)}
+
+    def stream(self, channel, heartbeat=HEARTBEAT):
+        """SSE body for one client; unsubscribes when the client goes away."""
+        try:
+            yield "retry: 2000\n\n"
+            while not channel.closed:
+                message = channel.next(timeout=heartbeat)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"data: {json.dumps(message)}\n\n"
+        finally:
+            self.unsubscribe(channel)
+
+
+def install_push_route(server, broadcaster, path="/stream/ticks"):
+    """Serve the broadcaster as text/event-stream from the Dash app's Flask
+    server. Query string: ?coins=bitcoin,ethereum&rate=2 (messages/second)."""
+    from flask import Response, request
+
+    def stream_ticks():
+        coins = [c for c in request.args.get("coins", "").split(",") if c]
+        rate = request.args.get("rate", type=float)
+        channel = broadcaster.subscribe(coins or None, rate)
+        return Response(broadcaster.stream(channel), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    server.add_url_rule(path, "stream_ticks", stream_ticks)
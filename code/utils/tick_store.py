@@ -0,0 +1,628 @@
+# utils/tick_store.py
+#
+# Append-only columnar tick store.
+#
+# File layout (all integers little-endian):
+#
+#   [header]   magic "CTKS", version, header length, JSON symbol list (8-byte aligned)
+#   [segment]  magic "CTSG", rows, flags, min_ts, max_ts, CRC32 of those (32 bytes),
+#              then int64 epoch-ns timestamps[rows], then float64 prices[rows] per symbol
+#   [segment]  ...
+#   [footer]   one index entry per segment: data offset, rows, flags, min_ts, max_ts
+#   [trailer]  footer offset, segment count, CRC32 of the footer, magic "CTKF"
+#
+# Every column is a fixed-width array at a known offset, so readers can
+# np.memmap a single column of a single segment without parsing anything else.
+# Writers append a new segment where the old footer was (its data first, then
+# its header) and rewrite the footer. A reader that finds no valid trailer or
+# footer -- a writer crashed mid-append, or is in the middle of one -- walks
+# the segment headers from the start instead and stops at the first
+# incomplete segment, so the store always opens with every finished segment.
+# Version 1 stores (no segment headers or footer CRC) are still read;
+# open_writer() rewrites them as version 2 before appending.
+# A store has one writer at a time: TickWriter holds an exclusive flock on the
+# file and raises StoreLocked if another process (or writer) already has it.
+import csv
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:     # no flock (Windows): writers are not serialized
+    fcntl = None
+
+MAGIC = b"CTKS"
+FOOTER_MAGIC = b"CTKF"
+SEGMENT_MAGIC = b"CTSG"
+VERSION = 2
+
+HEADER_FMT = "<4sHHI"          # magic, version, reserved, JSON length
+SEGMENT_FMT = "<4sIIqqI"       # magic, rows, flags, min_ts, max_ts, CRC32 of the rest
+INDEX_FMT = "<QIIqq"           # data offset, rows, flags, min_ts, max_ts
+TRAILER_FMT = "<QII4s"         # footer offset, segment count, footer CRC32, magic
+TRAILER_V1_FMT = "<QI4s"       # footer offset, segment count, magic
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+SEGMENT_SIZE = struct.calcsize(SEGMENT_FMT)
+INDEX_SIZE = struct.calcsize(INDEX_FMT)
+TRAILER_SIZE = struct.calcsize(TRAILER_FMT)
+TRAILER_V1_SIZE = struct.calcsize(TRAILER_V1_FMT)
+
+FLAG_SORTED = 1
+FLAG_VALIDATED = 2            # rows passed utils.tick_validator on ingest
+
+FSYNC_NEVER = "never"          # leave it to the OS
+FSYNC_BATCH = "batch"          # fsync after every flushed batch
+FSYNC_INTERVAL = "interval"    # fsync at most once per fsync_interval seconds
+
+_EPOCH = datetime(1970, 1, 1)
+
+SegmentInfo = namedtuple("SegmentInfo", "offset rows flags min_ts max_ts")
+
+
+class StoreLocked(RuntimeError):
+    """The store is already open for writing elsewhere."""
+
+
+# ==== Timestamp helpers ====
+def to_epoch_ns(value):
+    """Convert an ISO string, datetime or number to int64 epoch nanoseconds.
+
+    Naive timestamps (what the publishers write) are treated as UTC so that
+    CSV -> store -> CSV round-trips keep the original text.
+    """
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return int(value * 1e9)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1000
+
+
+def from_epoch_ns(ns):
+    """Inverse of to_epoch_ns: returns a naive ISO 8601 string."""
+    seconds, rem = divmod(int(ns), 1_000_000_000)
+    dt = datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+    return dt.replace(microsecond=rem // 1000).isoformat()
+
+
+def _pad8(n):
+    return (n + 7) & ~7
+
+
+# ==== Low-level file access ====
+def _write_header(f, symbols):
+    meta = json.dumps({"symbols": list(symbols)}).encode()
+    meta += b" " * (_pad8(HEADER_SIZE + len(meta)) - HEADER_SIZE - len(meta))
+    f.write(struct.pack(HEADER_FMT, MAGIC, VERSION, 0, len(meta)))
+    f.write(meta)
+    return HEADER_SIZE + len(meta)
+
+
+def _read_header(f):
+    """(symbols, data start, format version)"""
+    f.seek(0)
+    magic, version, _, meta_len = struct.unpack(HEADER_FMT, f.read(HEADER_SIZE))
+    if magic != MAGIC:
+        raise ValueError("not a tick store file")
+    if version not in (1, VERSION):
+        raise ValueError(f"unsupported tick store version {version}")
+    meta = json.loads(f.read(meta_len))
+    return meta["symbols"], HEADER_SIZE + meta_len, version
+
+
+def _read_footer(f, data_start, n_symbols, version=VERSION):
+    """(footer offset, segments, intact): intact is False when the index had
+    to be rebuilt from the segment headers."""
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    if version == 1:
+        return _read_footer_v1(f, data_start, size)
+    if size >= data_start + TRAILER_SIZE:
+        f.seek(size - TRAILER_SIZE)
+        footer_offset, count, crc, magic = struct.unpack(TRAILER_FMT, f.read(TRAILER_SIZE))
+        if magic == FOOTER_MAGIC and footer_offset + count * INDEX_SIZE + TRAILER_SIZE == size:
+            f.seek(footer_offset)
+            raw = f.read(count * INDEX_SIZE)
+            if zlib.crc32(raw) == crc:
+                return footer_offset, [SegmentInfo(*entry) for entry in struct.iter_unpack(INDEX_FMT, raw)], True
+    footer_offset, segments = _scan_segments(f, data_start, size, n_symbols)
+    return footer_offset, segments, False
+
+
+def _read_footer_v1(f, data_start, size):
+    if size < data_start + TRAILER_V1_SIZE:
+        return data_start, [], True
+    f.seek(size - TRAILER_V1_SIZE)
+    footer_offset, count, magic = struct.unpack(TRAILER_V1_FMT, f.read(TRAILER_V1_SIZE))
+    if magic != FOOTER_MAGIC:
+        raise ValueError("tick store footer is missing or corrupt")
+    f.seek(footer_offset)
+    raw = f.read(count * INDEX_SIZE)
+    return footer_offset, [SegmentInfo(*entry) for entry in struct.iter_unpack(INDEX_FMT, raw)], True
+
+
+def _scan_segments(f, data_start, size, n_symbols):
+    """Rebuild the index from the segment headers, up to the first segment
+    that is missing, torn or cut short. Returns (end of the last one, segments)."""
+    segments, pos = [], data_start
+    while pos + SEGMENT_SIZE <= size:
+        f.seek(pos)
+        raw = f.read(SEGMENT_SIZE)
+        magic, rows, flags, min_ts, max_ts, crc = struct.unpack(SEGMENT_FMT, raw)
+        if magic != SEGMENT_MAGIC or zlib.crc32(raw[:-4]) != crc:
+            break
+        end = pos + SEGMENT_SIZE + rows * 8 * (1 + n_symbols)
+        if end > size:
+            break
+        segments.append(SegmentInfo(pos + SEGMENT_SIZE, rows, flags, min_ts, max_ts))
+        pos = end
+    return pos, segments
+
+
+def _segment_header(seg):
+    raw = struct.pack(SEGMENT_FMT[:-1], SEGMENT_MAGIC, seg.rows, seg.flags, seg.min_ts, seg.max_ts)
+    return raw + struct.pack("<I", zlib.crc32(raw))
+
+
+def _write_footer(f, footer_offset, segments):
+    raw = b"".join(struct.pack(INDEX_FMT, *seg) for seg in segments)
+    f.seek(footer_offset)
+    f.write(raw)
+    f.write(struct.pack(TRAILER_FMT, footer_offset, len(segments), zlib.crc32(raw), FOOTER_MAGIC))
+    f.truncate()
+
+
+def _lock(f, path):
+    """Take the exclusive writer lock on an open store file (closing it and
+    raising StoreLocked when another writer holds it)."""
+    if fcntl is None:
+        return
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise StoreLocked(f"{path} is already open for writing by another process") from None
+
+
+def create_store(path, symbols):
+    with open(path, "wb") as f:
+        data_start = _write_header(f, symbols)
+        _write_footer(f, data_start, [])
+
+
+# ==== Reader ====
+class TickStore:
+    """Read-only view of a tick store. Columns are memory-mapped on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self.refresh()
+
+    def refresh(self):
+        """Re-read the footer, picking up segments appended since the last call."""
+        with open(self.path, "rb") as f:
+            self.symbols, self._data_start, self.version = _read_header(f)
+            _, self.segments, _ = _read_footer(f, self._data_start, len(self.symbols), self.version)
+        self._columns = {s: i + 1 for i, s in enumerate(self.symbols)}
+        return self
+
+    def __len__(self):
+        return sum(seg.rows for seg in self.segments)
+
+    def column(self, index, name="timestamp"):
+        """Memory-map one column of one segment (zero-copy)."""
+        seg = self.segments[index]
+        col = 0 if name == "timestamp" else self._columns[name]
+        dtype = "<i8" if col == 0 else "<f8"
+        if seg.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r",
+                         offset=seg.offset + col * seg.rows * 8, shape=(seg.rows,))
+
+    def read_segment(self, index, symbols=None):
+        symbols = self.symbols if symbols is None else symbols
+        return self.column(index), {s: self.column(index, s) for s in symbols}
+
+    def read_all(self, symbols=None):
+        """Concatenate every segment. Prefer utils.history_query for windows."""
+        symbols = self.symbols if symbols is None else symbols
+        if not self.segments:
+            return np.empty(0, dtype=np.int64), {s: np.empty(0) for s in symbols}
+        parts = [self.read_segment(i, symbols) for i in range(len(self.segments))]
+        ts = np.concatenate([p[0] for p in parts])
+        return ts, {s: np.concatenate([p[1][s] for p in parts]) for s in symbols}
+
+    def tail(self, n, symbols=None, max_rows=None):
+        """The last n ticks with a price, per symbol: (ts, {symbol: prices}) over
+        the union of their rows, in time order. Only the trailing segments
+        that hold them are mapped, so the cost does not grow with history.
+
+        A symbol with few or no prices (say a column widen_store() just
+        added) would send the scan through the whole file, so it stops after
+        the segments covering the last `max_rows` rows (default n per symbol,
+        enough even when every row holds a single coin's tick); such symbols
+        get the prices found in those rows."""
+        symbols = self.symbols if symbols is None else symbols
+        if max_rows is None:
+            max_rows = n * max(len(symbols), 1)
+        parts, have, rows = [], dict.fromkeys(symbols, 0), 0
+        for index in range(len(self.segments) - 1, -1, -1):
+            ts, cols = self.read_segment(index, symbols)
+            parts.append((ts, cols))
+            for s in symbols:
+                have[s] += int(np.count_nonzero(~np.isnan(cols[s])))
+            rows += len(ts)
+            if min(have.values(), default=n) >= n or rows >= max_rows:
+                break
+        if not parts:
+            return np.empty(0, dtype=np.int64), {s: np.empty(0) for s in symbols}
+        parts.reverse()
+        ts = np.concatenate([p[0] for p in parts])
+        cols = {s: np.concatenate([p[1][s] for p in parts]) for s in symbols}
+        order = np.argsort(ts, kind="stable")
+        ts, cols = ts[order], {s: v[order] for s, v in cols.items()}
+        # Drop rows that only matter to symbols which already have n newer prices
+        keep = np.zeros(len(ts), dtype=bool)
+        for s in symbols:
+            rows = np.flatnonzero(~np.isnan(cols[s]))[-n:] if n else []
+            keep[rows] = True
+        return ts[keep], {s: v[keep] for s, v in cols.items()}
+
+
+# ==== Writer ====
+class TickWriter:
+    """Batched, append-only writer.
+
+    Rows are buffered in memory and written as one segment per flush, which
+    happens every `batch_size` rows, every `flush_interval` seconds (checked
+    on append) or on an explicit flush()/close(). If `csv_mirror` is given,
+    each flushed batch is also appended to that CSV in a single open, so
+    tools that still read crypto_prices.csv keep working. Pass
+    validated=True when every row has been through utils.tick_validator, so
+    readers can skip re-checking those segments.
+    """
+
+    def __init__(self, path, symbols, batch_size=256, flush_interval=5.0,
+                 fsync=FSYNC_BATCH, fsync_interval=30.0, csv_mirror=None, validated=False):
+        if fsync not in (FSYNC_NEVER, FSYNC_BATCH, FSYNC_INTERVAL):
+            raise ValueError(f"unknown fsync policy: {fsync}")
+        self.path = path
+        self.symbols = list(symbols)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.csv_mirror = csv_mirror
+        self.validated = validated
+
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            create_store(path, self.symbols)
+        self._f = open(path, "r+b")
+        _lock(self._f, path)
+        stored, self._data_start, version = _read_header(self._f)
+        if stored != self.symbols:
+            self._f.close()
+            raise ValueError(f"store symbols {stored} do not match {self.symbols}")
+        if version != VERSION:
+            self._f.close()
+            raise ValueError(f"{path} is a version {version} store, open it with open_writer() to upgrade it")
+        self._footer_offset, self._segments, intact = _read_footer(self._f, self._data_start, len(stored))
+        if not intact:
+            # Left by a crash mid-append: drop the torn segment, write a valid footer
+            _write_footer(self._f, self._footer_offset, self._segments)
+            self._f.flush()
+
+        self._lock = threading.Lock()
+        self._ts = []
+        self._rows = []
+        self._layout = (None, None)     # (symbols, column of each in the store) for append_rows
+        self._last_flush = time.monotonic()
+        self._last_fsync = time.monotonic()
+
+    def append(self, timestamp, prices):
+        """Buffer one tick. `prices` maps symbol -> price; missing values become NaN."""
+        row = [_as_float(prices.get(s)) for s in self.symbols]
+        with self._lock:
+            self._ts.append(to_epoch_ns(timestamp))
+            self._rows.append(row)
+            due = (len(self._ts) >= self.batch_size or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def append_many(self, timestamps, rows):
+        """Buffer a batch of ticks given as epoch-ns timestamps and price dicts."""
+        with self._lock:
+            for ts, prices in zip(timestamps, rows):
+                self._ts.append(to_epoch_ns(ts))
+                self._rows.append([_as_float(prices.get(s)) for s in self.symbols])
+            due = (len(self._ts) >= self.batch_size or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def append_rows(self, timestamps, values, symbols=None):
+        """Buffer a block of ticks: epoch-ns timestamps and a (ticks, symbols)
+        price matrix, NaN = no price. Columns follow `symbols` (default the
+        store's); symbols the store lacks are dropped."""
+        values = np.array(values, dtype=np.float64, ndmin=2)
+        if symbols is not None and list(symbols) != self.symbols:
+            padded = np.concatenate([values, np.full((len(values), 1), np.nan)], axis=1)
+            values = padded[:, self._columns_of(symbols)]
+        with self._lock:
+            self._ts.extend(int(t) for t in timestamps)
+            self._rows.extend(values)
+            due = (len(self._ts) >= self.batch_size or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def _columns_of(self, symbols):
+        # Column of each store symbol in [*symbols, NaN padding]
+        symbols = tuple(symbols)
+        if self._layout[0] != symbols:
+            at = {s: i for i, s in enumerate(symbols)}
+            self._layout = (symbols, np.array([at.get(s, len(symbols)) for s in self.symbols]))
+        return self._layout[1]
+
+    def append_columns(self, timestamps, columns):
+        """Append a block given as arrays: epoch-ns timestamps and {symbol: prices}
+        (symbols it lacks become NaN). Anything buffered is flushed first, then
+        the block is written straight out in segments of at most batch_size rows."""
+        ts = np.asarray(timestamps, dtype="<i8")
+        values = np.full((len(ts), len(self.symbols)), np.nan)
+        for j, s in enumerate(self.symbols):
+            if s in columns:
+                values[:, j] = columns[s]
+        self.flush()
+        if not len(ts):
+            return 0
+        with self._lock:
+            for lo in range(0, len(ts), self.batch_size):
+                self._write_segment(ts[lo:lo + self.batch_size], values[lo:lo + self.batch_size])
+            self._last_flush = time.monotonic()
+        if self.csv_mirror:
+            _append_csv_rows(self.csv_mirror, self.symbols, ts, values)
+        return len(ts)
+
+    def maybe_flush(self):
+        """Flush if rows have been waiting longer than flush_interval (for idle periods)."""
+        with self._lock:
+            due = bool(self._ts) and time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._ts:
+                return 0
+            ts = np.asarray(self._ts, dtype="<i8")
+            values = np.asarray(self._rows, dtype="<f8").reshape(len(ts), len(self.symbols))
+            self._ts, self._rows = [], []
+            self._write_segment(ts, values)
+            self._last_flush = time.monotonic()
+        if self.csv_mirror:
+            _append_csv_rows(self.csv_mirror, self.symbols, ts, values)
+        return len(ts)
+
+    def _write_segment(self, ts, values):
+        offset = self._footer_offset + SEGMENT_SIZE
+        self._f.seek(offset)
+        self._f.write(ts.tobytes())
+        # Column-major: one contiguous float64 run per symbol
+        self._f.write(np.ascontiguousarray(values.T).tobytes())
+        end = self._f.tell()
+        flags = FLAG_SORTED if len(ts) < 2 or bool(np.all(ts[1:] >= ts[:-1])) else 0
+        if self.validated:
+            flags |= FLAG_VALIDATED
+        seg = SegmentInfo(offset, len(ts), flags, int(ts.min()), int(ts.max()))
+        # The header goes in after the data (seek flushes it), so a segment
+        # with a valid header is always complete
+        self._f.seek(self._footer_offset)
+        self._f.write(_segment_header(seg))
+        self._segments.append(seg)
+        self._footer_offset = end
+        _write_footer(self._f, self._footer_offset, self._segments)
+        self._f.flush()
+        now = time.monotonic()
+        if self.fsync == FSYNC_BATCH or (
+                self.fsync == FSYNC_INTERVAL and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._f.fileno())
+            self._last_fsync = now
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self.fsync != FSYNC_NEVER:
+                os.fsync(self._f.fileno())
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _as_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value
+
+
+def open_writer(store_path, symbols, csv_mirror=None, **kwargs):
+    """Open a TickWriter, seeding a missing store from the existing CSV mirror.
+    A store that lacks some of `symbols` is widened first (widen_store) and
+    keeps its column order, so the writer's symbols may differ from `symbols`:
+    pass them to append_rows(). An older-version store is rewritten in the
+    current format first."""
+    if not os.path.exists(store_path) and csv_mirror and os.path.exists(csv_mirror) \
+            and os.path.getsize(csv_mirror) > 0:
+        n = import_csv(csv_mirror, store_path)
+        print(f"[STORE] Imported {n} rows from {csv_mirror}")
+    if os.path.exists(store_path) and os.path.getsize(store_path) > 0:
+        store = TickStore(store_path)
+        added = [s for s in symbols if s not in store.symbols]
+        symbols = store.symbols + added
+        if added or store.version != VERSION:
+            with open(store_path, "r+b") as f:
+                _lock(f, store_path)    # not under a running writer
+                widen_store(store_path, symbols)
+            if added and csv_mirror and os.path.exists(csv_mirror):
+                export_csv(store_path, csv_mirror)
+            if added:
+                print(f"[STORE] Added {len(added)} symbols to {store_path}")
+            if store.version != VERSION:
+                print(f"[STORE] Upgraded {store_path} from version {store.version} to {VERSION}")
+    return TickWriter(store_path, symbols, csv_mirror=csv_mirror, **kwargs)
+
+
+def widen_store(path, symbols):
+    """Rewrite a store in place with the columns `symbols`, a superset of its
+    own (the new ones all NaN). Segments and their flags are kept as they are."""
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    _copy_segments(TickStore(path), tmp, symbols)
+    os.replace(tmp, path)
+
+
+def _copy_segments(store, dst, symbols):
+    # In its own frame so no memmap of the source outlives the copy
+    with TickWriter(dst, symbols, flush_interval=float("inf"), fsync=FSYNC_NEVER) as writer:
+        for index, seg in enumerate(store.segments):
+            ts, cols = store.read_segment(index)
+            writer.validated = bool(seg.flags & FLAG_VALIDATED)
+            writer.batch_size = max(1, seg.rows)
+            writer.append_columns(ts, cols)
+
+
+# ==== CSV bridge ====
+def _append_csv_rows(csv_path, symbols, ts, values):
+    write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+    with open(csv_path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(["timestamp"] + [f"{s}_usd" for s in symbols])
+        for t, row in zip(ts, values):
+            writer.writerow([from_epoch_ns(t)] + ["NA" if np.isnan(v) else repr_price(v) for v in row])
+
+
+def tail_csv(csv_path, n, symbols=None, block_size=64 * 1024):
+    """The last n rows of a crypto_prices.csv-style file, read backwards from
+    the end in blocks instead of parsing the whole file. Returns (ts, {symbol:
+    prices}) like TickStore.tail (rows with unparseable timestamps skipped)."""
+    with open(csv_path, "rb") as f:
+        header = next(csv.reader([f.readline().decode()]))
+        body_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunk = b""
+        # One extra line: the first one found may be cut in half
+        while pos > body_start and chunk.count(b"\n") <= n:
+            step = min(block_size, pos - body_start)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + chunk
+    # The first line may also start inside a multi-byte character
+    lines = chunk.decode(errors="replace").splitlines()
+    if pos > body_start:
+        lines = lines[1:]
+    names = [h[:-4] if h.endswith("_usd") else h for h in header[1:]]
+    symbols = names if symbols is None else symbols
+    ts, rows = [], []
+    for row in csv.reader(line for line in lines[-n:] if line.strip()):
+        try:
+            ts.append(to_epoch_ns(row[0]))
+        except ValueError:
+            continue
+        values = dict(zip(names, row[1:]))
+        rows.append([_as_float(values.get(s)) for s in symbols])
+    values = np.asarray(rows, dtype=np.float64).reshape(len(rows), len(symbols))
+    return np.asarray(ts, dtype=np.int64), {s: values[:, i] for i, s in enumerate(symbols)}
+
+
+def read_tail(store_path, csv_path, n, symbols=None):
+    """Last n ticks per symbol from the tick store, or from the CSV when there
+    is no store yet. Empty arrays when neither exists."""
+    if os.path.exists(store_path) and os.path.getsize(store_path) > 0:
+        return TickStore(store_path).tail(n, symbols)
+    if csv_path and os.path.exists(csv_path) and os.path.getsize(csv_path) > 0:
+        return tail_csv(csv_path, n, symbols)
+    symbols = symbols or []
+    return np.empty(0, dtype=np.int64), {s: np.empty(0) for s in symbols}
+
+
+def repr_price(value):
+    """Format a price the way the publishers do (integers without '.0')."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def import_csv(csv_path, store_path, batch_size=65536):
+    """Load a crypto_prices.csv-style file into a new tick store.
+
+    Rows are written in file order; unparseable timestamps are skipped.
+    Returns the number of rows imported.
+    """
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        symbols = [h[:-4] if h.endswith("_usd") else h for h in header[1:]]
+        if os.path.exists(store_path):
+            os.remove(store_path)
+        count = 0
+        with TickWriter(store_path, symbols, batch_size=batch_size,
+                        flush_interval=float("inf"), fsync=FSYNC_NEVER) as writer:
+            for row in reader:
+                if not row:
+                    continue
+                try:
+                    ts = to_epoch_ns(row[0])
+                except ValueError:
+                    continue
+                writer.append(ts, dict(zip(symbols, row[1:])))
+                count += 1
+    return count
+
+
+def export_csv(store_path, csv_path):
+    """Write a tick store back out as crypto_prices.csv. Returns the row count."""
+    store = TickStore(store_path)
+    if os.path.exists(csv_path):
+        os.remove(csv_path)
+    count = 0
+    for i in range(len(store.segments)):
+        ts, cols = store.read_segment(i)
+        values = np.column_stack([cols[s] for s in store.symbols])
+        _append_csv_rows(csv_path, store.symbols, ts, values)
+        count += len(ts)
+    if count == 0:
+        _append_csv_rows(csv_path, store.symbols, [], [])
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m utils.tick_store import crypto_prices.csv crypto_prices.ticks
+    # python -m utils.tick_store export crypto_prices.ticks crypto_prices.csv
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print("usage: python -m utils.tick_store {import|export} SRC DST")
+        sys.exit(1)
+    action, src, dst = sys.argv[1:]
+    n = import_csv(src, dst) if action == "import" else export_csv(src, dst)
+    print(f"[STORE] {action}ed {n} rows: {src} -> {dst}")
@@ -0,0 +1,284 @@
+# utils/tick_validator.py
+#
+# Streaming data-quality stage between decoding a tick and storing it.
+#
+# Each tick is checked as one float64 vector over all symbols (validate()
+# takes a {coin: price} dict, validate_row() the vector itself), and all
+# per-symbol state lives in arrays, so the cost per tick is a few vector
+# operations however many symbols there are:
+#
+#   missing    None, "NA", "", 0, negative or non-finite prices become NaN
+#              and are counted; the rest of the tick is kept
+#   swapped    a price outside its own band that fits another symbol's band,
+#              while that symbol's price fits this one's, is put back
+#   outlier    a price outside median +- k * scaled MAD of its symbol's last
+#              `window` accepted prices is dropped (NaN)
+#   duplicate  a (timestamp, source) pair seen in the last `dedup_window` ticks;
+#              for validate_row(), a price stamped like its symbol's last one
+#
+# Ticks left with no price at all are rejected. Rejected ticks and dropped or
+# repaired prices go to a JSON-lines quarantine log instead of the store.
+#
+# Bands are recomputed every `refresh` accepted prices from a fixed-size
+# window, so a tick costs O(1) amortized however much history exists. A
+# symbol has no band until `min_history` prices were accepted. Bands widen
+# with the square root of the time since the symbol's last accepted price
+# beyond `gap` seconds (prices drift like a random walk while we are not
+# looking), so a restart after a day off is not mistaken for a glitch; the
+# first price accepted after such a gap recenters the window on itself. After
+# `reseed_after` consecutive outliers the market has moved: the window
+# restarts from those prices.
+#
+# Segments written from validated ticks carry FLAG_VALIDATED, and readers
+# skip their legacy sanity checks for those rows. For a store written before
+# this stage existed, run it once:
+#
+#   python -m utils.tick_validator clean crypto_prices.ticks clean.ticks
+import json
+from collections import deque
+
+import numpy as np
+
+from utils.tick_store import TickStore, TickWriter, FSYNC_NEVER, from_epoch_ns
+
+MAD_SCALE = 1.4826      # MAD -> standard deviation for normal data
+
+
+def clean_price(value):
+    """float price, or NaN for anything that is not a usable price."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value if 0.0 < value < np.inf else np.nan
+
+
+class TickValidator:
+    def __init__(self, symbols, window=256, k=10.0, min_spread=0.005, min_history=16,
+                 refresh=16, reseed_after=5, gap=3600.0, dedup_window=4096, quarantine_path=None):
+        """`k` scales the band; `min_spread` is the smallest band half-width
+        per unit of k as a fraction of the median, so flat stretches (MAD 0)
+        do not reject every move."""
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.window = window
+        self.k = k
+        self.min_spread = min_spread
+        self.min_history = min_history
+        self.refresh = refresh
+        self.reseed_after = reseed_after
+        self.gap_ns = int(gap * 1_000_000_000)
+        self.quarantine_path = quarantine_path
+        self._quarantine_file = None    # opened on the first record, kept open
+
+        self._hist = np.full((n, window), np.nan)
+        self._count = np.zeros(n, dtype=np.int64)      # accepted prices per symbol
+        self._median = np.full(n, np.nan)
+        self._half = np.full(n, np.inf)                 # band half-width
+        self._last_ts = np.zeros(n, dtype=np.int64)     # last accepted price per symbol
+        self._has_band = np.zeros(n, dtype=bool)
+        self._run = np.full((n, reseed_after), np.nan)  # consecutive outliers
+        self._run_len = np.zeros(n, dtype=np.int64)
+        self._seen = set()
+        self._seen_order = deque()
+        self.dedup_window = dedup_window
+        # Counters
+        self.counts = dict.fromkeys(
+            ("accepted", "rejected", "duplicate", "missing", "swapped", "outlier", "reseeded"), 0)
+
+    def stats(self):
+        return dict(self.counts)
+
+    def close(self):
+        """Close the quarantine log (reopened if more ticks are rejected)."""
+        if self._quarantine_file is not None:
+            self._quarantine_file.close()
+            self._quarantine_file = None
+
+    def validate(self, ts, prices, source=None, quarantine=True):
+        """Check one tick (epoch ns, {coin: price}). Returns {coin: float} with
+        only the usable prices, or None if the tick is rejected. Pass
+        quarantine=False when replaying stored history, to not log it again."""
+        if not quarantine:
+            path, self.quarantine_path = self.quarantine_path, None
+            try:
+                return self.validate(ts, prices, source)
+            finally:
+                self.quarantine_path = path
+        key = (ts, source)
+        if key in self._seen:
+            self.counts["duplicate"] += 1
+            self.counts["rejected"] += 1
+            self._quarantine(ts, source, "duplicate", prices)
+            return None
+        self._seen.add(key)
+        self._seen_order.append(key)
+        if len(self._seen_order) > self.dedup_window:
+            self._seen.discard(self._seen_order.popleft())
+
+        p = self._check(ts, np.array([clean_price(prices.get(s)) for s in self.symbols]), source, prices)
+        if p is None:
+            return None
+        return {self.symbols[i]: float(p[i]) for i in np.flatnonzero(~np.isnan(p))}
+
+    def validate_row(self, ts, prices, source=None, quarantine=True):
+        """validate() for a price vector in `symbols` order (NaN = no price),
+        for callers that keep one column per symbol. A price whose timestamp
+        equals its symbol's last accepted one is a duplicate and dropped, so
+        a tick may arrive split over several rows. Returns a new vector with
+        only the usable prices, or None if the row is rejected."""
+        if not quarantine:
+            path, self.quarantine_path = self.quarantine_path, None
+            try:
+                return self.validate_row(ts, prices, source)
+            finally:
+                self.quarantine_path = path
+        raw = np.asarray(prices, dtype=np.float64)
+        p = np.where((raw > 0.0) & (raw < np.inf), raw, np.nan)
+        dup = (self._last_ts == ts) & ~np.isnan(p)
+        if dup.any():
+            if dup.sum() == np.count_nonzero(~np.isnan(p)):
+                self.counts["duplicate"] += 1
+                self.counts["rejected"] += 1
+                self._quarantine(ts, source, "duplicate", self._as_dict(raw))
+                return None
+            p[dup] = np.nan
+        return self._check(ts, p, source, raw)
+
+    def _as_dict(self, raw):
+        return {self.symbols[i]: float(raw[i]) for i in np.flatnonzero(~np.isnan(raw))}
+
+    def _check(self, ts, p, source, prices):
+        # `prices` is what the quarantine log shows: the caller's dict or raw vector
+        missing = np.isnan(p)
+        self.counts["missing"] += int(missing.sum())
+        widen = np.sqrt(np.maximum(1.0, (ts - self._last_ts) / self.gap_ns))
+        lo = self._median - self._half * widen
+        hi = self._median + self._half * widen
+        inside = ((p >= lo) & (p <= hi)) | ~self._has_band
+        out = ~missing & ~inside
+
+        notes = []
+        if out.any():
+            p, inside, out = self._unswap(p, lo, hi, inside, out, notes)
+        if out.any():
+            rows = np.flatnonzero(out)
+            notes.extend(f"outlier {self.symbols[i]}={float(p[i])!r}" for i in rows)
+            self._run[rows, self._run_len[rows]] = p[rows]
+            self._run_len[rows] += 1
+            self.counts["outlier"] += len(rows)
+            p[out] = np.nan
+        self._run_len[inside & ~missing] = 0
+
+        if notes:
+            self._quarantine(ts, source, "; ".join(notes), self._raw(prices))
+        self._reseed()
+
+        valid = ~np.isnan(p)
+        if not valid.any():
+            self.counts["rejected"] += 1
+            if not notes:
+                self._quarantine(ts, source, "no usable price", self._raw(prices))
+            return None
+        # Recenter windows that resumed after a gap before adding the new price
+        resumed = np.flatnonzero(valid & (widen > 1.0) & self._has_band)
+        if len(resumed):
+            shift = p[resumed] - self._median[resumed]
+            self._hist[resumed] += shift[:, None]
+            self._median[resumed] += shift
+        self._accept(np.flatnonzero(valid), p[valid])
+        self._last_ts[valid] = ts
+        self.counts["accepted"] += 1
+        return p
+
+    def _raw(self, prices):
+        return prices if isinstance(prices, dict) else self._as_dict(prices)
+
+    def _unswap(self, p, lo, hi, inside, out, notes):
+        for i in np.flatnonzero(out):
+            if not out[i]:
+                continue        # already put back by an earlier swap
+            # Symbols j whose band holds price i while band i holds price j
+            fits = ((p[i] >= lo) & (p[i] <= hi) & self._has_band &
+                    (p >= lo[i]) & (p <= hi[i]) & self._has_band[i])
+            for j in np.flatnonzero(fits):
+                p[i], p[j] = p[j], p[i]
+                inside[i] = inside[j] = True
+                out[i] = out[j] = False
+                self.counts["swapped"] += 1
+                notes.append(f"swapped {self.symbols[i]}<->{self.symbols[j]}")
+                break
+        return p, inside, out
+
+    def _reseed(self):
+        for i in np.flatnonzero(self._run_len >= self.reseed_after):
+            run = self._run[i, :self._run_len[i]].copy()
+            self._hist[i] = np.nan
+            self._count[i] = 0
+            self._has_band[i] = False
+            self._median[i], self._half[i] = np.nan, np.inf
+            for value in run:
+                self._accept(np.array([i]), np.array([value]))
+            self._run_len[i] = 0
+            self.counts["reseeded"] += 1
+
+    def _accept(self, rows, values):
+        """Add values[k] to the window of symbol rows[k] (rows unique)."""
+        self._hist[rows, self._count[rows] % self.window] = values
+        self._count[rows] += 1
+        count = self._count[rows]
+        due = rows[(count >= self.min_history) & (~self._has_band[rows] | (count % self.refresh == 0))]
+        if len(due):
+            self._refresh_bands(due)
+
+    def _refresh_bands(self, rows):
+        # Slots not filled yet (fewer than `window` prices) are NaN
+        values = self._hist[rows]
+        # nanmedian is slow on small windows; full windows have no NaN
+        median_of = np.median if (self._count[rows] >= self.window).all() else np.nanmedian
+        median = median_of(values, axis=1)
+        mad = median_of(np.abs(values - median[:, None]), axis=1)
+        self._median[rows] = median
+        self._half[rows] = self.k * np.maximum(MAD_SCALE * mad, self.min_spread * median)
+        self._has_band[rows] = True
+
+    def _quarantine(self, ts, source, reason, prices):
+        if self.quarantine_path is None:
+            return
+        record = {"timestamp": from_epoch_ns(ts), "source": source, "reason": reason,
+                  "prices": {k: v if isinstance(v, (int, float, str)) or v is None else str(v)
+                             for k, v in prices.items()}}
+        if self._quarantine_file is None:
+            # Line-buffered: each record reaches the file without reopening it
+            self._quarantine_file = open(self.quarantine_path, "a", buffering=1)
+        self._quarantine_file.write(json.dumps(record) + "\n")
+
+
+def clean_store(src, dst, quarantine_path=None, **kwargs):
+    """Run an existing tick store through the validator into a new, validated
+    store. Returns the validator's counters."""
+    store = TickStore(src)
+    validator = TickValidator(store.symbols, quarantine_path=quarantine_path, **kwargs)
+    with TickWriter(dst, store.symbols, batch_size=65536, flush_interval=float("inf"),
+                    fsync=FSYNC_NEVER, validated=True) as writer:
+        for seg in range(len(store.segments)):
+            ts, cols = store.read_segment(seg)
+            for row, t in enumerate(ts.tolist()):
+                prices = validator.validate(t, {s: cols[s][row] for s in store.symbols})
+                if prices is not None:
+                    writer.append(t, prices)
+    validator.close()
+    return validator.stats()
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    if len(sys.argv) != 4 or sys.argv[1] != "clean":
+        sys.exit("usage: python -m utils.tick_validator clean SRC.ticks DST.ticks")
+    if os.path.exists(sys.argv[3]):
+        sys.exit(f"{sys.argv[3]} already exists")
+    quarantine = os.path.splitext(sys.argv[3])[0] + ".quarantine.jsonl"
+    print(clean_store(sys.argv[2], sys.argv[3], quarantine_path=quarantine))
@@ -0,0 +1,103 @@
+# utils/universe.py
+#
+# The coins the tracker follows, in one place for the publishers, the
+# dashboard and the tick store.
+#
+# The default universe is the original four coins. Point $CRYPTO_UNIVERSE at
+# a JSON file to follow more: a list of CoinGecko ids, or of
+# {"id": ..., "symbol": ...} objects so the CoinMarketCap scraper can match
+# them by ticker as well.
+#
+# Every coin is published on its own key expression, so consumers subscribe
+# to exactly what they need instead of decoding every coin:
+#
+#   crypto/prices/bitcoin    one coin
+#   crypto/prices/*          every coin
+#
+# A coin's position in the universe (index) is its column in the price
+# vectors the validator, the rings and the shared state work on, so the hot
+# path never needs a Python object per coin.
+import json
+import os
+
+import numpy as np
+
+from utils.tick_validator import clean_price
+
+PRICE_PREFIX = "crypto/prices"
+UNIVERSE_ENV = "CRYPTO_UNIVERSE"
+DEFAULT_COINS = [
+    {"id": "bitcoin", "symbol": "btc"},
+    {"id": "ethereum", "symbol": "eth"},
+    {"id": "dogecoin", "symbol": "doge"},
+    {"id": "solana", "symbol": "sol"},
+]
+
+
+def price_key(coin):
+    return f"{PRICE_PREFIX}/{coin}"
+
+
+def coin_of(key):
+    """Coin id of a per-coin key expression (its last chunk)."""
+    return str(key).rsplit("/", 1)[-1]
+
+
+class SymbolUniverse:
+    def __init__(self, coins, tickers=None):
+        """`coins` is the ordered list of coin ids; `tickers` maps exchange
+        tickers (e.g. "btc") to coin ids."""
+        self.coins = list(dict.fromkeys(coins))
+        self.index = {coin: i for i, coin in enumerate(self.coins)}
+        self.tickers = {}
+        for ticker, coin in (tickers or {}).items():
+            if coin in self.index:
+                # Tickers are not unique across coins: the first listed wins
+                self.tickers.setdefault(ticker.lower(), coin)
+        self.keys = [price_key(coin) for coin in self.coins]
+
+    def __len__(self):
+        return len(self.coins)
+
+    def __iter__(self):
+        return iter(self.coins)
+
+    def __contains__(self, coin):
+        return coin in self.index
+
+    def batches(self, size):
+        """The coin ids in lists of at most `size`, e.g. one upstream request each."""
+        return [self.coins[i:i + size] for i in range(0, len(self.coins), size)]
+
+    def row(self, prices):
+        """{coin: price} -> float64 vector in universe order, NaN where a coin
+        has no usable price. Coins outside the universe are ignored."""
+        values = np.full(len(self.coins), np.nan)
+        for coin, price in prices.items():
+            i = self.index.get(coin)
+            if i is not None:
+                values[i] = clean_price(price)
+        return values
+
+
+def load_universe(path=None):
+    """The universe from `path` (default $CRYPTO_UNIVERSE), or the default coins."""
+    path = path or os.environ.get(UNIVERSE_ENV)
+    entries = DEFAULT_COINS
+    if path:
+        with open(path) as f:
+            entries = json.load(f)
+    coins, tickers = [], {}
+    for entry in entries:
+        if isinstance(entry, str):
+            coins.append(entry)
+        else:
+            coins.append(entry["id"])
+            if entry.get("symbol"):
+                tickers.setdefault(entry["symbol"].lower(), entry["id"])
+    if not coins:
+        raise ValueError(f"{path}: the universe has no coins")
+    return SymbolUniverse(coins, tickers)
+
+
+UNIVERSE = load_universe()
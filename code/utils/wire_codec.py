@@ -0,0 +1,152 @@
+# utils/wire_codec.py
+#
+# Wire format for ticks on crypto/prices/<coin> (and the legacy combined
+# crypto/prices key).
+#
+# Binary v1 (little-endian):
+#
+#   offset  size  field
+#   0       4     magic b"CTKB"
+#   4       1     version (1)
+#   5       1     flags (reserved, 0)
+#   6       2     symbol table id
+#   8       8     timestamp, int64 epoch nanoseconds
+#   16      8*N   float64 price per symbol of the table, NaN = missing
+#
+# The symbol table is agreed in advance (SYMBOL_TABLES), so a tick carries no
+# names at all. Table 0 (KEYED_TABLE) is one price whose coin is the last
+# chunk of the key expression it was published on: that is what the
+# per-coin keys carry, 24 bytes per price (encode_price). Decoding checks magic, version and exact length, then wraps
+# the price block with np.frombuffer: no per-field parsing and no copy beyond
+# the one Zenoh makes when the payload is turned into bytes.
+#
+# Anything that does not start with the magic is treated as JSON, either the
+# {"timestamp", "prices"} envelope or the bare {coin: price} dict that older
+# scraper_pub builds sent. Publishers fall back to JSON on their own when a
+# tick has coins that no registered table covers.
+import json
+import struct
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from utils.tick_store import from_epoch_ns, to_epoch_ns
+
+MAGIC = b"CTKB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHq")
+KEYED_PACKER = struct.Struct(HEADER.format + "d")
+
+FORMAT_BINARY = "binary"
+FORMAT_JSON = "json"
+
+KEYED_TABLE = 0
+SYMBOL_TABLES = {
+    1: ("bitcoin", "ethereum", "dogecoin", "solana"),
+}
+
+
+class Tick(namedtuple("Tick", "timestamp symbols prices")):
+    """timestamp: int64 epoch-ns; symbols: tuple of coin ids; prices: float64
+    array (a 1-tuple of float for a per-coin tick)."""
+
+    def as_dict(self):
+        return {s: float(p) for s, p in zip(self.symbols, self.prices) if p == p}
+
+
+def register_symbol_table(table_id, symbols):
+    if table_id == KEYED_TABLE:
+        raise ValueError(f"symbol table {KEYED_TABLE} is reserved for per-coin keys")
+    if table_id in SYMBOL_TABLES and SYMBOL_TABLES[table_id] != tuple(symbols):
+        raise ValueError(f"symbol table {table_id} is already registered")
+    SYMBOL_TABLES[table_id] = tuple(symbols)
+    _table_lookup.clear()
+
+
+_table_lookup = {}      # frozenset of coins -> table id (or None)
+_packers = {}           # table id -> struct.Struct for the whole message
+
+
+def table_for(coins):
+    """Smallest registered table covering every coin, or None."""
+    key = frozenset(coins)
+    if key not in _table_lookup:
+        fits = [(len(syms), tid) for tid, syms in SYMBOL_TABLES.items() if key.issubset(syms)]
+        _table_lookup[key] = min(fits)[1] if fits else None
+    return _table_lookup[key]
+
+
+def _packer(table_id):
+    packer = _packers.get(table_id)
+    if packer is None:
+        packer = _packers[table_id] = struct.Struct(HEADER.format + "%dd" % len(SYMBOL_TABLES[table_id]))
+    return packer
+
+
+def encode_tick(timestamp, prices, fmt=FORMAT_BINARY, table_id=None):
+    """Encode one tick. Falls back to the JSON envelope when fmt is JSON or no
+    table covers the coins in `prices`."""
+    if fmt == FORMAT_BINARY:
+        table_id = table_id if table_id is not None else table_for(prices)
+        if table_id is not None:
+            return _packer(table_id).pack(MAGIC, VERSION, 0, table_id, to_epoch_ns(timestamp),
+                                          *[_price(prices.get(s)) for s in SYMBOL_TABLES[table_id]])
+    if not isinstance(timestamp, str):
+        timestamp = from_epoch_ns(to_epoch_ns(timestamp))
+    return json.dumps({"timestamp": timestamp, "prices": prices}).encode()
+
+
+def encode_price(timestamp, coin, price, fmt=FORMAT_BINARY):
+    """Encode one coin's price for its own key, crypto/prices/<coin>. The
+    binary form leaves the coin to the key; JSON carries it."""
+    if fmt == FORMAT_BINARY:
+        return KEYED_PACKER.pack(MAGIC, VERSION, 0, KEYED_TABLE, to_epoch_ns(timestamp), _price(price))
+    return encode_tick(timestamp, {coin: price}, fmt=fmt)
+
+
+def decode_tick(payload, key=None):
+    """Decode a binary or JSON payload into a Tick. `key` is the key
+    expression it arrived on, needed for per-coin (KEYED_TABLE) ticks.
+    Raises ValueError on bad input."""
+    if payload[:4] == MAGIC:
+        if len(payload) == KEYED_PACKER.size and key is not None:
+            # Per-coin tick: one unpack, no array for a single price
+            _, version, _, table_id, ts, price = KEYED_PACKER.unpack(payload)
+            if version == VERSION and table_id == KEYED_TABLE:
+                return Tick(ts, (key.rsplit("/", 1)[-1],), (price,))
+        if len(payload) < HEADER.size:
+            raise ValueError("truncated tick header")
+        _, version, _, table_id, ts = HEADER.unpack_from(payload, 0)
+        if version != VERSION:
+            raise ValueError(f"unsupported tick version {version}")
+        if table_id == KEYED_TABLE:
+            raise ValueError("per-coin tick without its key or of the wrong length")
+        symbols = SYMBOL_TABLES.get(table_id)
+        if symbols is None:
+            raise ValueError(f"unknown symbol table {table_id}")
+        if len(payload) != HEADER.size + 8 * len(symbols):
+            raise ValueError("tick length does not match its symbol table")
+        return Tick(ts, symbols, np.frombuffer(payload, dtype="<f8", offset=HEADER.size))
+
+    data = json.loads(payload)
+    if not isinstance(data, dict):
+        raise ValueError("tick is not a JSON object")
+    if "prices" in data:
+        prices = data["prices"]
+        ts = to_epoch_ns(data.get("timestamp") or datetime.now())
+    else:
+        # Bare {coin: price} from older publishers: stamp on receipt
+        prices = data
+        ts = to_epoch_ns(datetime.now())
+    if not isinstance(prices, dict):
+        raise ValueError("tick prices are not a JSON object")
+    symbols = tuple(prices)
+    return Tick(ts, symbols, np.array([_price(prices[s]) for s in symbols], dtype=np.float64))
+
+
+def _price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
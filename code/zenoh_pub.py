@@ -1,24 +1,66 @@
 import time
 import requests
 import json
-import zenoh
 import csv
-from datetime import datetime
-from bs4 import BeautifulSoup
+import atexit
 import os
+import signal
+import sys
+import threading
+from functools import partial
+import numpy as np
+from utils.tick_store import StoreLocked, open_writer, to_epoch_ns
+from utils.tick_validator import TickValidator
+from utils.ingest import IngestScheduler, Source
+from utils.log import get_logger
+from utils.metrics import STAGE_SECONDS, counter, register_stats, start_metrics_server
+from utils.wire_codec import encode_price, encode_tick, FORMAT_BINARY
+from utils.history_service import HistoryService
+from utils.universe import UNIVERSE, PRICE_PREFIX
+from scraper_pub import get_crypto_prices_bs_embedded_json
 # cd C:\Asia university\advanced computer programming\crypto_tracker
 # python zenoh_sub_dash.py
 # python zenoh_pub.py
 # python analyze_and_predict.py
 # ==== Configuration ====
-CRYPTO_IDS = ["bitcoin", "ethereum", "dogecoin", "solana"]
+# The symbol universe (utils/universe.py, $CRYPTO_UNIVERSE)
+CRYPTO_IDS = UNIVERSE.coins
 VS_CURRENCY = "usd"
-CSV_FILE = CSV_FILE = "C:\\Asia university\\advanced computer programming\\crypto_tracker\\crypto_prices.csv"
-ZENOH_PRICE_KEY = "crypto/prices"
+# Ids per CoinGecko request; each batch is its own ingest source with its own
+# retries and circuit breaker, so one failing request costs only its coins
+FETCH_BATCH = 100
+CSV_FILE = "crypto_prices.csv"   # in the working directory, like the other scripts
+TICK_STORE_FILE = os.path.splitext(CSV_FILE)[0] + ".ticks"
+QUARANTINE_FILE = os.path.splitext(CSV_FILE)[0] + ".quarantine.jsonl"
+# Each coin goes out on crypto/prices/<coin>; set PUBLISH_COMBINED for
+# consumers that still subscribe to the single combined crypto/prices key
+ZENOH_PRICE_KEY = PRICE_PREFIX
+PUBLISH_COMBINED = False
 ZENOH_NEWS_KEY = "crypto/news"
+PRICE_PERIOD = 10   # seconds, fixed rate
+NEWS_PERIOD = 60
+WIRE_FORMAT = FORMAT_BINARY   # or FORMAT_JSON for JSON-only consumers
+# Prometheus metrics on http://127.0.0.1:<port>/metrics ($METRICS_PORT overrides)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9101))
 
-# ==== Initialize Zenoh ====
-session = zenoh.open(zenoh.Config())
+# ==== Logging / Metrics ====
+log = get_logger("PUB")
+PUBLISH_SECONDS = STAGE_SECONDS.labels(stage="publish")
+PERSIST_SECONDS = STAGE_SECONDS.labels(stage="persist")
+PUBLISHED = counter("tracker_published_ticks_total", "Ticks put on crypto/prices/*")
+REJECTED = counter("tracker_rejected_ticks_total", "Ticks the validator rejected")
+
+# ==== Zenoh Session (opened on first use) ====
+session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global session
+    with _session_lock:
+        if session is None:
+            import zenoh
+            session = zenoh.open(zenoh.Config())
+        return session
 
 # ==== Create CSV File (if not exists or empty) ====
 def init_csv():
@@ -31,44 +73,62 @@ def init_csv():
     else:
         print(f"[INIT] CSV already exists and is not empty.")
 
-# ==== Append Prices to CSV ====
+# ==== Tick Store (batched, mirrored to CSV) ====
+tick_writer = None
+
+def init_store():
+    global tick_writer
+    try:
+        tick_writer = open_writer(TICK_STORE_FILE, CRYPTO_IDS, csv_mirror=CSV_FILE,
+                                  batch_size=32, flush_interval=10.0, validated=True)
+        atexit.register(tick_writer.close)
+    except StoreLocked as e:
+        # The dashboard in the same directory already persists the same ticks
+        log.warn("not persisting ticks, the store has another writer", error=e)
+
+# ==== Append Prices to Store ====
 def append_to_csv(timestamp, prices):
-    row = [timestamp] + [prices.get(crypto, "NA") for crypto in CRYPTO_IDS]
+    """Buffer one tick, a price vector in CRYPTO_IDS order."""
+    if tick_writer is None:
+        return
+    start = time.perf_counter()
     try:
-        with open(CSV_FILE, 'a', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(row)
-        print(f"[CSV] Appended row: {row}")
+        tick_writer.append_rows([timestamp], [prices], CRYPTO_IDS)
     except PermissionError:
-        print("[ERROR] Permission denied while writing to CSV. Close the file if it's open in Excel.")
+        log.error("permission denied while writing to CSV, close the file if it's open in Excel")
     except Exception as e:
-        print(f"[ERROR] CSV Write Error: {e}")
+        log.error("store write error", error=e)
+    PERSIST_SECONDS.observe(time.perf_counter() - start)
 
 # ==== Fetch Crypto Prices ====
-def fetch_prices():
+def fetch_prices(http=None, timeout=10, ids=None):
+    http = http or requests
+    ids = CRYPTO_IDS if ids is None else ids
     url = "https://api.coingecko.com/api/v3/simple/price"
     params = {
-        "ids": ",".join(CRYPTO_IDS),
+        "ids": ",".join(ids),
         "vs_currencies": VS_CURRENCY
     }
     try:
-        response = requests.get(url, params=params)
+        response = http.get(url, params=params, timeout=timeout)
         data = response.json()
-        prices = {crypto: data.get(crypto, {}).get(VS_CURRENCY, 0) for crypto in CRYPTO_IDS}
+        prices = {crypto: data.get(crypto, {}).get(VS_CURRENCY, 0) for crypto in ids}
         if all(price == 0 for price in prices.values()):
-            print("[WARN] Skipping publish due to 0 prices.")
+            log.warn("skipping publish due to 0 prices")
             return None
         return prices
     except Exception as e:
-        print("[ERROR] Price Fetch Error:", e)
+        log.error("price fetch error", error=e)
         return None
 
 # ==== Fetch Crypto News (CryptoPanic RSS Alternative) ====
-def fetch_crypto_news():
+def fetch_crypto_news(http=None, timeout=10):
+    from bs4 import BeautifulSoup
+    http = http or requests
     try:
         url = "https://cryptopanic.com/news"
         headers = { "User-Agent": "Mozilla/5.0" }
-        res = requests.get(url, headers=headers)
+        res = http.get(url, headers=headers, timeout=timeout)
         soup = BeautifulSoup(res.content, "html.parser")
 
         news = []
@@ -78,25 +138,63 @@ def fetch_crypto_news():
             news.append({"title": title, "url": link})
         return news[:5]
     except Exception as e:
-        print("[ERROR] News Fetch Error:", e)
+        log.error("news fetch error", error=e)
         return []
 
-# ==== Run Loop ====
-init_csv()
+# ==== Publish ====
+# Bad ticks (0 / "NA" prices, outliers, swapped columns) never reach the wire
+tick_validator = TickValidator(CRYPTO_IDS, quarantine_path=QUARANTINE_FILE)
+atexit.register(tick_validator.close)
+register_stats("tracker_validator", tick_validator.stats, "Tick validator counter")
+
+def publish_snapshot(snapshot):
+    ts = to_epoch_ns(snapshot["timestamp"])
+    prices = tick_validator.validate_row(ts, UNIVERSE.row(snapshot["prices"]), "+".join(snapshot["sources"]))
+    if prices is None:
+        REJECTED.inc()
+        return
+    start = time.perf_counter()
+    session = get_session()
+    for i in np.flatnonzero(~np.isnan(prices)).tolist():
+        session.put(UNIVERSE.keys[i], encode_price(ts, CRYPTO_IDS[i], prices[i], fmt=WIRE_FORMAT))
+    if PUBLISH_COMBINED:
+        combined = {CRYPTO_IDS[i]: float(prices[i]) for i in np.flatnonzero(~np.isnan(prices))}
+        session.put(ZENOH_PRICE_KEY, encode_tick(ts, combined, fmt=WIRE_FORMAT))
+    PUBLISH_SECONDS.observe(time.perf_counter() - start)
+    PUBLISHED.inc()
+    append_to_csv(ts, prices)
 
-while True:
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def news_loop(http):
+    while True:
+        news = fetch_crypto_news(http)
+        if news:
+            get_session().put(ZENOH_NEWS_KEY, json.dumps(news))
+            log.info("published news", items=len(news))
+        time.sleep(NEWS_PERIOD)
+
+# ==== Run Loop ====
+def main():
+    init_csv()
+    init_store()
+    start_metrics_server(METRICS_PORT)
+    # Late joiners backfill from crypto/history/* instead of reading our files;
+    # rows still buffered in tick_writer are flushed before each answer
+    HistoryService(TICK_STORE_FILE, writer=tick_writer).start(get_session())
+    # Run the atexit hooks (flush the store) on SIGTERM too
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
 
-    prices = fetch_prices()
-    if prices:
-        timestamp = datetime.now().isoformat()  # ISO format timestamp
-        payload = {"timestamp": timestamp, "prices": prices}
-        session.put(ZENOH_PRICE_KEY, json.dumps(payload))
-        append_to_csv(timestamp, prices) 
+    # CoinGecko first so its prices win; CoinMarketCap fills gaps while it is down
+    batches = UNIVERSE.batches(FETCH_BATCH)
+    coingecko = [Source("coingecko" if len(batches) == 1 else f"coingecko-{k}",
+                        partial(fetch_prices, ids=ids), timeout=5)
+                 for k, ids in enumerate(batches)]
+    scheduler = IngestScheduler(coingecko + [
+        Source("coinmarketcap", partial(get_crypto_prices_bs_embedded_json, symbols=UNIVERSE.tickers),
+               timeout=10, retries=1),
+    ], publish_snapshot, period=PRICE_PERIOD)
 
-    news = fetch_crypto_news()
-    if news:
-        session.put(ZENOH_NEWS_KEY, json.dumps(news))
-        print(f"[PUB] Published {len(news)} news items.")
+    threading.Thread(target=news_loop, args=(scheduler.session,), daemon=True).start()
+    scheduler.run()
 
-    time.sleep(10)
+if __name__ == "__main__":
+    main()
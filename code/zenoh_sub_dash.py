@@ -1,67 +1,186 @@
 import threading
-import json
-from collections import deque, defaultdict
-from dash import Dash, html, dcc, dash_table
+from collections import deque, defaultdict, OrderedDict
+from dash import Dash, html, dcc, dash_table, Patch, no_update
+from dash.exceptions import PreventUpdate
 from dash.dependencies import Output, Input, State
 import plotly.graph_objs as go
-import zenoh
 import time
-import requests
-from bs4 import BeautifulSoup
 import csv
 import os
 import subprocess
+import atexit
+import signal
+import sys
 import numpy as np
 from datetime import datetime, timedelta
+from utils.tick_store import StoreLocked, open_writer, read_tail, to_epoch_ns
+from utils.ring_buffer import PriceMatrix
+from utils.shared_state import SharedPriceState
+from utils.rollup import Rollup, load_rollups, save_rollups
+from utils.history_query import HistoryQuery
+from utils.history_service import read_history
+from utils.sample_queue import SampleQueue, DROP_OLDEST
+from utils.wire_codec import decode_tick
+from utils.tick_validator import TickValidator
+from utils.forecasting import ForecastEngine
+from utils.indicators import IndicatorEngine, load_indicators, save_indicators
+from utils.alerts import ALERT_KEY, AlertEngine, encode_alert, load_rules
+from utils.forecast_cache import ForecastCache
+from utils.news_service import NewsService
+from utils.callback_stats import timed_callback, install_stats_route
+from utils.tick_broadcast import TickBroadcaster, install_push_route
+from utils.universe import UNIVERSE, PRICE_PREFIX
+from utils.log import get_logger
+from utils.metrics import (STAGE_SECONDS, counter, register_stats, install_metrics_route,
+                           start_metrics_server)
 
-# Zenoh settings
-ZENOH_KEY = "crypto/prices"
+# Zenoh settings: every coin's own key crypto/prices/<coin>, and the combined
+# crypto/prices of older publishers, which "**" matches too
+ZENOH_KEY = PRICE_PREFIX + "/**"
+HISTORY_TIMEOUT = 10.0   # seconds to wait for crypto/history/* when there is no local history
 
-# Supported cryptocurrencies
-SUPPORTED_CRYPTOS = ["bitcoin", "ethereum", "dogecoin", "solana"]
+# Supported cryptocurrencies: the symbol universe (utils/universe.py,
+# $CRYPTO_UNIVERSE). Coin i is column i of every price vector below.
+SUPPORTED_CRYPTOS = UNIVERSE.coins
+
+# Deployment mode, from the DASH_MODE environment variable:
+#   single  one process: Zenoh subscriber, persistence and Dash (default)
+#   ingest  owns the Zenoh subscription and persistence, and publishes the
+#           price rings in shared memory; serves no pages
+#   worker  read-only Dash worker attached to the ingest process's rings.
+#           Run several behind a WSGI server, without --preload:
+#           DASH_MODE=worker gunicorn -w 4 -k gthread --threads 16 zenoh_sub_dash:server
+MODE_SINGLE = "single"
+MODE_INGEST = "ingest"
+MODE_WORKER = "worker"
+DASH_MODE = os.environ.get("DASH_MODE", MODE_SINGLE)
+SHARED_STATE_NAME = "crypto_dash_prices"
+FOLLOW_INTERVAL = 0.1   # seconds between a worker's checks for new ticks
+# Prometheus metrics: /metrics on the Dash server; the ingest process serves
+# no pages, so it listens on METRICS_PORT instead ($METRICS_PORT overrides)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9100))
+# DASH_DEBUG=1 serves per-callback timings as JSON at /debug/callbacks
+DASH_DEBUG = os.environ.get("DASH_DEBUG", "") not in ("", "0")
+
+# ==== Logging / Metrics ====
+log = get_logger("ZENOH")
+DECODE_SECONDS = STAGE_SECONDS.labels(stage="decode")
+PERSIST_SECONDS = STAGE_SECONDS.labels(stage="persist")
+PREDICT_SECONDS = STAGE_SECONDS.labels(stage="predict")
+TICKS = counter("tracker_ticks_total", "Ticks handled by the subscriber", ["result"])
+TICKS_ACCEPTED = TICKS.labels(result="accepted")
+TICKS_REJECTED = TICKS.labels(result="rejected")
+TICKS_UNDECODABLE = TICKS.labels(result="undecodable")
 
 # Real-time data storage
-price_history = defaultdict(lambda: deque(maxlen=100))
+# (timestamp, price) rings of every coin in one PriceMatrix, appended a price
+# vector per tick; price_history[coin].window() hands out views, not copies.
+# Workers read the ingest process's rings through SharedRing, which copies
+# each window out of shared memory as a consistent snapshot.
+# A sample costs 32 bytes (double-written timestamp and price), so the
+# per-coin capacity shrinks as the universe grows, within HISTORY_BUDGET.
+HISTORY_BUDGET = 256 * 2 ** 20
+HISTORY_CAPACITY = min(200_000, HISTORY_BUDGET // (32 * len(SUPPORTED_CRYPTOS)))
+# Points per coin loaded from the end of the persisted history on startup, so
+# charts and forecasts are populated before the first new tick arrives
+WARM_START_POINTS = 5000
+# Workers get the ingest process's rings in init_shared_state()
+shared_state = None
+price_history = {} if DASH_MODE == MODE_WORKER else PriceMatrix(SUPPORTED_CRYPTOS, HISTORY_CAPACITY)
+
+# Rollups and trend models are Python objects per coin, so only the
+# ACTIVE_COINS most recently viewed coins have them. The first ones of the
+# universe start active; activate() builds a coin's from the tick store and
+# its ring when a chart asks for it, dropping the least recently viewed.
+ACTIVE_COINS = 32
+active_coins = OrderedDict()     # coin -> column, least recently viewed first
+active_lock = threading.Lock()   # held while the active coins' state is updated
+follow_seen = None               # worker mode: samples of each coin replayed so far
+
+# OHLCV pyramid per active coin for long-range charts, persisted next to the tick store
+rollups = {}
+ROLLUP_SAVE_INTERVAL = 60.0
+HISTORY_CHART_POINTS = 500
+HISTORY_RANGES = [
+    ("Recent points", 'points'),
+    ("Last hour", str(3600)),
+    ("Last day", str(86400)),
+    ("Last 30 days", str(30 * 86400)),
+    ("Last year", str(365 * 86400)),
+]
+HISTORY_RANGE_LABELS = {value: label for label, value in HISTORY_RANGES}
 prediction_history = defaultdict(lambda: deque(maxlen=100))
 
-# Latest prices
-latest_prices = {}
-last_written_row = None 
+# Forecast model per active coin from utils.forecasting ("linear", "ewma",
+# "holt-winters", "ar", "naive"), updated in O(1) per tick
+FORECAST_MODEL = "linear"
+FORECAST_PARAMS = {"linear": {"span": 24 * 3600}}
+forecast_engine = ForecastEngine([], models=[FORECAST_MODEL], params=FORECAST_PARAMS)
+# The forecast chart's band is +-CONFIDENCE_BAND of the predicted price; the
+# gauge shows how many of the prices of the last CONFIDENCE_WINDOW seconds
+# (at most CONFIDENCE_POINTS) the model's band held: its in-sample residuals
+CONFIDENCE_BAND = 0.02
+CONFIDENCE_WINDOW = 24 * 3600
+CONFIDENCE_POINTS = 500
+
+# Technical indicators (SMA, Bollinger, EMA, RSI, VWAP, volatility) of every
+# coin, one vectorized O(1) step per tick; checkpointed next to the rollups so
+# a restart resumes them instead of replaying history
+indicator_engine = IndicatorEngine(SUPPORTED_CRYPTOS)
+
 CSV_FILE = "crypto_prices.csv"
+TICK_STORE_FILE = "crypto_prices.ticks"
+ROLLUP_DIR = "crypto_prices.rollup"
+LEGACY_ROLLUP_FILE = "crypto_prices.rollup.npz"   # read once if ROLLUP_DIR is missing
+INDICATOR_FILE = "crypto_prices.indicators.npz"
+QUARANTINE_FILE = "crypto_prices.quarantine.jsonl"
+tick_writer = None
+zenoh_session = None
+
+def latest_price(crypto):
+    """Newest price in the coin's ring, or None"""
+    last = price_history[crypto].last() if crypto in price_history else None
+    return None if last is None else last[1]
+
+def forecast_confidence(crypto):
+    """% of the coin's recent prices within CONFIDENCE_BAND of what the model
+    gives for their timestamps, or None until the model is ready (or once
+    the coin is no longer active)."""
+    with active_lock:
+        if crypto not in active_coins:
+            return None
+        ts, prices = price_history[crypto].window(CONFIDENCE_POINTS)
+        if len(ts):
+            recent = ts >= ts[-1] - CONFIDENCE_WINDOW * 1_000_000_000
+            ts, prices = ts[recent], prices[recent]
+        fitted = forecast_engine.forecast(crypto, ts / 1e9) if len(ts) else None
+    if fitted is None:
+        return None
+    return 100.0 * float(np.mean(np.abs(prices - fitted) <= CONFIDENCE_BAND * np.abs(fitted)))
 
 def get_predicted_prices(crypto):
-    """Get realistic predicted prices for next 24 hours"""
+    """Hourly forecast for the next 24 hours from FORECAST_MODEL"""
     try:
-        # Get current price or use reasonable default
-        current_price = latest_prices.get(crypto, 50000 if crypto == "bitcoin" else 
-                       3000 if crypto == "ethereum" else
-                       0.15 if crypto == "dogecoin" else 100)
+        current_price = latest_price(crypto)
+        if current_price is None or not activate(crypto):
+            return []
         
         # Generate timestamps for next 24 hours
         now = datetime.now()
         hours = 24
         timestamps = [now + timedelta(hours=i) for i in range(hours)]
         
-        # Create realistic prediction curve with:
-        # - Small random fluctuations
-        # - Possible small trend
-        # - No extreme jumps or zeros
-        x = np.linspace(0, 1, hours)
-        
-        # Base trend (small positive or negative)
-        trend_direction = np.random.choice([-1, 1]) * np.random.uniform(0.001, 0.005)
-        base_trend = current_price * (1 + trend_direction * x)
-        
-        # Add realistic volatility (1-3% changes)
-        volatility = current_price * np.random.uniform(0.01, 0.03, hours) * np.random.choice([-1, 1], hours)
-        
-        # Combine with noise that diminishes further in future
-        noise = current_price * np.random.normal(0, 0.005, hours) * (1 - x*0.8)
+        # Flat at the current price until the model has enough data
+        start = time.perf_counter()
+        with active_lock:
+            # activate() may have evicted it again meanwhile
+            pred_prices = (forecast_engine.forecast(crypto, [to_epoch_ns(ts) / 1e9 for ts in timestamps])
+                           if crypto in active_coins else None)
+        PREDICT_SECONDS.observe(time.perf_counter() - start)
+        if pred_prices is None:
+            pred_prices = np.full(hours, current_price)
         
-        # Combine all components
-        pred_prices = base_trend + volatility + noise
-        
-        # Ensure no negative or zero prices
+        # Keep extrapolations on the chart's scale
         pred_prices = np.maximum(pred_prices, current_price * 0.9)  # Never drop more than 10%
         pred_prices = np.minimum(pred_prices, current_price * 1.1)  # Never rise more than 10%
         
@@ -77,7 +196,7 @@ def get_predicted_prices(crypto):
         return predictions
         
     except Exception as e:
-        print("[PREDICT ERROR]", e)
+        log.error("prediction failed", coin=crypto, error=e)
         return []
 
 def init_csv():
@@ -87,50 +206,373 @@ def init_csv():
             header = ["timestamp"] + [f"{crypto}_usd" for crypto in SUPPORTED_CRYPTOS]
             writer.writerow(header)
 
-csv_lock = threading.Lock()
+def init_store():
+    global tick_writer
+    try:
+        tick_writer = open_writer(TICK_STORE_FILE, SUPPORTED_CRYPTOS, csv_mirror=CSV_FILE,
+                                  batch_size=64, flush_interval=10.0, validated=True)
+        atexit.register(tick_writer.close)
+    except StoreLocked as e:
+        # e.g. zenoh_pub.py running in the same directory: it persists the
+        # same ticks, and two writers would overwrite each other's segments
+        log.warn("not persisting ticks, the store has another writer", error=e)
+    init_rollups()
+
+def init_rollups():
+    """Activate the first ACTIVE_COINS coins: their rollups come from the
+    persisted pyramid, or are built once from the tick store."""
+    coins = SUPPORTED_CRYPTOS[:ACTIVE_COINS]
+    saved = {}
+    for path in (ROLLUP_DIR, LEGACY_ROLLUP_FILE):
+        if os.path.exists(path):
+            saved = load_rollups(path, coins)
+            break
+    missing = [c for c in coins if c not in saved or saved[c].levels[0].open_t is None]
+    if missing:
+        if tick_writer is not None:
+            tick_writer.flush()
+        query = HistoryQuery(TICK_STORE_FILE) if os.path.exists(TICK_STORE_FILE) else None
+        stored = [c for c in missing if query is not None and c in query.symbols]
+        data = query.query(stored) if stored else {"timestamp": []}
+        for crypto in missing:
+            saved[crypto] = Rollup()
+            if crypto in stored:
+                saved[crypto].extend(data["timestamp"], data[crypto])
+        print(f"[ROLLUP] Built {len(missing)} coins from {len(data['timestamp'])} stored ticks")
+    with active_lock:
+        for crypto in coins:
+            rollups[crypto] = saved[crypto]
+            forecast_engine.add(crypto)
+            active_coins[crypto] = UNIVERSE.index[crypto]
+    if DASH_MODE != MODE_WORKER:
+        # Workers only read the file; the ingest process keeps it current
+        atexit.register(save_active_rollups)
+
+def save_active_rollups():
+    save_rollups(ROLLUP_DIR, rollups, lock=active_lock)
+
+def init_indicators():
+    """Resume the indicators from their checkpoint; warm_start() or the
+    shared-state follower then feeds them the ticks since."""
+    with active_lock:
+        restored = load_indicators(INDICATOR_FILE, indicator_engine)
+    if restored:
+        print(f"[INDICATORS] Restored {restored} coins from {INDICATOR_FILE}")
+    if DASH_MODE != MODE_WORKER:
+        atexit.register(save_indicator_state)
+
+def save_indicator_state():
+    save_indicators(INDICATOR_FILE, indicator_engine, lock=active_lock)
+
+def ring_history(crypto):
+    """(total, ts, prices): everything the coin's ring holds, from one snapshot."""
+    if DASH_MODE == MODE_WORKER:
+        return shared_state.newer_than(crypto, 0)
+    ring = price_history[crypto]
+    ts, prices = ring.window()
+    return ring.total, ts, prices
+
+def build_rollup(crypto, ts, prices):
+    """A coin's pyramid from the tick store, plus ring samples not stored yet.
+    Returns it with the timestamp of the newest tick it holds (None if empty)."""
+    rollup, newest = Rollup(), None
+    if tick_writer is not None:
+        tick_writer.flush()
+    if os.path.exists(TICK_STORE_FILE):
+        query = HistoryQuery(TICK_STORE_FILE)
+        if crypto in query.symbols:
+            data = query.query([crypto])
+            if len(data["timestamp"]):
+                rollup.extend(data["timestamp"], data[crypto])
+                newest = int(data["timestamp"].max())
+                keep = ts > newest
+                ts, prices = ts[keep], prices[keep]
+    rollup.extend(ts, prices)
+    if len(ts):
+        newest = int(ts.max())
+    return rollup, newest
+
+def activate(crypto):
+    """Make crypto the most recently viewed active coin, building its rollup
+    and trend model if it has none. False for coins outside the universe."""
+    if crypto not in price_history:
+        return False
+    start = time.perf_counter()
+    with active_lock:
+        if crypto in active_coins:
+            active_coins.move_to_end(crypto)
+            return True
+        _, ts, prices = ring_history(crypto)
+        ts, prices = ts.copy(), prices.copy()
+    # Reading the store can take a while: build from the snapshot without the
+    # lock, so ticks and other charts are not held up, and only swap it in
+    rollup, newest = build_rollup(crypto, ts, prices)
+    with active_lock:
+        if crypto in active_coins:
+            # Another request activated it meanwhile
+            active_coins.move_to_end(crypto)
+            return True
+        # Ticks that arrived while it was built
+        total, ts, prices = ring_history(crypto)
+        late = ts > newest if newest is not None else slice(None)
+        rollup.extend(ts[late], prices[late])
+        rollups[crypto] = rollup
+        forecast_engine.add(crypto)
+        if len(ts):
+            forecast_engine.fit(crypto, ts, prices)
+        column = active_coins[crypto] = UNIVERSE.index[crypto]
+        if follow_seen is not None:
+            follow_seen[column] = total
+        while len(active_coins) > ACTIVE_COINS:
+            evicted, _ = active_coins.popitem(last=False)
+            rollups.pop(evicted, None)
+            forecast_engine.drop(evicted)
+    history_cache.bump([crypto])
+    forecast_cache.bump([crypto])
+    log.info("activated", coin=crypto, ms=round((time.perf_counter() - start) * 1000, 1))
+    return True
+
+def update_active(ts, prices):
+    """Feed one accepted price vector to the active coins' rollups and trend
+    models (caller holds active_lock). Returns the coins that had a price."""
+    current = {}
+    for crypto, column in active_coins.items():
+        price = prices[column]
+        if price == price:
+            rollups[crypto].update(ts, float(price))
+            current[crypto] = float(price)
+    forecast_engine.update(ts, current)
+    return current
+
+def warm_start(n=WARM_START_POINTS):
+    """Fill the rings and the active coins' trend models with the last n
+    points per coin, tail-read from the tick store (or the CSV before the
+    first import, or the history service when neither has any rows). The
+    tail goes through the validator first, which also primes its bands.
+    Must run before tick_consumer() so the rings stay in time order."""
+    start = time.perf_counter()
+    if tick_writer is not None:
+        tick_writer.flush()
+    ts, columns = read_tail(TICK_STORE_FILE, CSV_FILE, n, SUPPORTED_CRYPTOS)
+    if not len(ts):
+        ts, columns = backfill_tail(n)
+    values = np.full((len(ts), len(SUPPORTED_CRYPTOS)), np.nan)
+    for i, crypto in enumerate(SUPPORTED_CRYPTOS):
+        if crypto in columns:
+            values[:, i] = columns[crypto]
+    timestamps, rows = [], []
+    for t, row in zip(ts.tolist(), values):
+        prices = tick_validator.validate_row(t, row, "warm-start", quarantine=False)
+        if prices is not None:
+            price_history.append_row(t, prices)
+            # Ticks the checkpoint already covers are skipped per coin
+            indicator_engine.update(t, prices)
+            alert_engine.observe(t, prices)
+            timestamps.append(t)
+            rows.append(prices)
+    with active_lock:
+        for crypto in active_coins:
+            ring = price_history[crypto]
+            if len(ring):
+                forecast_engine.fit(crypto, *ring.window())
+    if shared_state is not None and rows:
+        # Workers attached to the rings see the history too
+        shared_state.write_rows(timestamps, rows)
+    print(f"[WARM] Loaded {len(rows)} of the last {len(ts)} stored ticks "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def backfill_tail(n):
+    """The last n ticks from the publisher's history service, for a dashboard
+    started without local history (another machine, a fresh directory)."""
+    try:
+        return read_history(open_zenoh(), SUPPORTED_CRYPTOS, last=n, timeout=HISTORY_TIMEOUT)
+    except Exception as e:
+        log.warn("history backfill failed", error=e)
+        return np.empty(0, dtype=np.int64), {}
 
 # ========== Zenoh Subscriber Thread ==========
-def zenoh_listener():
-    def callback(sample):
-        global last_written_row
+# The Zenoh callback only enqueues raw payloads; tick_consumer() drains them
+# in micro-batches so decoding and disk writes never run on Zenoh's thread.
+QUEUE_CAPACITY = 4096
+QUEUE_POLICY = DROP_OLDEST   # or BLOCK / COALESCE (latest per key expression)
+MAX_BATCH = 512
+
+sample_queue = SampleQueue(QUEUE_CAPACITY, policy=QUEUE_POLICY)
+
+# Decoded ticks are pushed to browsers over server-sent events; each client
+# gets at most PUSH_MAX_RATE merged messages per second
+PUSH_MAX_RATE = 2.0
+tick_broadcaster = TickBroadcaster(max_rate=PUSH_MAX_RATE)
+
+# Every decoded tick goes through the validator before it reaches the rings,
+# the store or the push clients; rejects go to QUARANTINE_FILE
+tick_validator = TickValidator(SUPPORTED_CRYPTOS, quarantine_path=QUARANTINE_FILE)
+atexit.register(tick_validator.close)
+
+# Price alert rules from $CRYPTO_ALERTS (utils/alerts.py), checked against every
+# accepted tick and published on ALERT_KEY. Workers replay ticks the ingest
+# process already checked, so only the process owning the subscription fires.
+alert_engine = AlertEngine(SUPPORTED_CRYPTOS, load_rules())
+
+register_stats("tracker_queue", sample_queue.stats, "Zenoh sample queue")
+register_stats("tracker_validator", tick_validator.stats, "Tick validator counter")
+register_stats("tracker_push", tick_broadcaster.stats, "Server-sent events push")
+register_stats("tracker_alerts", alert_engine.stats, "Price alert")
+
+def apply_batch(items):
+    # Per-coin ticks of one timestamp are merged into one price vector. Decode
+    # time is observed per batch: a snapshot is one message per coin.
+    rows = {}
+    start = time.perf_counter()
+    for source, payload in items:
         try:
-            data = json.loads(bytes(sample.payload).decode())
-            timestamp = data.get("timestamp")
-            prices = data.get("prices")
-            
-            if not timestamp or not prices:
-                return
-            
-            new_row = [timestamp] + [prices.get(crypto, "N/A") for crypto in SUPPORTED_CRYPTOS]
-            
-            if new_row == last_written_row:
-                return
-            
-            last_written_row = new_row
-            
+            # Per-coin, combined binary or either JSON schema (see utils/wire_codec.py)
+            tick = decode_tick(payload, source)
+        except Exception as e:
+            TICKS_UNDECODABLE.inc()
+            log.error("undecodable tick", key=source, error=e)
+            continue
+        row = rows.get(tick.timestamp)
+        if row is None:
+            row = rows[tick.timestamp] = np.full(len(SUPPORTED_CRYPTOS), np.nan)
+        for crypto, price in zip(tick.symbols, tick.prices):
+            column = UNIVERSE.index.get(crypto)
+            # The first price of a coin for a timestamp wins, like in the validator
+            if column is not None and row[column] != row[column]:
+                row[column] = price
+    DECODE_SECONDS.observe(time.perf_counter() - start)
+
+    timestamps, accepted, updated, alerts = [], [], set(), []
+    with active_lock:
+        for ts in sorted(rows):
+            # Drops duplicates, missing values, outliers; repairs swapped columns
+            prices = tick_validator.validate_row(ts, rows[ts], ZENOH_KEY)
+            if prices is None:
+                TICKS_REJECTED.inc()
+                continue
+            TICKS_ACCEPTED.inc()
+
             # Update in-memory data for dashboard
-            for crypto in SUPPORTED_CRYPTOS:
-                price = prices.get(crypto)
-                if price is not None and price != "N/A":
-                    price_history[crypto].append(float(price))
-                    latest_prices[crypto] = float(price)
-            
-            # Write to CSV
-            with csv_lock:
-                with open(CSV_FILE, "a", newline="") as f:
-                    writer = csv.writer(f)
-                    writer.writerow(new_row)
+            have = price_history.append_row(ts, prices)
+            updated.update(update_active(ts, prices))
+            indicator_engine.update(ts, prices)
+            alerts.extend(alert_engine.update(ts, prices, indicator_engine))
+            if tick_broadcaster.active:
+                tick_broadcaster.publish(ts, {SUPPORTED_CRYPTOS[i]: float(prices[i]) for i in have})
+            timestamps.append(ts)
+            accepted.append(prices)
+
+    if not accepted:
+        return 0
+    # Only active coins have cached views
+    history_cache.bump(updated)
+    forecast_cache.bump(updated)
+    start = time.perf_counter()
+    if shared_state is not None:
+        shared_state.write_rows(timestamps, accepted)
+    
+    # Persist the whole batch at once (the store mirrors flushed batches to the CSV)
+    if tick_writer is not None:
+        tick_writer.append_rows(timestamps, accepted, SUPPORTED_CRYPTOS)
+    PERSIST_SECONDS.observe(time.perf_counter() - start)
+    publish_alerts(alerts)
+    return len(accepted)
+
+def publish_alerts(alerts):
+    for alert in alerts:
+        log.info("alert", rule=alert["id"], coin=alert["coin"], value=alert["value"])
+        if zenoh_session is not None:
+            zenoh_session.put(ALERT_KEY, encode_alert(alert))
+
+def tick_consumer():
+    last_save = time.monotonic()
+    while True:
+        batch = sample_queue.get_batch(MAX_BATCH, timeout=1.0)
+        try:
+            if batch:
+                apply_batch(batch)
+            if tick_writer is not None:
+                tick_writer.maybe_flush()
+                if time.monotonic() - last_save >= ROLLUP_SAVE_INTERVAL:
+                    save_active_rollups()
+                    save_indicator_state()
+                    last_save = time.monotonic()
         except Exception as e:
-            print(f"[ZENOH ERROR] {e}")
+            log.error("tick consumer failed", error=e)
+
+def shared_follower():
+    """Worker mode: replay ticks the ingest process wrote into this worker's
+    rollups, trend models, caches and push clients."""
+    global follow_seen
+    with active_lock:
+        follow_seen = shared_state.totals()
+        # Indicators: the ring tails, past what the checkpoint covers
+        indicator_engine.extend({column: price_history[crypto].window(WARM_START_POINTS)
+                                 for column, crypto in enumerate(SUPPORTED_CRYPTOS)})
+        for crypto in active_coins:
+            ts, prices = price_history[crypto].window()
+            if len(ts):
+                forecast_engine.fit(crypto, ts, prices)
+                # Ticks newer than the persisted pyramid
+                open_t = rollups[crypto].levels[0].open_t
+                if open_t is not None:
+                    keep = ts >= open_t + rollups[crypto].levels[0].width
+                    rollups[crypto].extend(ts[keep], prices[keep])
+    last_seq = None
+    while True:
+        time.sleep(FOLLOW_INTERVAL)
+        try:
+            if shared_state.seq == last_seq:
+                continue
+            last_seq = shared_state.seq
+            totals, last_ts, last_prices = shared_state.latest()
+            updated = set()
+            with active_lock:
+                changed = totals != follow_seen
+                # Every new sample: the indicators cover all coins, rollups and
+                # trend models only the active ones
+                samples = {}
+                for column in np.flatnonzero(changed).tolist():
+                    crypto = SUPPORTED_CRYPTOS[column]
+                    total, ts, prices = shared_state.newer_than(crypto, follow_seen[column])
+                    samples[column] = (ts, prices)
+                    totals[column] = total
+                    if crypto in active_coins:
+                        for t, price in zip(ts.tolist(), prices.tolist()):
+                            rollups[crypto].update(t, price)
+                            forecast_engine.update(t, {crypto: price})
+                        updated.add(crypto)
+                indicator_engine.extend(samples)
+                follow_seen = totals
+            if tick_broadcaster.active:
+                # Push clients get the newest price of each coin that moved
+                columns = np.flatnonzero(changed)
+                for t in np.unique(last_ts[columns]).tolist():
+                    tick = columns[last_ts[columns] == t]
+                    tick_broadcaster.publish(t, {SUPPORTED_CRYPTOS[i]: float(last_prices[i]) for i in tick})
+            history_cache.bump(updated)
+            forecast_cache.bump(updated)
+        except Exception as e:
+            log.error("shared state follower failed", error=e)
+
+def open_zenoh():
+    global zenoh_session
+    if zenoh_session is None:
+        import zenoh
+        zenoh_session = zenoh.open(zenoh.Config())
+    return zenoh_session
 
-    z = zenoh.open(zenoh.Config())
+def zenoh_listener():
+    def callback(sample):
+        key = str(sample.key_expr)
+        sample_queue.put((key, bytes(sample.payload)), key=key)
+
+    z = open_zenoh()
     z.declare_subscriber(ZENOH_KEY, callback)
     print("[ZENOH] Subscriber running...")
     while True:
         time.sleep(1)
 
-threading.Thread(target=zenoh_listener, daemon=True).start()
-
 # ========== Dash App ==========
 app = Dash(__name__, external_stylesheets=[
     "https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css",
@@ -163,6 +605,15 @@ app.layout = html.Div([
                         className="mb-3"
                     ),
                     
+                    html.Label("Select History Range:", className="fw-bold mb-2"),
+                    dcc.Dropdown(
+                        id='history-range',
+                        options=[{'label': label, 'value': value} for label, value in HISTORY_RANGES],
+                        value='points',
+                        clearable=False,
+                        className="mb-3"
+                    ),
+                    
                     html.Div(id='current-price-card', className="card mb-3 border-primary"),
                     html.Div(id='prediction-summary-card', className="card mb-3 border-warning"),
                     
@@ -222,48 +673,65 @@ app.layout = html.Div([
             html.Div(id="news-section", className="row")
         ], className="mt-5"),
         
-        dcc.Interval(id='interval', interval=60*1000, n_intervals=0)  # Update every minute
+        # Live ticks are pushed into 'live-tick' (assets/live_ticks.js); the
+        # interval only resyncs clients that missed some
+        dcc.Interval(id='interval', interval=60*1000, n_intervals=0),
+        dcc.Store(id='live-tick'),
+        dcc.Store(id='live-tick-coin'),
+        dcc.Interval(id='news-interval', interval=5*60*1000, n_intervals=0),
+        dcc.Store(id='history-cursor'),
+        dcc.Store(id='forecast-version'),
     ], className="container")
 ])
 
-# ========== Dash Callbacks ==========
-@app.callback(
-    [Output('price-history-chart', 'figure'),
-     Output('prediction-chart', 'figure'),
-     Output('current-price-card', 'children'),
-     Output('prediction-summary-card', 'children'),
-     Output('confidence-gauge', 'figure'),
-     Output('prediction-table', 'data'),
-     Output('news-section', 'children')],
-    [Input('interval', 'n_intervals'),
-     Input('crypto-select', 'value'),
-     Input('history-length', 'value')]
-)
-def update_dashboard(n, selected_crypto, history_length):
-    if selected_crypto not in price_history:
-        return go.Figure(), go.Figure(), "", "", go.Figure(), [], []
-
+# ========== Cached Views ==========
+def build_history_view(selected_crypto, history_length, history_range='points'):
+    """Full history figure; only sent when the coin, slider or range changes"""
     # Get historical prices (limited to selected history length)
-    prices = list(price_history[selected_crypto])[-history_length:]
-    timestamps = [i for i in range(len(prices))]
+    ts, prices = price_history[selected_crypto].window(history_length)
+    timestamps = ts.astype("datetime64[ns]")
     
-    # Create price history chart
+    # Create price history chart: raw points, or OHLC bars for long ranges
     history_fig = go.Figure()
-    history_fig.add_trace(go.Scatter(
-        x=timestamps,
-        y=prices,
-        mode='lines+markers',
-        name='Actual Price',
-        line=dict(color='#1f77b4', width=2)
-    ))
+    if history_range == 'points':
+        history_fig.add_trace(go.Scatter(
+            x=timestamps,
+            y=prices,
+            mode='lines+markers',
+            name='Actual Price',
+            line=dict(color='#1f77b4', width=2)
+        ))
+        title = f"{selected_crypto.title()} Price History (Last {history_length} Points)"
+    else:
+        end = ts[-1] if len(ts) else to_epoch_ns(datetime.now())
+        activate(selected_crypto)
+        with active_lock:
+            rollup = rollups.get(selected_crypto) or Rollup()
+        level, bar_ts, bars = rollup.query(
+            end - int(history_range) * 1_000_000_000, end, target_points=HISTORY_CHART_POINTS)
+        history_fig.add_trace(go.Candlestick(
+            x=bar_ts.astype("datetime64[ns]"),
+            open=bars['open'], high=bars['high'], low=bars['low'], close=bars['close'],
+            name=f'{level} bars'
+        ))
+        history_fig.update_layout(xaxis_rangeslider_visible=False)
+        label = HISTORY_RANGE_LABELS.get(history_range, "")
+        title = f"{selected_crypto.title()} Price History ({label}, {level} bars)"
     history_fig.update_layout(
-        title=f"{selected_crypto.title()} Price History (Last {history_length} Points)",
+        title=title,
         xaxis_title="Time",
         yaxis_title="Price (USD)",
         hovermode="x unified",
         plot_bgcolor='rgba(240,240,240,0.8)'
     )
-    
+    return {
+        "figure": history_fig,
+        "last_ts": int(ts[-1]) if len(ts) else 0,
+        "points": len(ts),
+    }
+
+def build_forecast_view(selected_crypto):
+    """Forecast chart, gauge, table and summary; rebuilt once per new tick"""
     # Get predictions
     predictions = get_predicted_prices(selected_crypto)
     pred_prices = [p['price'] for p in predictions]
@@ -282,7 +750,7 @@ def update_dashboard(n, selected_crypto, history_length):
     # Add confidence interval
     pred_fig.add_trace(go.Scatter(
         x=pred_timestamps,
-        y=[p * 1.02 for p in pred_prices],
+        y=[p * (1 + CONFIDENCE_BAND) for p in pred_prices],
         fill=None,
         mode='lines',
         line=dict(width=0),
@@ -290,7 +758,7 @@ def update_dashboard(n, selected_crypto, history_length):
     ))
     pred_fig.add_trace(go.Scatter(
         x=pred_timestamps,
-        y=[p * 0.98 for p in pred_prices],
+        y=[p * (1 - CONFIDENCE_BAND) for p in pred_prices],
         fill='tonexty',
         mode='lines',
         line=dict(width=0),
@@ -306,30 +774,6 @@ def update_dashboard(n, selected_crypto, history_length):
         plot_bgcolor='rgba(240,240,240,0.8)'
     )
     
-    # Current price card
-    current_price = latest_prices.get(selected_crypto, "N/A")
-    if isinstance(current_price, float):
-        price_text = f"${current_price:,.2f}"
-        change = ((current_price - prices[-2]) / prices[-2] * 100) if len(prices) > 1 else 0
-        change_icon = "fa-arrow-up" if change >= 0 else "fa-arrow-down"
-        change_color = "success" if change >= 0 else "danger"
-    else:
-        price_text = "N/A"
-        change = 0
-        change_icon = ""
-        change_color = "secondary"
-    
-    current_price_card = [
-        html.H4(f"Current {selected_crypto.title()} Price", className="card-title"),
-        html.Div([
-            html.Span(price_text, className="display-6 fw-bold"),
-            html.Span([
-                html.I(className=f"fas {change_icon} ms-2"),
-                f" {abs(change):.2f}%"
-            ], className=f"text-{change_color} fs-5 ms-2")
-        ], className="d-flex align-items-center")
-    ]
-    
     # Prediction summary card
     if predictions:
         start_price = pred_prices[0]
@@ -356,8 +800,8 @@ def update_dashboard(n, selected_crypto, history_length):
         html.Small("Predicted closing price", className="text-muted mt-1")
     ]
     
-    # Confidence gauge
-    confidence = min(90 + np.random.randint(-5, 5), 100)  # 85-95% confidence
+    # Confidence gauge: empty until the model can forecast
+    confidence = forecast_confidence(selected_crypto) if predictions else None
     gauge_fig = go.Figure(go.Indicator(
         mode="gauge+number",
         value=confidence,
@@ -392,9 +836,224 @@ def update_dashboard(n, selected_crypto, history_length):
                 "trend": "↑" if change >= 0 else "↓"
             })
     
+    return {
+        "pred_fig": pred_fig,
+        "summary_card": prediction_summary_card,
+        "gauge_fig": gauge_fig,
+        "table_data": table_data,
+    }
+
+def build_price_card(selected_crypto):
+    ts, prices = price_history[selected_crypto].window(2)
+    current_price = latest_price(selected_crypto)
+    if current_price is not None:
+        price_text = f"${current_price:,.2f}"
+        change = ((current_price - prices[-2]) / prices[-2] * 100) if len(prices) > 1 else 0
+        change_icon = "fa-arrow-up" if change >= 0 else "fa-arrow-down"
+        change_color = "success" if change >= 0 else "danger"
+    else:
+        price_text = "N/A"
+        change = 0
+        change_icon = ""
+        change_color = "secondary"
+    
+    with active_lock:
+        indicators = indicator_engine.get(selected_crypto)
+    
+    return [
+        html.H4(f"Current {selected_crypto.title()} Price", className="card-title"),
+        html.Div([
+            html.Span(price_text, className="display-6 fw-bold"),
+            html.Span([
+                html.I(className=f"fas {change_icon} ms-2"),
+                f" {abs(change):.2f}%"
+            ], className=f"text-{change_color} fs-5 ms-2")
+        ], className="d-flex align-items-center"),
+        build_indicator_table(indicators)
+    ]
+
+def build_indicator_table(values):
+    def fmt(value, spec="${:,.2f}"):
+        return "–" if value is None else spec.format(value)
+    e = indicator_engine
+    bands = "–" if values["bb_lower"] is None else f"{fmt(values['bb_lower'])} – {fmt(values['bb_upper'])}"
+    rows = [
+        (f"SMA {e.window}", fmt(values["sma"])),
+        (f"EMA {e.ema_span}", fmt(values["ema"])),
+        (f"Bollinger {e.window}, {e.bb_k:g}σ", bands),
+        (f"RSI {e.rsi_period}", fmt(values["rsi"], "{:.1f}")),
+        ("VWAP (UTC day, tick volume)", fmt(values["vwap"])),
+        (f"Volatility ({e.vol_window} ticks)", fmt(None if values["volatility"] is None
+                                                  else values["volatility"] * 100, "{:.3f}%")),
+    ]
+    return html.Table([
+        html.Tbody([html.Tr([html.Td(label, className="text-muted"), html.Td(text, className="text-end")])
+                    for label, text in rows])
+    ], className="table table-sm mb-0 mt-2")
+
+history_cache = ForecastCache(build_history_view)
+forecast_cache = ForecastCache(build_forecast_view)
+
+# ========== Dash Callbacks ==========
+# One callback per panel: a tick only re-sends what changed, and the slider
+# or coin dropdown never touches the news panel.
+def has_data(selected_crypto):
+    # Every callback passes here, which keeps the coin being viewed active
+    return activate(selected_crypto) and len(price_history[selected_crypto]) > 0
+
+@app.callback(
+    [Output('price-history-chart', 'figure'),
+     Output('history-cursor', 'data')],
+    [Input('crypto-select', 'value'),
+     Input('history-length', 'value'),
+     Input('history-range', 'value')]
+)
+@timed_callback("render_history")
+def render_history(selected_crypto, history_length, history_range):
+    if not has_data(selected_crypto):
+        return go.Figure(), None
+    return full_history(selected_crypto, history_length, history_range)
+
+def full_history(selected_crypto, history_length, history_range):
+    version = history_cache.version(selected_crypto)
+    view = history_cache.get(selected_crypto, history_length, history_range)
+    # ts travels as a string: epoch ns does not survive a JavaScript number
+    return view["figure"], {"ts": str(view["last_ts"]), "points": view["points"], "version": version}
+
+@app.callback(
+    [Output('price-history-chart', 'figure', allow_duplicate=True),
+     Output('history-cursor', 'data', allow_duplicate=True)],
+    Input('interval', 'n_intervals'),
+    [State('crypto-select', 'value'),
+     State('history-length', 'value'),
+     State('history-range', 'value'),
+     State('history-cursor', 'data')],
+    prevent_initial_call=True
+)
+@timed_callback("extend_history")
+def extend_history(n, selected_crypto, history_length, history_range, cursor):
+    if not has_data(selected_crypto):
+        raise PreventUpdate
+    version = history_cache.version(selected_crypto)
+    if cursor is not None and cursor["version"] == version:
+        raise PreventUpdate
+    if cursor is None or history_range != 'points':
+        # Bar charts are bounded by HISTORY_CHART_POINTS; resend them whole
+        return full_history(selected_crypto, history_length, history_range)
+
+    ts, prices = price_history[selected_crypto].since(int(cursor["ts"]) + 1)
+    if len(ts) == 0:
+        return no_update, dict(cursor, version=version)
+    if len(ts) >= history_length:
+        return full_history(selected_crypto, history_length, history_range)
+    points = cursor["points"] + len(ts)
+
+    # Append only the new points, then trim the oldest ones off the front
+    patched = Patch()
+    patched['data'][0]['x'].extend(np.datetime_as_string(ts.astype("datetime64[ns]")).tolist())
+    patched['data'][0]['y'].extend(prices.tolist())
+    for _ in range(max(0, points - history_length)):
+        del patched['data'][0]['x'][0]
+        del patched['data'][0]['y'][0]
+    return patched, {"ts": str(ts[-1]), "points": min(points, history_length), "version": version}
+
+# Pushed ticks go straight into the chart with extendData, no server round
+# trip; the cursor is advanced so extend_history does not send them again
+app.clientside_callback(
+    """
+    function(msg, coin, length, range, cursor) {
+        var nu = window.dash_clientside.no_update;
+        var tick = msg && msg.ticks[coin];
+        if (!tick || !cursor || range !== 'points') {
+            return [nu, nu];
+        }
+        var last = BigInt(cursor.ts), x = [], y = [];
+        for (var i = 0; i < tick.ns.length; i++) {
+            if (BigInt(tick.ns[i]) > last) {
+                x.push(tick.x[i]);
+                y.push(tick.y[i]);
+            }
+        }
+        if (!x.length) {
+            return [nu, nu];
+        }
+        return [
+            [{x: [x], y: [y]}, [0], length],
+            Object.assign({}, cursor, {
+                ts: tick.ns[tick.ns.length - 1],
+                points: Math.min(cursor.points + x.length, length)
+            })
+        ];
+    }
+    """,
+    [Output('price-history-chart', 'extendData'),
+     Output('history-cursor', 'data', allow_duplicate=True)],
+    Input('live-tick', 'data'),
+    [State('crypto-select', 'value'),
+     State('history-length', 'value'),
+     State('history-range', 'value'),
+     State('history-cursor', 'data')],
+    prevent_initial_call=True
+)
+
+# The push stream only carries the coin on screen (assets/live_ticks.js)
+app.clientside_callback(
+    """
+    function(coin) {
+        if (window.liveTicks) {
+            window.liveTicks.follow(coin);
+        }
+        return coin;
+    }
+    """,
+    Output('live-tick-coin', 'data'),
+    Input('crypto-select', 'value')
+)
+
+@app.callback(
+    [Output('prediction-chart', 'figure'),
+     Output('prediction-summary-card', 'children'),
+     Output('confidence-gauge', 'figure'),
+     Output('prediction-table', 'data'),
+     Output('forecast-version', 'data')],
+    [Input('interval', 'n_intervals'),
+     Input('live-tick', 'data'),
+     Input('crypto-select', 'value')],
+    State('forecast-version', 'data')
+)
+@timed_callback("update_forecast")
+def update_forecast(n, live_tick, selected_crypto, sent):
+    if not has_data(selected_crypto):
+        return go.Figure(), "", go.Figure(), [], None
+    # Served from the cache; skip the round trip when nothing new arrived
+    version = [selected_crypto, forecast_cache.version(selected_crypto)]
+    if sent == version:
+        raise PreventUpdate
+    views = forecast_cache.get(selected_crypto)
+    return views["pred_fig"], views["summary_card"], views["gauge_fig"], views["table_data"], version
+
+@app.callback(
+    Output('current-price-card', 'children'),
+    [Input('interval', 'n_intervals'),
+     Input('live-tick', 'data'),
+     Input('crypto-select', 'value')]
+)
+@timed_callback("update_price_card")
+def update_price_card(n, live_tick, selected_crypto):
+    if not has_data(selected_crypto):
+        return ""
+    return build_price_card(selected_crypto)
+
+@app.callback(
+    Output('news-section', 'children'),
+    [Input('news-interval', 'n_intervals'),
+     Input('crypto-select', 'value')]
+)
+@timed_callback("update_news")
+def update_news(n, selected_crypto):
     # News cards
     news_items = fetch_crypto_news(selected_crypto)
-    news_list = [
+    return [
         html.Div([
             html.Div([
                 html.H5(n["title"], className="card-title"),
@@ -404,24 +1063,83 @@ def update_dashboard(n, selected_crypto, history_length):
         ], className="card m-2 col-md-5 shadow-sm")
         for n in news_items[:4]  # Show maximum 4 news items
     ]
-    
-    return (history_fig, pred_fig, current_price_card, prediction_summary_card, 
-            gauge_fig, table_data, news_list)
+
+if DASH_DEBUG:
+    install_stats_route(app.server)
+install_metrics_route(app.server)
+install_push_route(app.server, tick_broadcaster)
 
 # ========== News Fetching Function ==========
+def publish_news(key, payload):
+    if zenoh_session is not None:
+        zenoh_session.put(key, payload)
+
 def fetch_crypto_news(crypto_name):
-    query = f"{crypto_name} cryptocurrency"
-    url = f"https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
-    try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.content, features="xml")
-        items = soup.find_all("item")
-        news = [{"title": item.title.text, "url": item.link.text} for item in items[:5]]
-        return news
-    except Exception as e:
-        print("[NEWS ERROR]", e)
-        return [{"title": "Failed to load news. Please try again later.", "url": "#"}]
+    # Memory-only read; feeds are refreshed on the news service's own loop
+    return news_service.get(crypto_name)
+
+# Kept warm: the coins active at startup; others are fetched when first viewed
+news_service = NewsService(SUPPORTED_CRYPTOS[:ACTIVE_COINS], publish=publish_news)
+
+# ========== Startup ==========
+# Importing this module opens nothing: the shared-memory rings, the history
+# tail read, the Zenoh session and the background threads start in
+# start_services(), called from __main__ or, under a WSGI server, by the
+# first request.
+_services_started = False
+_services_lock = threading.Lock()
+
+def init_shared_state():
+    """Ingest mode: publish the rings as shared memory. Worker mode: attach to
+    them (waiting up to 60 s for the ingest process) in place of local rings."""
+    global shared_state, price_history
+    if DASH_MODE == MODE_WORKER:
+        shared_state = SharedPriceState.attach(SHARED_STATE_NAME, wait=60)
+        price_history = {crypto: shared_state.ring(crypto) for crypto in SUPPORTED_CRYPTOS}
+    elif DASH_MODE == MODE_INGEST:
+        shared_state = SharedPriceState.create(SHARED_STATE_NAME, SUPPORTED_CRYPTOS, HISTORY_CAPACITY)
+        atexit.register(shared_state.close)
+
+def start_services():
+    global _services_started
+    with _services_lock:
+        if _services_started:
+            return
+        _services_started = True
+        init_shared_state()
+        history_cache.start()
+        forecast_cache.start()
+        init_indicators()
+        if DASH_MODE == MODE_WORKER:
+            init_rollups()
+            threading.Thread(target=shared_follower, daemon=True).start()
+        else:
+            warm_start()
+            threading.Thread(target=tick_consumer, daemon=True).start()
+            threading.Thread(target=zenoh_listener, daemon=True).start()
+        if DASH_MODE != MODE_INGEST:
+            news_service.start()
+
+# WSGI entry point for worker mode
+server = app.server
+server.before_request(start_services)
 
 if __name__ == '__main__':
-    init_csv()
-    app.run(debug=True)
\ No newline at end of file
+    if DASH_MODE == MODE_WORKER:
+        # A single worker without a WSGI server, e.g. for testing
+        app.run(debug=False)
+    else:
+        init_csv()
+        init_store()
+        start_services()
+        if DASH_MODE == MODE_INGEST:
+            print(f"[INGEST] Publishing price rings as shared memory '{SHARED_STATE_NAME}'")
+            start_metrics_server(METRICS_PORT)
+            # Run the atexit hooks (flush the store, unlink the segment) on SIGTERM
+            signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+            while True:
+                time.sleep(3600)
+        else:
+            # No reloader: it would run __main__ again in a second process,
+            # with a second store writer and Zenoh subscriber
+            app.run(debug=True, use_reloader=False)
\ No newline at end of file